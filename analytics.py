@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from engine import STAGES
+
+# --- ハンド履歴の集計 (プレイヤー別の統計) ---
+# hand_history.py の JSONL を CHUNK_HANDS ハンドずつ読み、(ハンド, 席) を 1 行とする列ごとの NumPy 配列に
+# 展開してから、プレイヤー名ごとに np.bincount でまとめて足し込む。保持するのはプレイヤー数 × 列数の合計だけなので、
+# 履歴が何百万ハンドあってもメモリは一定。ファイルごとに読み終えた位置を覚えているので、追記された分だけを
+# 読み足せる (save / load で次回に持ち越せる)。
+#
+# 統計: VPIP (プリフロップで自分からチップを入れた割合)、PFR (プリフロップでレイズした割合)、
+#       AF (レイズ回数 / コール回数)、WSD (ショーダウンに行った割合) と W$SD (ショーダウンで勝った割合)、
+#       収支 (ハンドが終わったステージ別。ショーダウンまで行ったハンドは "showdown")
+# 使い方: python analytics.py hands.jsonl ... [--state stats.npz] [--json out.json]
+
+CHUNK_HANDS = 50000
+COLUMNS = ('hands', 'vpip', 'pfr', 'raises', 'calls', 'showdowns', 'showdown_wins', 'net') + tuple(f'net_{s}' for s in STAGES)
+_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+_SHOWDOWN = STAGES.index("showdown")
+
+def hand_columns(records, name_id):
+    # records (ハンドの辞書のリスト) → 列名 → 1 次元配列 (1 行 = 1 ハンドの 1 席)。name_id は名前 → 番号
+    ids, vpip, pfr, raises, calls, showdown, won, net, end = [], [], [], [], [], [], [], [], []
+    for record in records:
+        players = record["players"]
+        seats = len(players)
+        seat_vpip = [0] * seats
+        seat_pfr = [0] * seats
+        seat_raises = [0] * seats
+        seat_calls = [0] * seats
+        folded = [False] * seats
+        stage = 0
+        for event in record["events"]:
+            kind = event[0]
+            if kind == "a":
+                _, seat, action, _ = event
+                if action == "fold":
+                    folded[seat] = True
+                elif action == "call":
+                    seat_calls[seat] += 1
+                    if stage == 0: seat_vpip[seat] = 1
+                elif action == "raise":
+                    seat_raises[seat] += 1
+                    if stage == 0: seat_vpip[seat] = seat_pfr[seat] = 1
+            elif kind == "s":
+                stage = STAGES.index(event[1])
+        went_to_showdown = folded.count(False) > 1
+        winners = set(record["winners"])
+        for seat, (name, start) in enumerate(players):
+            ids.append(name_id(name))
+            vpip.append(seat_vpip[seat])
+            pfr.append(seat_pfr[seat])
+            raises.append(seat_raises[seat])
+            calls.append(seat_calls[seat])
+            at_showdown = went_to_showdown and not folded[seat]
+            showdown.append(at_showdown)
+            won.append(at_showdown and seat in winners)
+            net.append(record["chips"][seat] - start)
+            end.append(_SHOWDOWN if went_to_showdown else stage)
+    return {
+        "id": np.array(ids, dtype=np.int64), "vpip": np.array(vpip, dtype=np.int64), "pfr": np.array(pfr, dtype=np.int64),
+        "raises": np.array(raises, dtype=np.int64), "calls": np.array(calls, dtype=np.int64),
+        "showdowns": np.array(showdown, dtype=np.int64), "showdown_wins": np.array(won, dtype=np.int64),
+        "net": np.array(net, dtype=np.int64), "end": np.array(end, dtype=np.int64),
+    }
+
+class HandStats:
+    __slots__ = ('names', 'index', 'totals', 'offsets')
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.totals = np.zeros((0, len(COLUMNS)), dtype=np.int64)
+        self.offsets = {}  # ファイル → 読み終えたバイト位置
+
+    def _name_id(self, name):
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def add(self, records):
+        # ハンドの記録をまとめて集計に加える
+        if not records:
+            return
+        columns = hand_columns(records, self._name_id)
+        n = len(self.names)
+        if len(self.totals) < n:
+            self.totals = np.vstack([self.totals, np.zeros((n - len(self.totals), len(COLUMNS)), dtype=np.int64)])
+        ids = columns["id"]
+        group = lambda values: np.bincount(ids, weights=values, minlength=n).round().astype(np.int64)
+        self.totals[:, _INDEX['hands']] += np.bincount(ids, minlength=n)
+        for name in ('vpip', 'pfr', 'raises', 'calls', 'showdowns', 'showdown_wins', 'net'):
+            self.totals[:, _INDEX[name]] += group(columns[name])
+        for stage_index, stage in enumerate(STAGES):
+            self.totals[:, _INDEX[f'net_{stage}']] += group(np.where(columns["end"] == stage_index, columns["net"], 0))
+
+    def update(self, path, chunk_hands=CHUNK_HANDS):
+        # path の前回の続きから読み、追記された完全な行だけを集計する。読んだハンド数を返す
+        offset = self.offsets.get(path, 0)
+        if os.path.getsize(path) < offset:
+            raise ValueError(f"{path}: 前回より短くなっています (別のファイルに置き換わった可能性があります)")
+        added = 0
+        records = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 書き込み途中の行は次回に読む
+                offset += len(line)
+                if line.strip():
+                    records.append(json.loads(line))
+                if len(records) >= chunk_hands:
+                    self.add(records)
+                    added += len(records)
+                    records = []
+        self.add(records)
+        added += len(records)
+        self.offsets[path] = offset
+        return added
+
+    def stats(self):
+        # プレイヤー名 → 統計の辞書
+        result = {}
+        for i, name in enumerate(self.names):
+            row = dict(zip(COLUMNS, self.totals[i].tolist()))
+            hands = row['hands'] or 1
+            result[name] = {
+                "hands": row['hands'],
+                "vpip": row['vpip'] / hands,
+                "pfr": row['pfr'] / hands,
+                "af": row['raises'] / row['calls'] if row['calls'] else float(row['raises']),
+                "wtsd": row['showdowns'] / hands,
+                "wsd": row['showdown_wins'] / row['showdowns'] if row['showdowns'] else 0.0,
+                "net": row['net'],
+                "net_by_stage": {stage: row[f'net_{stage}'] for stage in STAGES},
+            }
+        return result
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, totals=self.totals, meta=np.array(json.dumps({"columns": COLUMNS, "names": self.names, "offsets": self.offsets})))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        stats = cls()
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if tuple(meta["columns"]) != COLUMNS:
+                raise ValueError(f"{path}: 列の構成が違います")
+            stats.totals = data["totals"].astype(np.int64)
+        stats.names = meta["names"]
+        stats.index = {name: i for i, name in enumerate(stats.names)}
+        stats.offsets = meta["offsets"]
+        return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="ハンド履歴からプレイヤー別の統計を集計する")
+    parser.add_argument("paths", nargs="+", help="ハンド履歴 (JSONL) のファイルまたはディレクトリ")
+    parser.add_argument("--state", help="集計の途中経過を保存するファイル (.npz)。次回は追記された分だけ読む")
+    parser.add_argument("--json", help="統計を書き出す JSON ファイル")
+    args = parser.parse_args()
+
+    stats = HandStats.load(args.state) if args.state and os.path.exists(args.state) else HandStats()
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl")))
+        else:
+            files.append(path)
+    start = time.perf_counter()
+    added = sum(stats.update(os.path.abspath(path)) for path in files)
+    elapsed = time.perf_counter() - start
+    print(f"{added} ハンドを追加 ({elapsed:.2f}s)", file=sys.stderr)
+    if args.state:
+        stats.save(args.state)
+
+    result = stats.stats()
+    print(f"{'プレイヤー':12s} {'ハンド':>8s} {'VPIP':>6s} {'PFR':>6s} {'AF':>5s} {'WTSD':>6s} {'W$SD':>6s} {'収支':>9s}  "
+          + "  ".join(STAGES))
+    for name, s in sorted(result.items(), key=lambda item: -item[1]["net"]):
+        print(f"{name:12s} {s['hands']:8d} {s['vpip']:6.1%} {s['pfr']:6.1%} {s['af']:5.2f} {s['wtsd']:6.1%} {s['wsd']:6.1%} "
+              f"{s['net']:9d}  " + "  ".join(str(s['net_by_stage'][stage]) for stage in STAGES))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
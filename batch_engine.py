@@ -0,0 +1,286 @@
+import numpy as np
+import equity
+
+# --- 多数のテーブルを同時に進めるバッチエンジン ---
+# PokerEngine と同じルールを、N テーブル分の状態を NumPy 配列 (テーブル × 席) に持って一括で処理する。
+# 各テーブルは独立に進むが、step() / apply_actions() などは全テーブルに対して 1 回ずつ呼ぶ。
+# 席の番号はハンドごとにチップの残っているプレイヤーを前に詰めたもので、PokerEngine.players の添字と同じ。
+# 元の席は seat_id で追える。
+
+# step() の戻り値 (テーブルごと)
+IDLE, ACTION, BETTING_OVER, ROUND_OVER = 0, 1, 2, 3
+# アクションの番号
+FOLD, CHECK, CALL, RAISE = 0, 1, 2, 3
+ACTION_NAMES = ('fold', 'check', 'call', 'raise')
+# ステージの番号 (engine.STAGES の順)
+PRE_FLOP, FLOP, TURN, RIVER, SHOWDOWN = range(5)
+
+class BatchEngine:
+    __slots__ = ('tables', 'seats', 'rng', 'small_blind_amount', 'big_blind_amount',
+                 'chips', 'bet', 'contributed', 'acted', 'folded', 'all_in', 'seat_id', 'num_players',
+                 'deck', 'hole', 'board', 'stage', 'pot', 'current_bet', 'current', 'small_blind_index',
+                 'big_blind_index', 'in_hand', 'finished', 'hands')
+
+    def __init__(self, tables, seats, chips=1000, small_blind_amount=10, big_blind_amount=20, seed=None):
+        self.tables = tables
+        self.seats = seats
+        self.rng = np.random.default_rng(seed)
+        self.small_blind_amount = small_blind_amount
+        self.big_blind_amount = big_blind_amount
+        shape = (tables, seats)
+        self.chips = np.full(shape, chips, dtype=np.int64)
+        self.bet = np.zeros(shape, dtype=np.int64)
+        self.contributed = np.zeros(shape, dtype=np.int64)
+        self.acted = np.zeros(shape, dtype=bool)
+        self.folded = np.zeros(shape, dtype=bool)
+        self.all_in = np.zeros(shape, dtype=bool)
+        self.seat_id = np.tile(np.arange(seats), (tables, 1))
+        self.num_players = np.full(tables, seats, dtype=np.int64)
+        self.deck = np.tile(np.arange(52, dtype=np.int64), (tables, 1))
+        self.hole = np.zeros((tables, seats, 2), dtype=np.int64)
+        self.board = np.zeros((tables, 5), dtype=np.int64)
+        self.stage = np.zeros(tables, dtype=np.int64)
+        self.pot = np.zeros(tables, dtype=np.int64)
+        self.current_bet = np.zeros(tables, dtype=np.int64)
+        self.current = np.zeros(tables, dtype=np.int64)
+        self.small_blind_index = np.full(tables, -1, dtype=np.int64)
+        self.big_blind_index = np.full(tables, -1, dtype=np.int64)
+        self.in_hand = np.zeros(tables, dtype=bool)
+        # プレイ可能なプレイヤーが 2 人未満になったテーブル
+        self.finished = np.zeros(tables, dtype=bool)
+        self.hands = np.zeros(tables, dtype=np.int64)
+
+    # --- 補助 ---
+
+    def _seat_ok(self):
+        return np.arange(self.seats) < self.num_players[:, None]
+
+    def shuffle(self, mask):
+        # mask のテーブルのデッキを並べ替える (検証用に差し替えられるよう分けてある)
+        rows = np.flatnonzero(mask)
+        self.deck[rows] = self.rng.random((len(rows), 52)).argsort(axis=1)
+
+    # --- 状態の問い合わせ ---
+
+    def min_raise(self):
+        return np.where(self.current_bet > 0, self.current_bet * 2, self.big_blind_amount)
+
+    def legal_mask(self):
+        # 現在のプレイヤーが取れるアクション (テーブル × [fold, check, call, raise])
+        rows = np.arange(self.tables)
+        to_call = self.current_bet - self.bet[rows, self.current]
+        chips = self.chips[rows, self.current]
+        return np.stack([np.ones(self.tables, dtype=bool), to_call <= 0, to_call > 0, chips > to_call], axis=1)
+
+    # --- 状態遷移 ---
+
+    def start_hands(self, mask=None):
+        # mask のテーブル (省略時はハンド中でないすべて) で新しいハンドを配る。始められたテーブルを返す
+        if mask is None:
+            mask = ~self.in_hand & ~self.finished
+        # チップの残っているプレイヤーを前に詰める (PokerEngine の players の絞り込みと同じ)
+        rows = np.flatnonzero(mask)
+        alive = (self.chips[rows] > 0) & self._seat_ok()[rows]
+        order = np.argsort(~alive, axis=1, kind='stable')
+        self.chips[rows] = np.take_along_axis(self.chips[rows], order, axis=1)
+        self.seat_id[rows] = np.take_along_axis(self.seat_id[rows], order, axis=1)
+        self.num_players[rows] = alive.sum(axis=1)
+
+        started = mask & (self.num_players >= 2)
+        self.finished |= mask & ~started
+        self.in_hand = np.where(mask, started, self.in_hand)
+        rows = np.flatnonzero(started)
+        if len(rows) == 0:
+            return started
+
+        self.shuffle(started)
+        n = self.num_players[rows]
+        self.hole[rows] = self.deck[rows, :2 * self.seats].reshape(len(rows), self.seats, 2)
+        # ボードは手札の後ろの 5 枚 (人数が少ないテーブルは席数ではなく人数で位置が決まる)
+        self.board[rows] = np.take_along_axis(self.deck[rows], 2 * n[:, None] + np.arange(5), axis=1)
+        self.stage[rows] = PRE_FLOP
+        self.pot[rows] = 0
+        self.bet[rows] = 0
+        self.contributed[rows] = 0
+        self.acted[rows] = False
+        self.folded[rows] = False
+        self.all_in[rows] = False
+
+        sb = (self.small_blind_index[rows] + 1) % n
+        bb = (sb + 1) % n
+        self.small_blind_index[rows] = sb
+        self.big_blind_index[rows] = bb
+        self._post_blind(rows, sb, self.small_blind_amount)
+        self._post_blind(rows, bb, self.big_blind_amount)
+        self.current_bet[rows] = self.big_blind_amount
+        self.current[rows] = (bb + 1) % n
+        return started
+
+    def _post_blind(self, rows, seats, amount):
+        posted = np.minimum(amount, self.chips[rows, seats])
+        self.bet[rows, seats] = posted
+        self.chips[rows, seats] -= posted
+        self.contributed[rows, seats] += posted
+        self.all_in[rows, seats] |= self.chips[rows, seats] == 0
+
+    def start_betting_rounds(self, mask):
+        rows = np.flatnonzero(mask & (self.stage != PRE_FLOP))
+        self.current[rows] = self.small_blind_index[rows] % self.num_players[rows]
+        self.current_bet[rows] = 0
+        reset = ~self.folded[rows] & ~self.all_in[rows]
+        self.acted[rows] &= ~reset
+        self.bet[rows] = 0
+
+    def step(self):
+        # テーブルごとに次に必要な処理を返す。行動不能なプレイヤーの手番はここで飛ばす
+        seat_ok = self._seat_ok()
+        active = seat_ok & ~self.folded
+        can_act = active & ~self.all_in
+        waiting = can_act & ~(self.acted & (self.bet == self.current_bet[:, None]))
+        # 相手が全員オールインなら、コール額を払い終えた最後の 1 人はもう行動しない
+        lone = (can_act.sum(axis=1) == 1) & (np.where(can_act, self.bet, np.iinfo(np.int64).max).min(axis=1) >= self.current_bet)
+        status = np.where(active.sum(axis=1) <= 1, ROUND_OVER,
+                          np.where(~waiting.any(axis=1) | lone, BETTING_OVER, ACTION))
+        status = np.where(self.in_hand, status, IDLE)
+
+        rows = np.flatnonzero(status == ACTION)
+        if len(rows):
+            candidates = (self.current[rows, None] + np.arange(self.seats)) % self.num_players[rows, None]
+            ok = np.take_along_axis(can_act[rows], candidates, axis=1)
+            self.current[rows] = candidates[np.arange(len(rows)), ok.argmax(axis=1)]
+        return status
+
+    def apply_actions(self, actions, amounts, mask):
+        # mask のテーブルで現在のプレイヤーのアクションを適用する。不正なアクションは最も近い合法手に読み替える
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return
+        cur = self.current[rows]
+        action = np.asarray(actions)[rows].copy()
+        amount = np.asarray(amounts, dtype=np.int64)[rows].copy()
+        chips = self.chips[rows, cur]
+        bet = self.bet[rows, cur]
+        current_bet = self.current_bet[rows]
+        to_call = current_bet - bet
+
+        action[(action == RAISE) & (amount <= current_bet) & (amount < chips + bet)] = CALL
+        check_to_call = (action == CHECK) & (to_call > 0)
+        call_to_check = (action == CALL) & (to_call <= 0)
+        action[check_to_call] = CALL
+        action[call_to_check] = CHECK
+
+        self.folded[rows, cur] |= action == FOLD
+
+        paid = np.where(action == CALL, np.minimum(to_call, chips), 0)
+        raise_all_in = (action == RAISE) & (amount >= chips + bet)
+        raise_to = np.where(raise_all_in, chips + bet, amount)
+        paid = np.where(action == RAISE, raise_to - bet, paid)
+        chips = chips - paid
+        bet = bet + paid
+        self.chips[rows, cur] = chips
+        self.bet[rows, cur] = bet
+        self.contributed[rows, cur] += paid
+        self.all_in[rows, cur] |= ((action == CALL) & (chips == 0)) | raise_all_in
+
+        raised = (action == RAISE) & (bet > current_bet)
+        self.current_bet[rows] = np.where(raised, bet, current_bet)
+        raised_rows = rows[raised]
+        if len(raised_rows):
+            others = ~self.folded[raised_rows] & ~self.all_in[raised_rows]
+            others[np.arange(len(raised_rows)), cur[raised]] = False
+            self.acted[raised_rows] &= ~others
+
+        self.acted[rows, cur] = True
+        self.current[rows] = (cur + 1) % self.num_players[rows]
+
+    def end_betting_rounds(self, mask):
+        # ベットをポットに集めて次のストリートに進む。ショーダウンに進んだテーブルは False
+        rows = np.flatnonzero(mask)
+        self.pot[rows] += self.bet[rows].sum(axis=1)
+        self.bet[rows] = 0
+        self.stage[rows] += 1
+        return mask & (self.stage != SHOWDOWN)
+
+    def visible_board(self):
+        # ステージごとに公開済みのカード数 (0, 3, 4, 5)
+        return np.array([0, 3, 4, 5, 5])[self.stage]
+
+    def end_rounds(self, mask):
+        # ショーダウン (サイドポット対応) を一括で精算する。テーブルごとの獲得額 (テーブル × 席) を返す
+        rows = np.flatnonzero(mask)
+        payouts = np.zeros((len(rows), self.seats), dtype=np.int64)
+        if len(rows) == 0:
+            return payouts
+        self.pot[rows] += self.bet[rows].sum(axis=1)
+        self.bet[rows] = 0
+
+        n = self.num_players[rows]
+        seat_ok = self._seat_ok()[rows]
+        live = seat_ok & ~self.folded[rows]
+        contributed = np.where(seat_ok, self.contributed[rows], 0)
+        # 空席の手札はボードと重なるので、評価が壊れないよう席 0 の手札で埋める (結果は使わない)
+        hole = np.where(seat_ok[:, :, None], self.hole[rows], self.hole[rows, :1])
+        cards = np.concatenate([hole, np.broadcast_to(self.board[rows, None, :], (len(rows), self.seats, 5))], axis=2)
+        strength = np.where(live, equity.evaluate_batch(cards), -1)
+
+        # 勝者が複数いるときの端数は SB の席から時計回りに配る
+        order = (np.arange(self.seats) - self.small_blind_index[rows, None]) % n[:, None]
+        big = np.iinfo(np.int64).max
+        levels = np.sort(np.where(live, contributed, big), axis=1)
+        top = np.where(live, contributed, 0).max(axis=1)
+        previous = np.zeros(len(rows), dtype=np.int64)
+        for j in range(self.seats):
+            level = levels[:, j]
+            valid = (level != big) & (level > previous)
+            amount = (np.minimum(contributed, level[:, None]) - np.minimum(contributed, previous[:, None])).sum(axis=1)
+            # 最後のポットには、どの生存者の拠出額も超えるフォールド済みプレイヤーの分を加える
+            amount += np.where(level == top, (contributed - np.minimum(contributed, top[:, None])).sum(axis=1), 0)
+            amount = np.where(valid, amount, 0)
+            eligible = live & (contributed >= level[:, None])
+            best = np.where(eligible, strength, -1).max(axis=1)
+            winners = eligible & (strength == best[:, None]) & valid[:, None]
+            count = np.maximum(winners.sum(axis=1), 1)
+            share, odd = np.divmod(amount, count)
+            earlier = (winners[:, None, :] & (order[:, None, :] < order[:, :, None])).sum(axis=2)
+            payouts += np.where(winners, share[:, None] + (earlier < odd[:, None]), 0)
+            previous = np.where(valid, level, previous)
+
+        self.chips[rows] += payouts
+        self.in_hand[rows] = False
+        self.hands[rows] += 1
+        return payouts
+
+    # --- 一括実行 ---
+
+    def run(self, policy, hands=1):
+        # 各テーブルで hands ハンドずつ (またはプレイヤーが 1 人になるまで) 進める。
+        # policy(engine, mask) -> (actions, amounts): mask のテーブルの現在のプレイヤーのアクション (テーブル数の配列)
+        self.start_hands(~self.finished & (self.hands < hands))
+        while self.in_hand.any():
+            status = self.step()
+            acting = status == ACTION
+            if acting.any():
+                actions, amounts = policy(self, acting)
+                self.apply_actions(actions, amounts, acting)
+            betting_over = status == BETTING_OVER
+            if betting_over.any():
+                continues = self.end_betting_rounds(betting_over)
+                self.start_betting_rounds(continues)
+                self.end_rounds(betting_over & ~continues)
+            round_over = status == ROUND_OVER
+            if round_over.any():
+                self.end_rounds(round_over)
+            # ハンドが終わったテーブルは次のハンドを配る
+            self.start_hands(~self.in_hand & ~self.finished & (self.hands < hands) & (acting | betting_over | round_over))
+        return self.hands
+
+def random_policy(rng, raise_rate=0.1, fold_rate=0.15):
+    # 勝率計算を使わない軽い方針 (bench.scripted_policy の配列版)
+    def decide(engine, mask):
+        legal = engine.legal_mask()
+        roll = rng.random(engine.tables)
+        actions = np.where(legal[:, CHECK], CHECK, CALL)
+        actions = np.where(roll < raise_rate + fold_rate, FOLD, actions)
+        actions = np.where((roll < raise_rate) & legal[:, RAISE], RAISE, actions)
+        return actions, engine.min_raise()
+    return decide
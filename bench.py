@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+import evaluator
+import equity
+from cards import Deck, CARDS
+from engine import PokerEngine, Player, ACTION
+import batch_engine
+from hand_tracker import HandTracker
+
+# --- ベンチマーク ---
+# 使い方:
+#   python bench.py                         # すべて計測して表示
+#   python bench.py --json result.json      # 結果を保存 (次回の比較用ベースライン)
+#   python bench.py --compare result.json   # ベースラインより遅くなったケースを報告 (終了コード 1)
+#   python bench.py --only import_core      # コアの import の速さ (軽いままかどうかの確認は tests/test_imports.py)
+# 各ケースは固定シードで入力を作り、ウォームアップの後に repeat 回計測して中央値で比較する。
+
+SEED = 12345
+# コアのモジュール (ルール・役判定)
+CORE_MODULES = ("cards", "evaluator", "showdown", "engine", "snapshot")
+
+def scripted_policy(rng):
+    # 勝率計算を使わない軽い方針 (エンジン自体の速度を測るため)
+    def decide(engine, player):
+        actions = engine.legal_actions()
+        roll = rng.random()
+        if 'raise' in actions and roll < 0.1:
+            return 'raise', engine.min_raise()
+        if roll < 0.25:
+            return 'fold', 0
+        return ('check' if 'check' in actions else 'call'), 0
+    return decide
+
+def case_evaluate(n=20000):
+    rng = random.Random(SEED)
+    hands = [rng.sample(range(52), 7) for _ in range(n)]
+    evaluator.tables()
+    def run():
+        evaluate = evaluator.evaluate
+        for h in hands:
+            evaluate(h)
+        return n
+    return run
+
+def case_evaluate_cards(n=20000):
+    # PokerEngine.evaluate_hand (Card オブジェクト経由) の速度
+    rng = random.Random(SEED)
+    hands = [[CARDS[c] for c in rng.sample(range(52), 7)] for _ in range(n)]
+    engine = PokerEngine()
+    evaluator.tables()
+    def run():
+        for h in hands:
+            engine.evaluate_hand(h)
+        return n
+    return run
+
+def case_evaluate_batch(n=200000):
+    rng = random.Random(SEED)
+    hands = np.array([rng.sample(range(52), 7) for _ in range(n)])
+    equity.evaluate_batch(hands[:10])
+    def run():
+        equity.evaluate_batch(hands)
+        return n
+    return run
+
+def case_deck(n=20000, players=6):
+    rng = random.Random(SEED)
+    def run():
+        for _ in range(n):
+            deck = Deck(rng)
+            for _ in range(players * 2 + 5):
+                deck.deal()
+        return n
+    return run
+
+def case_equity(samples=100000):
+    hole = [12, 25]  # ♠A ♥A
+    def run():
+        equity.estimate_equity(hole, (), 1, samples=samples, rng=np.random.default_rng(SEED))
+        return samples
+    return run
+
+def case_betting_round(players, n=2000):
+    # プリフロップのベッティングラウンド 1 回分 (配り直し込み)
+    rng = random.Random(SEED)
+    decide = scripted_policy(rng)
+    def run():
+        engine = PokerEngine([Player(f"P{i}", chips=10**9) for i in range(players)], seed=SEED)
+        for _ in range(n):
+            engine.start_hand()
+            while engine.step() == ACTION:
+                player = engine.players[engine.current_player_index]
+                engine.apply_action(*decide(engine, player))
+        return n
+    return run
+
+def case_full_hand(players, n=1000):
+    rng = random.Random(SEED)
+    decide = scripted_policy(rng)
+    def run():
+        done = 0
+        engine = PokerEngine([Player(f"P{i}", chips=10**9) for i in range(players)], seed=SEED)
+        while done < n:
+            engine.play_hand(decide)
+            done += 1
+        return n
+    return run
+
+def case_batch_hand(players, tables=2048, hands=5):
+    # バッチエンジンで tables テーブル × hands ハンド
+    def run():
+        engine = batch_engine.BatchEngine(tables, players, chips=10**9, seed=SEED)
+        engine.run(batch_engine.random_policy(np.random.default_rng(SEED)), hands)
+        return tables * hands
+    return run
+
+def case_tracker_streets(players, n=500):
+    # ハンドの開始とフロップ・ターン・リバーでの役とアウツの更新 (HandTracker)
+    def run():
+        engine = PokerEngine([Player(f"P{i}", chips=10**9) for i in range(players)], seed=SEED)
+        tracker = HandTracker()
+        for _ in range(n):
+            engine.start_hand()
+            tracker.begin_hand(engine)
+            engine.community_cards = [engine.deck.deal() for _ in range(5)]
+            board = engine.community_cards
+            for count in (3, 4, 5):
+                engine.community_cards = board[:count]
+                tracker.street(engine)
+        return n
+    return run
+
+def case_import_core(n=10):
+    # 新しいインタープリタでコアのモジュールを import する (インタープリタの起動込みの回数/秒)
+    code = f"import {', '.join(CORE_MODULES)}"
+    directory = os.path.dirname(os.path.abspath(__file__))
+    def run():
+        for _ in range(n):
+            subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, check=True)
+        return n
+    return run
+
+def build_cases():
+    cases = {
+        "evaluate_7card": case_evaluate,
+        "evaluate_hand_cards": case_evaluate_cards,
+        "evaluate_batch_numpy": case_evaluate_batch,
+        "deck_build_deal": case_deck,
+        "equity_headsup_preflop": case_equity,
+    }
+    for players in range(2, 9):
+        cases[f"betting_round_{players}p"] = lambda p=players: case_betting_round(p)
+        cases[f"full_hand_{players}p"] = lambda p=players: case_full_hand(p)
+    cases["batch_full_hand_6p"] = lambda: case_batch_hand(6)
+    cases["tracker_streets_6p"] = lambda: case_tracker_streets(6)
+    cases["import_core"] = case_import_core
+    return cases
+
+def measure(factory, repeat, warmup):
+    run = factory()
+    for _ in range(warmup):
+        run()
+    rates = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = run()
+        rates.append(ops / (time.perf_counter() - start))
+    return {
+        "median": statistics.median(rates),
+        "mean": statistics.fmean(rates),
+        "stdev": statistics.stdev(rates) if len(rates) > 1 else 0.0,
+        "min": min(rates),
+        "max": max(rates),
+        "repeat": repeat,
+    }
+
+def compare(results, baseline, tolerance):
+    # 中央値がベースラインより tolerance 以上遅いケースを返す
+    slower = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio < 1 - tolerance:
+            slower.append((name, ratio))
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="評価・デッキ・ベッティング・1 ハンドの処理速度を測る")
+    parser.add_argument("--only", help="名前にこの文字列を含むケースだけ実行する")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--json", help="結果を書き出す JSON ファイル")
+    parser.add_argument("--compare", help="比較するベースラインの JSON ファイル")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="遅くなったとみなす割合 (既定 10%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, factory in build_cases().items():
+        if args.only and args.only not in name:
+            continue
+        result = measure(factory, args.repeat, args.warmup)
+        results[name] = result
+        spread = result["stdev"] / result["mean"] * 100 if result["mean"] else 0
+        print(f"{name:28s} {result['median']:14,.0f} /s  (±{spread:.1f}%)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "seed": SEED, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.tolerance)
+        for name, ratio in slower:
+            print(f"遅くなりました: {name} (ベースラインの {ratio:.0%})")
+        if slower:
+            sys.exit(1)
+        print("ベースラインからの性能低下はありません。")
+
+if __name__ == "__main__":
+    main()
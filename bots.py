@@ -0,0 +1,331 @@
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# --- ボットのプラグインと、ワーカープロセスでの実行 ---
+# ボットは「観測 (辞書) を受け取り (アクション, 額) を返す関数」。名前で読み込む:
+#   "equity" / "call" / "random"   … このファイルの BUILTIN_BOTS
+#   "module" / "module:function"   … import できるモジュールの関数 (関数名の省略時は decide)
+#   "path/to/bot.py[:function]"    … ファイルから読み込む
+# BotPool はボットを専用のワーカープロセスで動かすので、遅い・重いボットがゲームの進行を止めない。
+# 1 回の判断が time_limit 秒を超えたらワーカーを止めて作り直し、チェック (できなければフォールド) で進める。
+# 判断にかかった時間 (送ってから返るまで) はボットごとに記録し、stats() で比べられる。
+#
+# 観測: {"seat", "hand": [カード], "board": [カード], "stage", "pot", "current_bet", "to_call", "min_raise",
+#        "big_blind", "legal": [アクション], "players": [[名前, チップ, ベット, 降りた, オールイン]], "seed"}
+# カードは 0〜51 の整数コード (hand_history.py と同じ)。seed はボットの乱数用 (エンジンの乱数から作るので再現できる)。
+# アクションは fold / check / call / raise / all-in。raise の額はこのストリートの合計ベット額。
+
+DEFAULT_TIME_LIMIT = 1.0
+LOAD_TIMEOUT = 30.0   # ボットの読み込み (import) にかける時間の上限
+IDLE_TIMEOUT = 60.0   # 空いているワーカーを待つ時間の上限 (作り直しが続けて失敗しても止まらないように)
+RESPAWN_ATTEMPTS = 3  # ワーカーの作り直しを試す回数 (すべて失敗したらそのワーカーは使わない)
+EQUITY_SAMPLES = 2000
+
+def observation(engine, player):
+    seat = engine.players.index(player)
+    return {
+        "seat": seat, "hand": [c.code for c in player.hand], "board": [c.code for c in engine.community_cards],
+        "stage": engine.game_stage, "pot": engine.pot, "current_bet": engine.current_bet,
+        "to_call": min(engine.current_bet - player.bet, player.chips), "min_raise": engine.min_raise(),
+        "big_blind": engine.big_blind_amount, "legal": engine.legal_actions(),
+        "players": [[p.name, p.chips, p.bet, p.is_folded, p.is_all_in] for p in engine.players],
+        "seed": engine.rng.getrandbits(32),
+    }
+
+def default_action(observation):
+    return ('check' if observation["to_call"] <= 0 else 'fold'), 0
+
+def normalize(decision, observation):
+    # ボットの返り値を (アクション, 額) にそろえる。読めない返り値は既定のアクション
+    if isinstance(decision, dict):
+        decision = decision.get("action"), decision.get("amount", 0)
+    try:
+        action, amount = decision
+        amount = int(amount or 0)
+    except (TypeError, ValueError):
+        return default_action(observation)
+    if action == 'all-in':
+        me = observation["players"][observation["seat"]]
+        return 'raise', me[1] + me[2]
+    if action not in ('fold', 'check', 'call', 'raise'):
+        return default_action(observation)
+    return action, amount
+
+# --- 組み込みのボット ---
+
+def equity_bot(observation):
+    # PokerEngine.cpu_action と同じ考え方 (勝率とポットオッズ)
+    import numpy as np
+    import equity
+    opponents = sum(1 for i, p in enumerate(observation["players"]) if i != observation["seat"] and not p[3])
+    result = equity.estimate_equity(observation["hand"], observation["board"], opponents, samples=EQUITY_SAMPLES,
+                                    rng=np.random.default_rng(observation["seed"]))
+    win_rate = result["equity"]
+    pot_total = observation["pot"] + sum(p[2] for p in observation["players"])
+    if win_rate >= 1.6 / (opponents + 1) and 'raise' in observation["legal"]:
+        return 'raise', max(observation["min_raise"], observation["current_bet"] + pot_total // 2)
+    cost = observation["to_call"]
+    if cost <= 0:
+        return 'check', 0
+    return ('call', 0) if win_rate >= cost / (pot_total + cost) else ('fold', 0)
+
+def call_bot(observation):
+    return ('check' if observation["to_call"] <= 0 else 'call'), 0
+
+def random_bot(observation):
+    rng = random.Random(observation["seed"])
+    action = rng.choice(observation["legal"])
+    if action == 'raise':
+        return action, observation["min_raise"] + rng.randrange(3) * observation["big_blind"]
+    return action, 0
+
+BUILTIN_BOTS = {"equity": equity_bot, "call": call_bot, "random": random_bot}
+
+def load_bot(name):
+    # 名前からボットの関数を返す。見つからなければ ValueError
+    if name in BUILTIN_BOTS:
+        return BUILTIN_BOTS[name]
+    target, _, attr = name.partition(":")
+    attr = attr or "decide"
+    try:
+        if target.endswith(".py"):
+            spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(target))[0], target)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(target)
+    except (ImportError, OSError) as e:
+        raise ValueError(f"ボット {name!r} を読み込めません: {e}") from e
+    bot = getattr(module, attr, None)
+    if not callable(bot):
+        raise ValueError(f"ボット {name!r}: {target} に関数 {attr} がありません")
+    return bot
+
+# --- ワーカープロセス ---
+
+def _worker_main(conn, memory_limit):
+    # メッセージ: ("load", 名前, None) / ("decide", 名前, 観測) / None (終了)
+    # 返信: ("ok", (アクション, 額) または None, 秒数) / ("error", メッセージ, 秒数)
+    if memory_limit:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        except (ImportError, ValueError, OSError):
+            pass  # 制限できない OS では制限なしで動かす
+    loaded = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+        op, name, obs = message
+        start = time.perf_counter()
+        try:
+            bot = loaded.get(name)
+            if bot is None:
+                bot = loaded[name] = load_bot(name)
+            reply = normalize(bot(obs), obs) if op == "decide" else None
+            conn.send(("ok", reply, time.perf_counter() - start))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", time.perf_counter() - start))
+
+class _Worker:
+    __slots__ = ('process', 'conn')
+
+    def __init__(self, context, memory_limit):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, message, timeout):
+        # 返信を返す。timeout 秒以内に返らなければ None (このワーカーはもう使えない)
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            return None
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class _BotStats:
+    __slots__ = ('decisions', 'timeouts', 'errors', 'latencies')
+
+    def __init__(self):
+        self.decisions = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latencies = []
+
+class BotPool:
+    # ボットを workers 個のワーカープロセスで動かす。decide() は呼んだスレッドで結果を待ち、
+    # request() は Future を返す (GUI 用)。ワーカーは spawn で起動するので、呼び出し側のスレッドや Tk を引き継がない
+    __slots__ = ('context', 'memory_limit', 'time_limit', 'idle', 'workers', 'executor', 'lock', 'bot_stats', 'last_error', 'names')
+
+    def __init__(self, workers=2, time_limit=DEFAULT_TIME_LIMIT, memory_limit=None):
+        self.context = multiprocessing.get_context("spawn")
+        self.memory_limit = memory_limit
+        self.time_limit = time_limit
+        self.idle = queue.Queue()
+        self.workers = [_Worker(self.context, memory_limit) for _ in range(workers)]
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.executor = None
+        self.lock = threading.Lock()
+        self.bot_stats = {}
+        self.last_error = None
+        self.names = set()  # 読み込んだボット (作り直したワーカーにも先に読み込ませる)
+
+    def _replace(self, worker):
+        # 止まらなくなった・落ちたワーカーを別スレッドで作り直し、読み込み済みのボットを読み込ませてから空きに戻す
+        # (その間も他の空いているワーカーで判断を続けられる)
+        worker.kill()
+
+        def respawn():
+            for attempt in range(RESPAWN_ATTEMPTS):
+                fresh = None
+                try:
+                    fresh = _Worker(self.context, self.memory_limit)
+                    for name in list(self.names):
+                        if fresh.call(("load", name, None), LOAD_TIMEOUT) is None:
+                            raise TimeoutError(f"ボット {name} を {LOAD_TIMEOUT} 秒以内に読み込めませんでした")
+                except Exception as e:
+                    with self.lock:
+                        self.last_error = f"ワーカーを作り直せませんでした ({attempt + 1}/{RESPAWN_ATTEMPTS}): {e}"
+                    if fresh is not None:
+                        fresh.kill()
+                    continue
+                with self.lock:
+                    self.workers[self.workers.index(worker)] = fresh
+                self.idle.put(fresh)
+                return
+        threading.Thread(target=respawn, daemon=True).start()
+
+    def _call(self, message, timeout):
+        # (返信, 秒数)。返信は時間切れなら None。空いているワーカーが IDLE_TIMEOUT 秒待っても来なければエラー
+        try:
+            worker = self.idle.get(timeout=IDLE_TIMEOUT)
+        except queue.Empty:
+            return ("error", f"{IDLE_TIMEOUT} 秒待っても空いているワーカーがありません ({self.last_error})", 0.0), IDLE_TIMEOUT
+        start = time.perf_counter()
+        try:
+            reply = worker.call(message, timeout)
+        except (EOFError, OSError) as e:
+            reply = ("error", f"ワーカーが終了しました: {e}", None)
+        elapsed = time.perf_counter() - start
+        if reply is None or reply[2] is None:
+            self._replace(worker)
+        else:
+            self.idle.put(worker)
+        return reply, elapsed
+
+    def preload(self, names):
+        # すべてのワーカーでボットを読み込んでおく (最初の判断に読み込み時間を含めないため)。
+        # 読み込めなかったボットの 名前 → エラー を返す
+        failed = {}
+        for name in dict.fromkeys(names):
+            for _ in range(len(self.workers)):
+                reply, _ = self._call(("load", name, None), LOAD_TIMEOUT)
+                if reply is None or reply[0] == "error":
+                    failed[name] = reply[1] if reply else f"{LOAD_TIMEOUT} 秒以内に読み込めませんでした"
+                    break
+            else:
+                self.names.add(name)
+        return failed
+
+    def decide(self, name, obs):
+        # ボット name の判断 (アクション, 額)。時間切れ・エラーなら既定のアクション
+        reply, elapsed = self._call(("decide", name, obs), self.time_limit)
+        with self.lock:
+            stats = self.bot_stats.get(name)
+            if stats is None:
+                stats = self.bot_stats[name] = _BotStats()
+            stats.decisions += 1
+            stats.latencies.append(elapsed)
+            if reply is None:
+                stats.timeouts += 1
+            elif reply[0] == "error":
+                stats.errors += 1
+                self.last_error = f"{name}: {reply[1]}"
+        metrics.observe("bot_decision_seconds", elapsed)
+        if reply is None:
+            metrics.count("bot_timeouts")
+            return default_action(obs)
+        if reply[0] == "error":
+            metrics.count("bot_errors")
+            return default_action(obs)
+        return reply[1]
+
+    def request(self, name, obs):
+        # decide() を別スレッドで実行する Future を返す
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=len(self.workers))
+        return self.executor.submit(self.decide, name, obs)
+
+    def records(self):
+        # ボット名 → 判断回数・時間切れ・エラーと判断時間 (秒) のリスト。別のプールの記録とは merge_records でまとめる
+        with self.lock:
+            return {name: {"decisions": s.decisions, "timeouts": s.timeouts, "errors": s.errors, "latencies": list(s.latencies)}
+                    for name, s in self.bot_stats.items()}
+
+    def stats(self):
+        return latency_summary(self.records())
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        for worker in self.workers:
+            worker.close()
+
+def merge_records(total, records):
+    for name, record in records.items():
+        merged = total.setdefault(name, {"decisions": 0, "timeouts": 0, "errors": 0, "latencies": []})
+        for key in ("decisions", "timeouts", "errors", "latencies"):
+            merged[key] += record[key]
+    return total
+
+def latency_summary(records):
+    # ボット名 → 判断回数・時間切れ・エラーと、判断時間 (秒) の平均・中央値・99 パーセンタイル・最大
+    result = {}
+    for name, record in records.items():
+        latencies = sorted(record["latencies"])
+        n = len(latencies)
+        result[name] = {
+            "decisions": record["decisions"], "timeouts": record["timeouts"], "errors": record["errors"],
+            "mean": sum(latencies) / n if n else 0.0,
+            "p50": latencies[n // 2] if n else 0.0,
+            "p99": latencies[min(n - 1, int(n * 0.99))] if n else 0.0,
+            "max": latencies[-1] if n else 0.0,
+        }
+    return result
+
+def decider(pool, fallback=None):
+    # PokerEngine.play_hand に渡す decide。player.bot が設定された席はプール、それ以外は fallback (省略時は CPU)
+    def decide(engine, player):
+        if player.bot:
+            return pool.decide(player.bot, observation(engine, player))
+        return fallback(engine, player) if fallback else engine.cpu_action(player)
+    return decide
@@ -0,0 +1,87 @@
+import random
+
+# --- カードとデッキ ---
+# カードは 0〜51 の整数コード (スート番号 * 13 + ランク番号) で扱い、
+# 表示用の Card オブジェクトはコードごとに 1 つだけ事前生成して使い回す
+
+SUITS = ['♠', '♥', '♦', '♣']
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+RANK_VALUES = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14}
+
+class Card:
+    __slots__ = ('suit', 'rank', 'value', 'code')
+
+    def __init__(self, suit, rank):
+        self.suit = suit
+        self.rank = rank
+        self.value = RANK_VALUES[rank]
+        # 役判定用の整数コード (evaluator.py 参照)
+        self.code = SUITS.index(suit) * 13 + RANKS.index(rank)
+
+    def __str__(self):
+        return f"{self.suit}{self.rank}"
+
+    def __repr__(self):
+        return f"Card({self})"
+
+CARDS = tuple(Card(s, r) for s in SUITS for r in RANKS)
+
+# スターティングハンドの表記用 ('10' は 'T' と書く)
+RANK_CHARS = '23456789TJQKA'
+
+def hand_class(codes):
+    # 2 枚の手札をスートを区別しない 169 クラスの表記にする (例: 'AA', 'AKs', 'T9o')
+    a, b = codes
+    high, low = max(a % 13, b % 13), min(a % 13, b % 13)
+    if high == low:
+        return RANK_CHARS[high] * 2
+    return RANK_CHARS[high] + RANK_CHARS[low] + ('s' if a // 13 == b // 13 else 'o')
+
+def card_str(code):
+    return str(CARDS[code])
+
+def cards_mask(cards):
+    # カードの集合を 52bit のビットマスクに変換 (Card でも整数コードでも可)
+    mask = 0
+    for c in cards:
+        mask |= 1 << (c if isinstance(c, int) else c.code)
+    return mask
+
+def mask_codes(mask):
+    codes = []
+    while mask:
+        low = mask & -mask
+        codes.append(low.bit_length() - 1)
+        mask ^= low
+    return codes
+
+class Deck:
+    __slots__ = ('codes', 'position', 'rng')
+
+    def __init__(self, rng=None):
+        # rng: random.Random など (シミュレーションで再現性を持たせる場合)。省略時はグローバルの random
+        self.codes = bytearray(range(52))
+        self.rng = rng if rng is not None else random
+        self.shuffle()
+
+    def shuffle(self):
+        # 配り位置を先頭に戻してシャッフルする (新しいオブジェクトは作らない)
+        self.rng.shuffle(self.codes)
+        self.position = 0
+
+    def deal_code(self):
+        if self.position >= 52:
+            return None
+        code = self.codes[self.position]
+        self.position += 1
+        return code
+
+    def deal(self):
+        code = self.deal_code()
+        return CARDS[code] if code is not None else None
+
+    def remaining_codes(self):
+        return self.codes[self.position:]
+
+    def __len__(self):
+        return 52 - self.position
@@ -0,0 +1,254 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import equity
+import evaluator
+import snapshot
+from engine import PokerEngine, Player
+from search import hand_score
+
+# --- ヘッズアップ用の CFR 戦略表 ---
+# オフラインで Monte Carlo CFR (outcome sampling) を回して、ヘッズアップの平均戦略を表にする。
+# 状態は次の特徴に丸めた情報集合で表す (実際のどの局面からも同じ計算で対応する節点が決まる):
+#   ストリート, 手の強さのバケット, SB かどうか, コール額 / ポット の段階, 有効スタック / ポット の段階
+# アクションは fold / check・call / 最低レイズ (min_raise) / ポットサイズ / オールイン の 5 つに限る。
+# 作り方: python cfr.py train [--iterations 200000 --rounds 4]
+#
+# ファイル形式 (リトルエンディアン):
+#   ヘッダー: マジック b'CFR1', バージョン u16, バケット数 u16, 情報集合数 u32, 学習回数 u64
+#   戦略: u8[情報集合数][5] (確率 * 255、学習で一度も訪れなかった節点はすべて 0)
+
+MAGIC = b'CFR1'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cfr_strategy.bin")
+
+BUCKETS = 10
+FOLD, CALL, MIN_RAISE, POT_RAISE, ALL_IN = range(5)
+NUM_ACTIONS = 5
+TO_CALL_LEVELS = (0.35, 0.75, 1.5)  # コール額 / ポット の区切り (0 は別扱い)
+SPR_LEVELS = (1, 3, 8)              # 有効スタック / ポット の区切り
+NUM_KEYS = 4 * BUCKETS * 2 * (len(TO_CALL_LEVELS) + 2) * (len(SPR_LEVELS) + 1)
+EXPLORATION = 0.6  # 学習する側のサンプリングに混ぜる一様分布の割合
+
+_strategy = None
+_loaded = False
+
+# --- 抽象化 (学習と実行時で共通) ---
+
+def abstract_actions(state):
+    # [(番号, action, amount)]。額が同じになるレイズはまとめる
+    seat = state.current
+    to_call = state.to_call()
+    actions = [(CALL, 'check', 0)] if to_call <= 0 else [(FOLD, 'fold', 0), (CALL, 'call', 0)]
+    if state.chips[seat] > to_call:
+        stack = state.chips[seat] + state.bets[seat]
+        seen = set()
+        for index, amount in ((MIN_RAISE, state.min_raise()), (POT_RAISE, state.current_bet + state.pot_total() + to_call), (ALL_IN, stack)):
+            amount = min(amount, stack)
+            if amount > state.current_bet and amount not in seen:
+                seen.add(amount)
+                actions.append((index, 'raise', amount))
+    return actions
+
+def hand_strength(hole, board, rng, samples=64):
+    # ランダムな相手の手札 samples 通りに対して、今のボードで勝っている割合 (引き分けは半分)
+    dead = set(hole) | set(board)
+    unseen = np.array([c for c in range(52) if c not in dead], dtype=np.int64)
+    picks = unseen[rng.random((samples, len(unseen))).argsort(axis=1)[:, :2]]
+    opponents = equity.evaluate_batch(np.concatenate([picks, np.broadcast_to(np.array(board, dtype=np.int64), (samples, len(board)))], axis=1))
+    mine = evaluator.evaluate(list(hole) + list(board))
+    return float(((mine > opponents).sum() + (mine == opponents).sum() / 2) / samples)
+
+def hand_bucket(state, seat, rng, samples=64):
+    if not state.board:
+        # プリフロップは hand_score (ヘッズアップの勝率の近似、およそ 0.3〜0.86) を等分する
+        score = (hand_score(state, seat) - 0.3) / 0.56
+    else:
+        score = hand_strength(state.holes[seat], state.board, rng, samples)
+    return min(BUCKETS - 1, max(0, int(score * BUCKETS)))
+
+def _level(value, edges):
+    for i, edge in enumerate(edges):
+        if value <= edge:
+            return i
+    return len(edges)
+
+def info_key(state, seat, bucket):
+    pot = state.pot_total()
+    to_call = state.to_call()
+    to_call_level = 0 if to_call <= 0 else 1 + _level(to_call / pot, TO_CALL_LEVELS)
+    effective = min(state.chips[i] + state.bets[i] for i in state.live_seats())
+    spr_level = _level(effective / pot, SPR_LEVELS)
+    position = 1 if seat == state.small_blind_index else 0
+    return (((min(state.stage, 3) * BUCKETS + bucket) * 2 + position) * (len(TO_CALL_LEVELS) + 2) + to_call_level) * (len(SPR_LEVELS) + 1) + spr_level
+
+# --- 学習 ---
+
+def _regret_matching(regrets, legal):
+    positive = np.where(legal, np.maximum(regrets, 0), 0)
+    total = positive.sum()
+    return positive / total if total > 0 else legal / legal.sum()
+
+class Trainer:
+    __slots__ = ('regrets', 'strategy_sum', 'rng', 'engine', 'iterations')
+
+    def __init__(self, regrets=None, seed=None):
+        self.regrets = np.zeros((NUM_KEYS, NUM_ACTIONS)) if regrets is None else regrets.copy()
+        self.strategy_sum = np.zeros((NUM_KEYS, NUM_ACTIONS))
+        self.rng = np.random.default_rng(seed)
+        self.engine = PokerEngine([Player("A"), Player("B")], seed=seed)
+        self.iterations = 0
+
+    def deal(self):
+        # スタック (20〜100 BB) と SB の席を変えながら新しいハンドを配り、最初の手番の状態を返す
+        engine = self.engine
+        stack = int(self.rng.integers(20, 101)) * engine.big_blind_amount
+        engine.players = [Player("A", chips=stack), Player("B", chips=stack)]
+        engine.small_blind_index = int(self.rng.integers(2))
+        engine.start_hand()
+        engine.step()
+        return snapshot.from_engine(engine), stack
+
+    def run(self, iterations):
+        for _ in range(iterations):
+            state, stack = self.deal()
+            for player in (0, 1):
+                self._episode(state, player, stack, {}, 1.0, 1.0, 1.0)
+            self.iterations += 1
+
+    def _episode(self, state, player, stack, buckets, my_reach, opp_reach, sample_reach):
+        if state.is_terminal():
+            return (state.payoffs()[player] - stack) / self.engine.big_blind_amount
+        seat = state.current
+        bucket_key = (seat, state.stage)
+        if bucket_key not in buckets:
+            buckets[bucket_key] = hand_bucket(state, seat, self.rng)
+        key = info_key(state, seat, buckets[bucket_key])
+        actions = abstract_actions(state)
+        legal = np.zeros(NUM_ACTIONS)
+        for index, _, _ in actions:
+            legal[index] = 1.0
+        policy = _regret_matching(self.regrets[key], legal)
+        if seat == player:
+            sample_policy = EXPLORATION * legal / legal.sum() + (1 - EXPLORATION) * policy
+        else:
+            sample_policy = policy
+        index, action, amount = actions[self.rng.choice(len(actions), p=[sample_policy[i] for i, _, _ in actions])]
+
+        child = state.apply(action, amount)
+        if seat == player:
+            value = self._episode(child, player, stack, buckets, my_reach * policy[index], opp_reach,
+                                  sample_reach * sample_policy[index])
+        else:
+            value = self._episode(child, player, stack, buckets, my_reach, opp_reach * policy[index],
+                                  sample_reach * sample_policy[index])
+
+        child_values = np.zeros(NUM_ACTIONS)
+        child_values[index] = value / sample_policy[index]
+        estimate = (policy * child_values).sum()
+        if seat == player:
+            self.regrets[key] += (child_values - estimate) * legal * opp_reach / sample_reach
+        else:
+            self.strategy_sum[key] += opp_reach * policy / sample_reach
+        return estimate
+
+def _train_worker(regrets, iterations, seed):
+    trainer = Trainer(regrets, seed)
+    trainer.run(iterations)
+    return trainer.regrets - regrets, trainer.strategy_sum
+
+def train(iterations=200000, rounds=4, workers=None, seed=0, progress=None):
+    # rounds 回に分けて、各回は workers プロセスが同じ後悔値から学習し、差分を足し合わせる
+    workers = workers or os.cpu_count() or 1
+    regrets = np.zeros((NUM_KEYS, NUM_ACTIONS))
+    strategy_sum = np.zeros((NUM_KEYS, NUM_ACTIONS))
+    per_worker = max(1, iterations // (rounds * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for r in range(rounds):
+            futures = [executor.submit(_train_worker, regrets, per_worker, seed + r * workers + w) for w in range(workers)]
+            for future in futures:
+                delta, sums = future.result()
+                regrets += delta
+                strategy_sum += sums
+            if progress:
+                progress(r + 1, rounds)
+    return strategy_sum, per_worker * workers * rounds
+
+def save(strategy_sum, iterations, path=DEFAULT_PATH):
+    totals = strategy_sum.sum(axis=1, keepdims=True)
+    average = np.divide(strategy_sum, totals, out=np.zeros_like(strategy_sum), where=totals > 0)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BUCKETS, NUM_KEYS, iterations))
+        f.write(np.round(average * 255).astype(np.uint8).tobytes())
+    os.replace(tmp_path, path)
+
+# --- 実行時 ---
+
+def load(path=DEFAULT_PATH):
+    # 戦略表を読み込む。ファイルがなければ None
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        magic, version, buckets, keys, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or buckets != BUCKETS or keys != NUM_KEYS:
+            raise ValueError(f"{path}: 対応していない戦略表です (version {version})")
+        table = np.frombuffer(f.read(), dtype=np.uint8)
+    if table.size != NUM_KEYS * NUM_ACTIONS:
+        raise ValueError(f"{path}: ファイルサイズが一致しません")
+    return table.reshape(NUM_KEYS, NUM_ACTIONS)
+
+def get_strategy():
+    # 既定のファイルを初回だけ読み込む。壊れている・古い表は一度だけ警告して、表がないものとして扱う
+    global _strategy, _loaded
+    if not _loaded:
+        _loaded = True
+        try:
+            _strategy = load(DEFAULT_PATH)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"警告: CFR の戦略表を使えません ({e})", file=sys.stderr)
+            _strategy = None
+    return _strategy
+
+def cfr_action(engine, player, rng=None):
+    # ヘッズアップの現在の手番を戦略表から決める。表がない・2 人でない・未学習の節点なら None
+    strategy = get_strategy()
+    if strategy is None or len(engine.players) != 2:
+        return None
+    rng = rng or np.random.default_rng()
+    state = snapshot.from_engine(engine)
+    seat = engine.players.index(player)
+    row = strategy[info_key(state, seat, hand_bucket(state, seat, rng, samples=200))]
+    actions = abstract_actions(state)
+    weights = np.array([row[index] for index, _, _ in actions], dtype=np.float64)
+    if weights.sum() == 0:
+        return None
+    _, action, amount = actions[rng.choice(len(actions), p=weights / weights.sum())]
+    return action, amount
+
+def main():
+    parser = argparse.ArgumentParser(description="ヘッズアップ用 CFR 戦略表の学習")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    def report(done, total):
+        print(f"\r{done}/{total} ラウンド ({time.perf_counter() - start:.1f}s)", end="", file=sys.stderr, flush=True)
+    strategy_sum, iterations = train(args.iterations, args.rounds, args.workers, args.seed, report)
+    print(file=sys.stderr)
+    save(strategy_sum, iterations, args.out)
+    visited = int((strategy_sum.sum(axis=1) > 0).sum())
+    print(f"{iterations} 回学習し {args.out} に保存しました (訪れた情報集合 {visited}/{NUM_KEYS})")
+
+if __name__ == "__main__":
+    main()
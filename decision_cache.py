@@ -0,0 +1,122 @@
+import json
+import os
+from collections import OrderedDict
+import evaluator
+from cards import hand_class
+
+# --- LLM プレイヤーの意思決定キャッシュ ---
+# ゲーム状況を粗く丸めたキーで、モデルの回答を再利用する。
+# coarseness を上げるほどバケットが粗くなり、ヒット率は上がるが判断は大ざっぱになる。
+
+STAGE_CODES = {"pre-flop": "P", "flop": "F", "turn": "T", "river": "R"}
+
+def _bucket(value, edges):
+    for i, edge in enumerate(edges):
+        if value < edge:
+            return i
+    return len(edges)
+
+def board_texture(board_codes):
+    # ボードの特徴: ペアの有無、同スートの最大枚数、ストレートの可能性、最大ランクの帯
+    if not board_codes:
+        return "-"
+    ranks = sorted({c % 13 for c in board_codes})
+    suits = [c // 13 for c in board_codes]
+    paired = len(ranks) < len(board_codes)
+    max_suit = max(suits.count(s) for s in range(4))
+    # 5 ランク幅の窓に 3 枚以上あればストレートの可能性あり (A は 5 ハイ側にも数える)
+    span = ranks + ([-1] if 12 in ranks else [])
+    connected = any(sum(1 for r in span if low <= r <= low + 4) >= 3 for low in range(-1, 9))
+    high = ranks[-1] // 4  # 0: 2〜5, 1: 6〜9, 2: T〜K, 3: A
+    return f"{'p' if paired else 'u'}{max_suit}{'c' if connected else 'd'}{high}"
+
+def decision_key(game, player, coarseness=1):
+    # game は PokerEngine (players, community_cards, pot, current_bet など) を想定
+    hole = [c.code for c in player.hand]
+    board = [c.code for c in game.community_cards]
+    bb = game.big_blind_amount
+
+    if board:
+        # ポストフロップは手札クラスではなく「今できている役」とボードの形で判断する
+        category = evaluator.hand_category(evaluator.evaluate(hole + board))
+        hand_key = f"{category}:{board_texture(board)}"
+    else:
+        hand_key = hand_class(hole)
+        if coarseness >= 3:
+            hand_key = hand_key[:2]  # スーテッド / オフスートを区別しない
+
+    pot_total = game.pot + sum(p.bet for p in game.players)
+    amount_to_call = min(game.current_bet - player.bet, player.chips)
+    if amount_to_call <= 0:
+        odds_bucket = "x"
+    else:
+        buckets = max(2, 10 // coarseness)
+        odds_bucket = str(int(amount_to_call / (pot_total + amount_to_call) * buckets))
+
+    seats = len(game.players)
+    seat = (game.players.index(player) - game.small_blind_index) % seats
+    position = _bucket(seat / seats, (1 / 3, 2 / 3)) if coarseness >= 2 else seat
+    live = sum(1 for p in game.players if not p.is_folded)
+
+    stack_edges = (10, 25, 50, 100) if coarseness <= 1 else (15, 50)
+    stack_bucket = _bucket(player.chips / bb, stack_edges)
+
+    return "|".join(map(str, (STAGE_CODES.get(game.game_stage, "?"), hand_key, odds_bucket, position, live, stack_bucket)))
+
+class DecisionCache:
+    def __init__(self, maxsize=50000, path=None, coarseness=1):
+        self.maxsize = maxsize
+        self.path = path
+        self.coarseness = coarseness
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def key(self, game, player):
+        return decision_key(game, player, self.coarseness)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, game, action_data):
+        # レイズ額は状況に合わせて再計算できるよう、現在のベット額に対する倍率で保存する
+        entry = {"action": action_data.get("action")}
+        if entry["action"] == 'raise':
+            base = max(game.current_bet, game.big_blind_amount)
+            entry["ratio"] = round((action_data.get("amount") or 0) / base, 2)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def to_action_data(self, entry, game):
+        action_data = {"action": entry["action"]}
+        if "ratio" in entry:
+            action_data["amount"] = int(entry["ratio"] * max(game.current_bet, game.big_blind_amount))
+        return action_data
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0, "size": len(self.entries)}
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("coarseness") == self.coarseness:
+            self.entries = OrderedDict(data["entries"])
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"coarseness": self.coarseness, "entries": list(self.entries.items())}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,302 @@
+import random
+import evaluator
+import metrics
+from showdown import resolve_showdown
+from cards import Deck
+
+# --- ゲーム進行エンジン（表示・時間に依存しない状態機械） ---
+# PokerGame (GUI) はこのクラスの上に載り、フックとウェイトで表示を行う。
+# ヘッドレスで回す場合は play_hand() を呼ぶだけでよい。
+
+STAGES = ("pre-flop", "flop", "turn", "river", "showdown")
+
+# step() の戻り値
+ACTION = "action"              # 現在のプレイヤーの行動待ち
+BETTING_OVER = "betting_over"  # ベッティングラウンド終了 → end_betting_round()
+ROUND_OVER = "round_over"      # 残り 1 人以下 → end_round()
+
+class Player:
+    __slots__ = ('name', 'hand', 'chips', 'bet', 'contributed', 'has_acted', 'is_folded', 'is_all_in', 'is_cpu', 'is_gemini', 'bot', 'show_hand')
+
+    def __init__(self, name, chips=1000, is_cpu=False, is_gemini=False, bot=None):
+        self.name = name
+        self.hand = []
+        self.chips = chips
+        self.bet = 0
+        # このハンドでポットに出した合計 (サイドポットの計算用)
+        self.contributed = 0
+        self.has_acted = False
+        self.is_folded = False
+        self.is_all_in = False
+        self.is_cpu = is_cpu
+        self.is_gemini = is_gemini
+        # プラグインのボット (bots.py の名前)。None なら is_cpu / is_gemini / 人間
+        self.bot = bot
+        # GUI表示用の手札公開フラグ
+        self.show_hand = False
+
+class PokerEngine:
+    __slots__ = ('players', 'deck', 'community_cards', 'pot', 'current_bet', 'current_player_index', 'game_stage',
+                 'game_in_progress', 'small_blind_index', 'big_blind_index', 'small_blind_amount', 'big_blind_amount',
+                 'cpu_samples', 'cpu_time_budget', 'equity_cache', 'rng', 'recorder', 'tracker')
+
+    def __init__(self, players=None, small_blind_amount=10, big_blind_amount=20, seed=None):
+        # seed を指定するとシャッフルと CPU の判断がすべて再現可能になる
+        self.rng = random.Random(seed)
+        self.players = list(players) if players else []
+        self.deck = Deck(self.rng)
+        self.community_cards = []
+        self.pot = 0
+        self.current_bet = 0
+        self.current_player_index = 0
+        self.game_stage = "pre-flop"
+        self.game_in_progress = False
+        self.small_blind_index = -1
+        self.big_blind_index = -1
+        self.small_blind_amount = small_blind_amount
+        self.big_blind_amount = big_blind_amount
+        # CPU の勝率計算の予算 (サンプル数と秒数の早い方で打ち切る)。再現性が必要なら秒数は None にする
+        self.cpu_samples = 20000
+        self.cpu_time_budget = 0.05
+        # ハンド中の勝率の計算結果 ((スート正規化したキー, 相手の人数) → 勝率)。同じ局面で何度も判断するときに使い回す
+        self.equity_cache = {}
+        # ハンド履歴の記録先 (hand_history.HandRecorder)。None なら記録しない
+        self.recorder = None
+        # 役・アウツの追跡 (hand_tracker.HandTracker)。None なら追跡せず、勝敗は end_round でまとめて評価する
+        self.tracker = None
+
+    # --- 表示層向けのフック (ヘッドレス実行では何もしない) ---
+
+    def on_blind(self, player, amount, is_big):
+        pass
+
+    def on_action(self, player, action, amount):
+        pass
+
+    def on_street(self):
+        pass
+
+    def on_round_end(self, result):
+        pass
+
+    # --- 状態の問い合わせ ---
+
+    def min_raise(self):
+        return self.current_bet * 2 if self.current_bet > 0 else self.big_blind_amount
+
+    def legal_actions(self):
+        player = self.players[self.current_player_index]
+        amount_to_call = self.current_bet - player.bet
+        actions = ['fold', 'check' if amount_to_call <= 0 else 'call']
+        if player.chips > amount_to_call:
+            actions.append('raise')
+        return actions
+
+    def is_hand_over(self):
+        return not self.game_in_progress
+
+    # --- 状態遷移 ---
+
+    def start_hand(self):
+        # 新しいハンドを配る。プレイ可能なプレイヤーが 2 人未満なら False
+        self.players = [p for p in self.players if p.chips > 0]
+        if len(self.players) < 2:
+            self.game_in_progress = False
+            return False
+
+        self.game_in_progress = True
+        metrics.start_hand_profile()
+        self.deck.shuffle()
+        self.community_cards = []
+        self.equity_cache.clear()
+        self.pot = 0
+        self.current_bet = 0
+        self.game_stage = "pre-flop"
+
+        for player in self.players:
+            player.hand = [self.deck.deal(), self.deck.deal()]
+            player.bet = 0
+            player.contributed = 0
+            player.has_acted = False
+            player.is_folded = False
+            player.is_all_in = False
+            player.show_hand = not player.is_cpu and not player.is_gemini and player.bot is None
+        self.small_blind_index = (self.small_blind_index + 1) % len(self.players)
+        self.big_blind_index = (self.small_blind_index + 1) % len(self.players)
+        if self.recorder is not None: self.recorder.begin_hand(self)
+        if self.tracker is not None: self.tracker.begin_hand(self)
+        self._post_blind(self.players[self.small_blind_index], self.small_blind_amount, False)
+        self._post_blind(self.players[self.big_blind_index], self.big_blind_amount, True)
+
+        self.current_bet = self.big_blind_amount
+        self.current_player_index = (self.big_blind_index + 1) % len(self.players)
+        return True
+
+    def _post_blind(self, player, amount, is_big):
+        # ブラインドはベットとして置き、ポットにはベッティングラウンド終了時にまとめて入れる
+        player.bet = min(amount, player.chips)
+        player.chips -= player.bet
+        player.contributed += player.bet
+        if player.chips == 0: player.is_all_in = True
+        if self.recorder is not None: self.recorder.blind(self.players.index(player), player.bet)
+        self.on_blind(player, player.bet, is_big)
+
+    def start_betting_round(self):
+        if self.game_stage != "pre-flop":
+            self.current_player_index = self.small_blind_index % len(self.players)
+            self.current_bet = 0
+            for p in self.players:
+                if not p.is_folded and not p.is_all_in:
+                    p.has_acted = False
+                p.bet = 0
+
+    def step(self):
+        # 次に必要な処理を返す。行動不能なプレイヤーの手番はここで飛ばす
+        active_players = [p for p in self.players if not p.is_folded]
+        if len(active_players) <= 1:
+            return ROUND_OVER
+
+        can_act = [p for p in active_players if not p.is_all_in]
+        if all(p.has_acted and p.bet == self.current_bet for p in can_act):
+            return BETTING_OVER
+        # 相手が全員オールインなら、コール額を払い終えた最後の 1 人はもう行動しない
+        if len(can_act) == 1 and can_act[0].bet >= self.current_bet:
+            return BETTING_OVER
+
+        current_player = self.players[self.current_player_index]
+        while current_player.is_folded or current_player.is_all_in:
+            self.current_player_index = (self.current_player_index + 1) % len(self.players)
+            current_player = self.players[self.current_player_index]
+        return ACTION
+
+    def apply_action(self, action, amount=0):
+        player = self.players[self.current_player_index]
+        amount_to_call = self.current_bet - player.bet
+        # 不正なアクションは最も近い合法手に読み替える
+        if action == 'raise' and amount <= self.current_bet and amount < player.chips + player.bet: action = 'call'
+        if action == 'check' and amount_to_call > 0: action = 'call'
+        elif action == 'call' and amount_to_call <= 0: action = 'check'
+
+        if action in ('fold', 'check'):
+            amount = 0
+            if action == 'fold': player.is_folded = True
+        elif action == 'call':
+            amount = min(amount_to_call, player.chips)
+            player.chips -= amount
+            player.bet += amount
+            player.contributed += amount
+            if player.chips == 0: player.is_all_in = True
+        elif action == 'raise':
+            if amount >= player.chips + player.bet:
+                amount = player.chips + player.bet
+                player.is_all_in = True
+            player.chips -= amount - player.bet
+            player.contributed += amount - player.bet
+            player.bet = amount
+            if player.bet > self.current_bet:
+                self.current_bet = player.bet
+                for p in self.players:
+                    if p is not player and not p.is_folded and not p.is_all_in:
+                        p.has_acted = False
+
+        player.has_acted = True
+        if self.recorder is not None: self.recorder.action(self.current_player_index, action, amount)
+        self.on_action(player, action, amount)
+        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+
+    def end_betting_round(self):
+        # ベットをポットに集め、次のストリートを配る。ショーダウンに進む場合は False
+        for p in self.players:
+            self.pot += p.bet
+            p.bet = 0
+
+        if self.game_stage == "pre-flop":
+            self.game_stage = "flop"
+            self.community_cards.extend([self.deck.deal() for _ in range(3)])
+        elif self.game_stage in ("flop", "turn"):
+            self.game_stage = "turn" if self.game_stage == "flop" else "river"
+            self.community_cards.append(self.deck.deal())
+        else:
+            self.game_stage = "showdown"
+            return False
+
+        if self.tracker is not None: self.tracker.street(self)
+        if self.recorder is not None: self.recorder.street(self)
+        self.on_street()
+        return True
+
+    @metrics.timed("evaluate_hand")
+    def evaluate_hand(self, hand):
+        # (強さ, 役カテゴリ) を返す。強さは大きいほど強い
+        return evaluator.evaluate_hand([c.code for c in hand])
+
+    @metrics.timed("end_round")
+    def end_round(self):
+        self.pot += sum(p.bet for p in self.players)
+        for p in self.players: p.bet = 0
+
+        strengths = self.tracker.final_strengths(self) if self.tracker is not None else None
+        result = resolve_showdown(self.players, self.community_cards, self.small_blind_index, self.pot, strengths)
+        for player, amount in result["payouts"].items():
+            player.chips += amount
+
+        self.game_in_progress = False
+        if self.recorder is not None: self.recorder.end_hand(self, result)
+        self.on_round_end(result)
+        metrics.count("hands")
+        metrics.stop_hand_profile()
+        return result
+
+    # --- CPU の意思決定 ---
+
+    @metrics.timed("cpu_action")
+    def cpu_action(self, player):
+        # 勝率とポットオッズを比べてフォールド / コール、勝率が十分高ければレイズ。
+        # 勝率計算 (numpy) はルールだけを使う場合に読み込まずに済むよう、初めて呼ばれたときに読み込む
+        import numpy as np
+        import equity
+        import isomorphism
+        import preflop_table
+        amount_to_call = self.current_bet - player.bet
+        opponents = sum(1 for p in self.players if p is not player and not p.is_folded)
+        # プリフロップは勝率表があれば引くだけで済ませる
+        win_rate = preflop_table.preflop_equity(player.hand, opponents) if not self.community_cards else None
+        if win_rate is None:
+            key = (isomorphism.canonical_key(player.hand, self.community_cards), opponents)
+            win_rate = self.equity_cache.get(key)
+            if win_rate is None:
+                result = equity.estimate_equity([c.code for c in player.hand], [c.code for c in self.community_cards], opponents,
+                                                samples=self.cpu_samples, time_budget=self.cpu_time_budget,
+                                                rng=np.random.default_rng(self.rng.getrandbits(64)))
+                win_rate = self.equity_cache[key] = result["equity"]
+            else:
+                metrics.count("equity_cache_hits")
+        pot_total = self.pot + sum(p.bet for p in self.players)
+
+        if win_rate >= 1.6 / (opponents + 1) and player.chips > amount_to_call:
+            return 'raise', max(self.min_raise(), self.current_bet + pot_total // 2)
+        if amount_to_call <= 0:
+            return 'check', 0
+        cost = min(amount_to_call, player.chips)
+        pot_odds = cost / (pot_total + cost)
+        return ('call', 0) if win_rate >= pot_odds else ('fold', 0)
+
+    # --- ヘッドレス実行 ---
+
+    def play_hand(self, decide=None):
+        # 1 ハンドを最後まで進める。decide(engine, player) -> (action, amount)、省略時は CPU ロジック
+        if not self.start_hand():
+            return None
+        while True:
+            status = self.step()
+            if status == ACTION:
+                player = self.players[self.current_player_index]
+                action, amount = decide(self, player) if decide else self.cpu_action(player)
+                self.apply_action(action, amount)
+            elif status == BETTING_OVER:
+                if self.end_betting_round():
+                    self.start_betting_round()
+                else:
+                    return self.end_round()
+            else:
+                return self.end_round()
@@ -0,0 +1,107 @@
+import time
+import numpy as np
+import evaluator
+import table_cache
+
+# --- モンテカルロ勝率計算（NumPy による一括処理） ---
+# カードは evaluator.py と同じ 0〜51 の整数コード。
+# 相手の手札と残りのボードをまとめてサンプリングし、評価も配列単位で行う。
+
+_CARD_PRIMES = np.array(evaluator.CARD_PRIMES, dtype=np.int64)
+_flush_values = None
+_product_keys = None
+_product_values = None
+
+
+def _load_tables():
+    # 表はディスクキャッシュを np.memmap で開く (ワーカープロセス間で同じページを共有する)。使えなければ計算する
+    global _flush_values, _product_keys, _product_values
+    tables = table_cache.memmap_tables()
+    if tables is not None:
+        _flush_values, _product_keys, _product_values = tables
+        return
+    flush_table, rank_table = evaluator.tables()
+    products = sorted(rank_table)
+    _flush_values = np.array(flush_table, dtype=np.int32)
+    _product_keys = np.array(products, dtype=np.int64)
+    _product_values = np.array([rank_table[p] for p in products], dtype=np.int32)
+
+
+def evaluate_batch(codes):
+    # codes: 形状 (..., 5〜7) の整数配列 → 形状 (...) の強さ (evaluator.evaluate と同じ値)
+    if _flush_values is None:
+        _load_tables()
+    codes = np.asarray(codes, dtype=np.int64)
+    product = _CARD_PRIMES[codes].prod(axis=-1)
+    strength = _product_values[np.searchsorted(_product_keys, product)]
+
+    # 各カードは重複しないので、ビットの和は論理和と等しい
+    mask = np.left_shift(np.int64(1), codes).sum(axis=-1)
+    flush = _flush_values[mask & 0x1FFF]
+    for shift in (13, 26, 39):
+        np.maximum(flush, _flush_values[(mask >> shift) & 0x1FFF], out=flush)
+    return np.where(flush > 0, flush, strength)
+
+
+def _sample_cards(rng, remaining, batch, count):
+    # 残りのデッキから重複なしで count 枚を batch 行ぶん引く。
+    # 各行で先頭 count 枚だけのフィッシャー–イェーツを列単位でまとめて行う
+    n = len(remaining)
+    decks = np.tile(remaining.astype(np.int8), (batch, 1))
+    rows = np.arange(batch)
+    draws = (rng.random((count, batch)) * np.arange(n, n - count, -1)[:, None]).astype(np.intp)
+    for j in range(count):
+        r = draws[j] + j
+        picked = decks[rows, r]
+        decks[rows, r] = decks[:, j]
+        decks[:, j] = picked
+    return decks[:, :count].astype(np.int64)
+
+
+def estimate_equity(hole, board=(), opponents=1, samples=20000, time_budget=None, batch_size=8192, rng=None):
+    # hole: 自分の手札 2 枚, board: 公開済みのコミュニティカード 0〜5 枚
+    # samples 回のランアウトか time_budget 秒のどちらか早い方で打ち切る
+    if rng is None:
+        rng = np.random.default_rng()
+    hole = list(hole)
+    board = list(board)
+    dead = set(hole) | set(board)
+    remaining = np.array([c for c in range(52) if c not in dead], dtype=np.int64)
+    board_missing = 5 - len(board)
+    per_sample = opponents * 2 + board_missing
+
+    known = np.array(hole + board, dtype=np.int64)
+    known_board = np.array(board, dtype=np.int64)
+    deadline = time.perf_counter() + time_budget if time_budget else None
+
+    wins = ties = 0
+    share = 0.0
+    done = 0
+    while done < samples:
+        batch = min(batch_size, samples - done)
+        drawn = _sample_cards(rng, remaining, batch, per_sample)
+        runout = drawn[:, :board_missing]
+
+        hero = evaluate_batch(np.concatenate([np.broadcast_to(known, (batch, len(known))), runout], axis=1))
+        if opponents:
+            full_board = np.concatenate([np.broadcast_to(known_board, (batch, len(board))), runout], axis=1)
+            opp_holes = drawn[:, board_missing:].reshape(batch, opponents, 2)
+            opp_cards = np.concatenate([opp_holes, np.broadcast_to(full_board[:, None, :], (batch, opponents, 5))], axis=2)
+            opp = evaluate_batch(opp_cards)
+            best = opp.max(axis=1)
+            tied = (opp == hero[:, None]).sum(axis=1)
+            win = hero > best
+            tie = hero == best
+        else:
+            win = np.ones(batch, dtype=bool)
+            tie = np.zeros(batch, dtype=bool)
+            tied = np.zeros(batch, dtype=np.int64)
+
+        wins += int(win.sum())
+        ties += int(tie.sum())
+        share += float(win.sum()) + float((tie / (tied + 1)).sum())
+        done += batch
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+
+    return {"win": wins / done, "tie": ties / done, "equity": share / done, "samples": done}
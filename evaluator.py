@@ -0,0 +1,163 @@
+import itertools
+
+# --- 役判定（ルックアップテーブル方式） ---
+# カードは 0〜51 の整数で表す: スート番号 * 13 + ランク番号 (ランク番号 0 = '2', 12 = 'A')
+# 役の強さは 1 つの整数で、大きいほど強い: 役カテゴリ << 20 | 比較用ランク(4bit x 5)
+
+HIGH_CARD, ONE_PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH, ROYAL_FLUSH = range(10)
+HAND_NAMES = ["ハイカード", "ワンペア", "ツーペア", "スリーカード", "ストレート", "フラッシュ", "フルハウス", "フォーカード", "ストレートフラッシュ", "ロイヤルフラッシュ"]
+
+CATEGORY_SHIFT = 20
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+CARD_PRIMES = tuple(PRIMES[c % 13] for c in range(52))
+WHEEL_MASK = 0b1000000001111  # A-2-3-4-5
+
+# テーブルは初回の評価時に table_cache.py のディスクキャッシュから読み込む (なければ計算して保存する)
+_flush_table = None
+_rank_table = None
+
+
+def _pack(category, ranks):
+    value = category
+    for r in ranks:
+        value = (value << 4) | r
+    return value << (4 * (5 - len(ranks)))
+
+
+def _straight_high(mask):
+    for top in range(12, 3, -1):
+        window = 0b11111 << (top - 4)
+        if mask & window == window:
+            return top
+    if mask & WHEEL_MASK == WHEEL_MASK:
+        return 3
+    return None
+
+
+def _score_flush(mask):
+    top = _straight_high(mask)
+    if top is not None:
+        return _pack(ROYAL_FLUSH if top == 12 else STRAIGHT_FLUSH, [top])
+    ranks = [r for r in range(12, -1, -1) if mask >> r & 1]
+    return _pack(FLUSH, ranks[:5])
+
+
+def _score_counts(counts):
+    # フラッシュを含まない 5〜7 枚のランク構成から最強の 5 枚を求める
+    order = [r for r in range(12, -1, -1) if counts[r]]
+    quads = [r for r in order if counts[r] == 4]
+    trips = [r for r in order if counts[r] == 3]
+    pairs = [r for r in order if counts[r] == 2]
+
+    if quads:
+        q = quads[0]
+        return _pack(FOUR_OF_A_KIND, [q, next(r for r in order if r != q)])
+    if trips and (len(trips) >= 2 or pairs):
+        t = trips[0]
+        return _pack(FULL_HOUSE, [t, max(trips[1:] + pairs)])
+    mask = 0
+    for r in order:
+        mask |= 1 << r
+    top = _straight_high(mask)
+    if top is not None:
+        return _pack(STRAIGHT, [top])
+    if trips:
+        t = trips[0]
+        return _pack(THREE_OF_A_KIND, [t] + [r for r in order if r != t][:2])
+    if len(pairs) >= 2:
+        p1, p2 = pairs[0], pairs[1]
+        return _pack(TWO_PAIR, [p1, p2, next(r for r in order if r != p1 and r != p2)])
+    if pairs:
+        p = pairs[0]
+        return _pack(ONE_PAIR, [p] + [r for r in order if r != p][:3])
+    return _pack(HIGH_CARD, order[:5])
+
+
+def compute_tables():
+    # (フラッシュ表, 素数積 → 強さ) を一から計算する (1 秒ほどかかる)
+    flush_table = [0] * 8192
+    for mask in range(8192):
+        if bin(mask).count("1") >= 5:
+            flush_table[mask] = _score_flush(mask)
+
+    # 素数積 → 強さ (5〜7 枚、同ランク最大 4 枚)
+    rank_table = {}
+    for n in (5, 6, 7):
+        for combo in itertools.combinations_with_replacement(range(13), n):
+            counts = [0] * 13
+            product = 1
+            for r in combo:
+                counts[r] += 1
+                product *= PRIMES[r]
+            if max(counts) <= 4:
+                rank_table[product] = _score_counts(counts)
+    return flush_table, rank_table
+
+
+def _build_tables():
+    global _flush_table, _rank_table
+    import table_cache
+    _flush_table, _rank_table = table_cache.load_tables()
+
+
+def _lookup(mask, product):
+    flush_table = _flush_table
+    for shift in (0, 13, 26, 39):
+        value = flush_table[(mask >> shift) & 0x1FFF]
+        if value:
+            return value
+    return _rank_table[product]
+
+
+def evaluate(cards):
+    # 5〜7 枚のカード(整数)を 1 パスで評価し、強さの整数を返す
+    if _rank_table is None:
+        _build_tables()
+    mask = 0
+    product = 1
+    for c in cards:
+        mask |= 1 << c
+        product *= CARD_PRIMES[c]
+    return _lookup(mask, product)
+
+
+def board_key(board):
+    # ボード部分のビットマスクと素数積。複数プレイヤーを同じボードで評価するときに一度だけ計算する
+    mask = 0
+    product = 1
+    for c in board:
+        mask |= 1 << c
+        product *= CARD_PRIMES[c]
+    return mask, product
+
+
+def evaluate_with_board(hole, key):
+    if _rank_table is None:
+        _build_tables()
+    mask, product = key
+    for c in hole:
+        mask |= 1 << c
+        product *= CARD_PRIMES[c]
+    return _lookup(mask, product)
+
+
+def tables():
+    # (フラッシュ表, 素数積表) を返す。一括評価 (equity.py) などが配列に変換して使う
+    if _rank_table is None:
+        _build_tables()
+    return _flush_table, _rank_table
+
+
+def hand_category(strength):
+    return strength >> CATEGORY_SHIFT
+
+
+def evaluate_hand(cards):
+    strength = evaluate(cards)
+    return strength, strength >> CATEGORY_SHIFT
+
+
+def best_five(cards):
+    # 表示用: 最強となる 5 枚の組み合わせ (強さに寄与する順ではなくランク順)
+    best = max(itertools.combinations(cards, 5), key=evaluate)
+    return sorted(best, key=lambda c: c % 13, reverse=True)
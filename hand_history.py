@@ -0,0 +1,143 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from cards import Deck
+from engine import PokerEngine, Player
+
+# --- ハンド履歴の記録と再生 ---
+# 1 ハンド = JSONL の 1 行。カードは 0〜51 の整数コードで保存する:
+# {"hand": 通し番号, "sb": SB の席, "blinds": [SB, BB], "players": [[名前, 開始時チップ], ...],
+#  "cards": 配った順のカード, "events": [["b", 席, 額] | ["a", 席, アクション, 額] | ["s", ステージ, [カード]]],
+#  "pot": ポット, "winners": [席], "chips": [終了時チップ]}
+# 書き込みは専用スレッドで行うので、ゲーム側は辞書を組み立ててキューに入れるだけ。
+
+class HandRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.hands = 0
+        self.current = None
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    # --- PokerEngine から呼ばれる ---
+
+    def begin_hand(self, engine):
+        self.current = {
+            "hand": self.hands,
+            "sb": engine.small_blind_index,
+            "blinds": [engine.small_blind_amount, engine.big_blind_amount],
+            "players": [[p.name, p.chips + p.bet] for p in engine.players],
+            "events": [],
+        }
+
+    def blind(self, seat, amount):
+        self.current["events"].append(["b", seat, amount])
+
+    def action(self, seat, action, amount):
+        self.current["events"].append(["a", seat, action, amount])
+
+    def street(self, engine):
+        self.current["events"].append(["s", engine.game_stage, [c.code for c in engine.community_cards]])
+
+    def end_hand(self, engine, result):
+        record = self.current
+        record["cards"] = list(engine.deck.codes[:engine.deck.position])
+        record["pot"] = result["pot"]
+        record["winners"] = [engine.players.index(p) for p in result["winners"]]
+        record["chips"] = [p.chips for p in engine.players]
+        self.current = None
+        self.hands += 1
+        self._queue.put(record)
+
+    # --- 書き込みスレッド ---
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                # まとめて届いた分は続けて書き、キューが空になったらフラッシュする
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+
+def read_hands(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class ReplayDeck(Deck):
+    # 記録された順にカードを配るデッキ (未使用分は残りのカードで埋める)
+    __slots__ = ('recorded',)
+
+    def __init__(self, recorded):
+        self.recorded = recorded
+        super().__init__()
+
+    def shuffle(self):
+        used = set(self.recorded)
+        self.codes = bytearray(self.recorded + [c for c in range(52) if c not in used])
+        self.position = 0
+
+class ReplayError(ValueError):
+    # 記録どおりに再生できない (手番が違う、記録されたアクションが足りない)
+    pass
+
+def replay_hand(record, engine_class=PokerEngine):
+    # 記録からエンジンを再構築し、記録されたアクションで 1 ハンドを進める。結果が記録と一致すれば True。
+    # 記録どおりに進められなければ ReplayError
+    small_blind, big_blind = record["blinds"]
+    engine = engine_class([Player(name, chips=chips) for name, chips in record["players"]],
+                          small_blind_amount=small_blind, big_blind_amount=big_blind)
+    engine.deck = ReplayDeck(record["cards"])
+    engine.small_blind_index = (record["sb"] - 1) % len(record["players"])
+    actions = iter([e for e in record["events"] if e[0] == "a"])
+
+    def decide(engine, player):
+        recorded = next(actions, None)
+        if recorded is None:
+            raise ReplayError(f"hand {record['hand']}: 記録されたアクションが足りません")
+        _, seat, action, amount = recorded
+        if seat != engine.current_player_index:
+            raise ReplayError(f"hand {record['hand']}: 手番が記録と一致しません (記録 {seat}, 再生 {engine.current_player_index})")
+        return action, amount
+
+    result = engine.play_hand(decide)
+    return (result["pot"] == record["pot"]
+            and [engine.players.index(p) for p in result["winners"]] == record["winners"]
+            and [p.chips for p in engine.players] == record["chips"])
+
+def replay(path):
+    hands = mismatches = 0
+    for record in read_hands(path):
+        hands += 1
+        try:
+            matched = replay_hand(record)
+        except ReplayError as e:
+            print(e, file=sys.stderr)
+            matched = False
+        if not matched:
+            mismatches += 1
+    return hands, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="ハンド履歴を再生して結果を検証する")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    hands, mismatches = replay(args.path)
+    elapsed = time.perf_counter() - start
+    print(f"{hands} ハンドを再生 ({elapsed:.2f}s, {hands / elapsed if elapsed else 0:.0f} ハンド/秒), 不一致 {mismatches}")
+
+if __name__ == "__main__":
+    main()
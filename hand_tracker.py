@@ -0,0 +1,171 @@
+import random
+import evaluator
+
+# --- ハンド中の役・アウツ・勝率の追跡 (ストリートごとの差分更新) ---
+# 各席の (ビットマスク, 素数積) をボードのカードが増えた分だけ伸ばし、さらに「次に来うるカードそれぞれでの強さ」
+# (先読み表) を持っておく。次のストリートのカードは 1 枚なので、ターンとリバーの強さは先読み表を引くだけで決まり、
+# アウツも同じ表から数えられる。ターンの先読み表はリバーまでの全ランアウトの
+# 強さそのものなので、ターン以降の勝率は評価し直さずに求まる。
+# アウツは次の 1 枚で役が上がり、かつその役がボードとその 1 枚だけでできる役より上になるカード
+# (ボードにペアを作るだけのカードはだれにとっても同じなので数えない)。
+# PokerEngine.tracker に入れると start_hand / end_betting_round から呼ばれ、end_round はリバーで求めた強さを
+# そのまま勝敗の判定に使う。更新は表を作り直して差し替えるので、別スレッドで win_probabilities() を計算している
+# 間に次のストリートへ進んでも、読みかけの表は変わらない。
+
+PREFLOP_SAMPLES = 2000
+
+def _extend(key, cards):
+    mask, product = key
+    for c in cards:
+        mask |= 1 << c
+        product *= evaluator.CARD_PRIMES[c]
+    return mask, product
+
+def _lookahead(key):
+    # 次のカード → 強さ (key に含まれないすべてのカード)
+    mask = key[0]
+    return {c: evaluator.evaluate_with_board((c,), key) for c in range(52) if not mask >> c & 1}
+
+def _category(hole, strength):
+    if strength is None:  # プリフロップはポケットペアかどうかだけ
+        return evaluator.ONE_PAIR if hole[0] % 13 == hole[1] % 13 else evaluator.HIGH_CARD
+    return strength >> evaluator.CATEGORY_SHIFT
+
+def _board_category(cards):
+    # ボードだけ (4〜5 枚) の役カテゴリ。4 枚ではフラッシュ・ストレートはできないので同じランクの枚数で決まる
+    if len(cards) >= 5:
+        return evaluator.evaluate(cards) >> evaluator.CATEGORY_SHIFT
+    ranks = [c % 13 for c in cards]
+    counts = sorted((ranks.count(r) for r in set(ranks)), reverse=True)
+    if counts[0] == 4:
+        return evaluator.FOUR_OF_A_KIND
+    if counts[0] == 3:
+        return evaluator.THREE_OF_A_KIND
+    if counts[0] == 2:
+        return evaluator.TWO_PAIR if counts[1] == 2 else evaluator.ONE_PAIR
+    return evaluator.HIGH_CARD
+
+def _summary(hole, board, strength, lookahead):
+    category = _category(hole, strength)
+    outs = []
+    if lookahead:
+        board = list(board)
+        for c, s in lookahead.items():
+            new = s >> evaluator.CATEGORY_SHIFT
+            if new > category and new > _board_category(board + [c]):
+                outs.append(c)
+        outs.sort()
+    return {"strength": strength, "category": category, "hand_name": evaluator.HAND_NAMES[category], "outs": outs}
+
+def hand_summary(hole, board):
+    # 追跡していない手札とボードの組 (先読みの仮の状態など) を一から計算する
+    key = evaluator.board_key(list(hole) + list(board))
+    strength = evaluator.evaluate_with_board((), key) if len(board) >= 3 else None
+    return _summary(hole, board, strength, _lookahead(key) if 3 <= len(board) < 5 else None)
+
+def _add_shares(totals, live, strengths):
+    best = max(strengths)
+    winners = [seat for seat, s in zip(live, strengths) if s == best]
+    for seat in winners:
+        totals[seat] += 1 / len(winners)
+
+class HandTracker:
+    __slots__ = ('hand', 'holes', 'keys', 'board', 'strengths', 'lookahead')
+
+    def __init__(self):
+        self.hand = 0          # 何ハンド目か (表示側が古い計算結果を捨てるため)
+        self.holes = []        # 席ごとのホールカード (コード)
+        self.keys = []         # 席ごとの ホールカード + ボード の (ビットマスク, 素数積)
+        self.board = ()
+        self.strengths = []    # 席ごとの現在の強さ (プリフロップ・フォールドした席は None)
+        self.lookahead = []    # 席ごとの先読み表 (ボードが 3〜4 枚のとき。それ以外は None)
+
+    def begin_hand(self, engine):
+        self.hand += 1
+        self.holes = [tuple(c.code for c in p.hand) for p in engine.players]
+        self.keys = [evaluator.board_key(hole) for hole in self.holes]
+        self.board = ()
+        self.strengths = [None] * len(self.holes)
+        self.lookahead = [None] * len(self.holes)
+
+    def street(self, engine):
+        # ボードに増えたカードの分だけ各席を更新する
+        board = tuple(c.code for c in engine.community_cards)
+        lookahead = self.lookahead
+        if board[:len(self.board)] != self.board:
+            # 外からボードを差し替えられた場合は一から計算する
+            self.keys = [evaluator.board_key(hole) for hole in self.holes]
+            self.board = ()
+            lookahead = [None] * len(self.holes)
+        new = board[len(self.board):]
+        keys, strengths, next_lookahead = [], [], []
+        for seat, player in enumerate(engine.players):
+            key = _extend(self.keys[seat], new)
+            keys.append(key)
+            if player.is_folded or len(board) < 3:
+                strengths.append(None)
+                next_lookahead.append(None)
+                continue
+            table = lookahead[seat]
+            strengths.append(table[new[0]] if table is not None and len(new) == 1 else evaluator.evaluate_with_board((), key))
+            next_lookahead.append(_lookahead(key) if len(board) < 5 else None)
+        self.keys, self.board, self.strengths, self.lookahead = keys, board, strengths, next_lookahead
+
+    # --- 問い合わせ ---
+
+    def summary(self, seat):
+        # 席の現在の役とアウツ (本人から見えないカードすべてが候補)
+        return _summary(self.holes[seat], self.board, self.strengths[seat], self.lookahead[seat])
+
+    def summary_for(self, hole, board):
+        # 追跡中の状態と一致すればそれを使い、違えば (先読みの仮の状態など) 一から計算する
+        hole, board = tuple(hole), tuple(board)
+        if board == self.board and hole in self.holes:
+            seat = self.holes.index(hole)
+            if self.strengths[seat] is not None or len(board) < 3:
+                return self.summary(seat)
+        return hand_summary(hole, board)
+
+    def final_strengths(self, engine):
+        # リバーまで追跡できていれば プレイヤー → 強さ (end_round の勝敗判定用)。そうでなければ None
+        if len(self.board) != 5 or self.board != tuple(c.code for c in engine.community_cards):
+            return None
+        return {p: self.strengths[seat] for seat, p in enumerate(engine.players)
+                if not p.is_folded and self.strengths[seat] is not None}
+
+    def win_probabilities(self, live):
+        # 全員の手札が見えている前提での各席の勝率 (引き分けは等分)。live はまだ降りていない席。
+        # リバーは現在の強さ、ターンは先読み表だけで求まる。フロップは残り 2 枚を全列挙、プリフロップはサンプリング。
+        # 時間がかかりうるので UI スレッド以外から呼ぶ
+        holes, keys, board, strengths, lookahead = self.holes, self.keys, self.board, self.strengths, self.lookahead
+        totals = [0.0] * len(holes)
+        if len(live) == 1:
+            totals[live[0]] = 1.0
+            return totals
+        if not live:
+            return totals
+        dead = set(board)
+        for hole in holes:
+            dead.update(hole)
+        deck = [c for c in range(52) if c not in dead]
+        if len(board) == 5:
+            _add_shares(totals, live, [strengths[seat] for seat in live])
+            return totals
+        if len(board) == 4:
+            runouts = 0
+            for river in deck:
+                _add_shares(totals, live, [lookahead[seat][river] for seat in live])
+                runouts += 1
+        elif len(board) == 3:
+            runouts = 0
+            for i, turn in enumerate(deck):
+                for river in deck[i + 1:]:
+                    _add_shares(totals, live, [evaluator.evaluate_with_board((turn, river), keys[seat]) for seat in live])
+                    runouts += 1
+        else:
+            rng = random.Random(self.hand)
+            runouts = PREFLOP_SAMPLES
+            for _ in range(runouts):
+                key = evaluator.board_key(rng.sample(deck, 5))
+                _add_shares(totals, live, [evaluator.evaluate_with_board(holes[seat], key) for seat in live])
+        return [t / runouts for t in totals]
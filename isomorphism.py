@@ -0,0 +1,137 @@
+import argparse
+import os
+import sys
+import time
+from itertools import combinations
+import numpy as np
+
+# --- スートの入れ替えに対する正規化 ---
+# スートの付け替えだけが違う (手札, ボード) は勝率も戦略も同じなので、代表の 1 つにまとめて番号を振る。
+# 正規化: スートごとに「手札とボードにどのランクがあるか」の 26bit の模様を作り、模様の大きい順にスートを
+# 0, 1, 2, 3 と付け直す。手札・ボードそれぞれの中ではカードを昇順に並べ、6bit ずつ 1 つの整数に詰める
+# (これを正規キーと呼ぶ。同じ同値類のハンドは必ず同じキーになる)。ボードは配られた順を区別しない。
+# ストリートごとの通し番号は、正規キーを昇順に並べた表の中の位置 (プリフロップ 169、フロップ 1,286,792、
+# ターン 13,960,050)。リバー (123,156,254 通り) は表が大きすぎるので正規キーだけを使う。
+# 表は初回に作るか、python isomorphism.py build で TABLE_DIR に保存したものを読み込む。
+
+STREETS = ("pre-flop", "flop", "turn", "river")
+BOARD_SIZES = (0, 3, 4, 5)
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iso_tables")
+
+_tables = {}
+
+def _code(c):
+    return c if isinstance(c, int) else c.code
+
+def canonical_key(hole, board=()):
+    # 1 ハンド分の正規キー (整数)。Card でも整数コードでもよい
+    cards = [_code(c) for c in hole] + [_code(c) for c in board]
+    patterns = [0, 0, 0, 0]
+    for position, c in enumerate(cards):
+        patterns[c // 13] |= 1 << ((13 if position < 2 else 0) + c % 13)
+    order = sorted(range(4), key=lambda s: -patterns[s])
+    label = [0] * 4
+    for new, suit in enumerate(order):
+        label[suit] = new
+    canon = [label[c // 13] * 13 + c % 13 for c in cards]
+    canon = sorted(canon[:2]) + sorted(canon[2:])
+    key = 0
+    for c in canon:
+        key = key << 6 | c
+    return key
+
+def canonical_keys(hole, board=None):
+    # 正規キーの一括計算。hole: 形状 (N, 2), board: 形状 (N, 0〜5) の整数配列 → 形状 (N,) の int64
+    hole = np.asarray(hole, dtype=np.int64)
+    cards = hole if board is None or np.size(board) == 0 else np.concatenate([hole, np.asarray(board, dtype=np.int64)], axis=1)
+    n, width = cards.shape
+    rows = np.arange(n)
+    suits = cards // 13
+    ranks = cards % 13
+    patterns = np.zeros((n, 4), dtype=np.int64)
+    for position in range(width):
+        shift = (13 if position < 2 else 0) + ranks[:, position]
+        patterns[rows, suits[:, position]] |= np.left_shift(np.int64(1), shift)
+    order = np.argsort(-patterns, axis=1, kind='stable')
+    label = np.empty((n, 4), dtype=np.int64)
+    label[rows[:, None], order] = np.arange(4)
+    canon = np.take_along_axis(label, suits, axis=1) * 13 + ranks
+    canon[:, 0:2].sort(axis=1)
+    canon[:, 2:].sort(axis=1)
+    keys = np.zeros(n, dtype=np.int64)
+    for position in range(width):
+        keys = np.left_shift(keys, 6) | canon[:, position]
+    return keys
+
+def decode(key, street):
+    # 正規キー → 代表の (手札, ボード) (整数コードのタプル)
+    width = 2 + BOARD_SIZES[street]
+    cards = [(int(key) >> (6 * (width - 1 - i))) & 63 for i in range(width)]
+    return tuple(cards[:2]), tuple(cards[2:])
+
+# --- 通し番号の表 ---
+
+def _build_preflop():
+    return np.unique(canonical_keys(np.array(list(combinations(range(52), 2)))))
+
+def _decode_batch(keys, width):
+    keys = np.asarray(keys, dtype=np.int64)
+    return np.stack([np.right_shift(keys, 6 * (width - 1 - i)) & 63 for i in range(width)], axis=1)
+
+def build_table(street):
+    # 手札の同値類 (169 通り) ごとに、残り 50 枚からボードを全部作って正規化する。
+    # 手札の同値類が違えば正規キーも違うので、同値類ごとに重複を除いてから連結すればよい
+    if street == 0:
+        return _build_preflop()
+    if street >= 3:
+        raise ValueError("リバーの通し番号の表は作りません (正規キーを使ってください)")
+    boards = np.array(list(combinations(range(50), BOARD_SIZES[street])), dtype=np.int64)
+    chunks = []
+    for hole in _decode_batch(table(0), 2):
+        rest = np.array([c for c in range(52) if c not in hole], dtype=np.int64)
+        chunks.append(np.unique(canonical_keys(np.broadcast_to(hole, (len(boards), 2)), rest[boards])))
+    return np.sort(np.concatenate(chunks))
+
+def table(street):
+    # 正規キーを昇順に並べた表。TABLE_DIR に保存されていれば読み込み (メモリマップ)、なければ作る
+    if street not in _tables:
+        path = os.path.join(TABLE_DIR, f"{STREETS[street]}.npy")
+        _tables[street] = np.load(path, mmap_mode='r') if os.path.exists(path) else build_table(street)
+    return _tables[street]
+
+def size(street):
+    return len(table(street))
+
+def index(hole, board=()):
+    # (手札, ボード) → そのストリートでの通し番号 (0 〜 size(street) - 1)
+    street = BOARD_SIZES.index(len(board))
+    keys = table(street)
+    return int(np.searchsorted(keys, canonical_key(hole, board)))
+
+def index_batch(hole, board=None):
+    # 一括版。board の枚数は全行で同じにする
+    street = BOARD_SIZES.index(0 if board is None else np.shape(board)[1])
+    return np.searchsorted(table(street), canonical_keys(hole, board))
+
+def unindex(i, street):
+    # 通し番号 → 代表の (手札, ボード)
+    return decode(table(street)[i], street)
+
+def main():
+    parser = argparse.ArgumentParser(description="スート正規化の通し番号の表を作って保存する")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--streets", nargs="+", default=["pre-flop", "flop"], choices=STREETS[:3])
+    parser.add_argument("--out", default=TABLE_DIR)
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    for name in sorted(set(args.streets), key=STREETS.index):
+        start = time.perf_counter()
+        keys = np.asarray(table(STREETS.index(name)))
+        path = os.path.join(args.out, f"{name}.npy")
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, keys)
+        os.replace(tmp_path, path)
+        print(f"{name}: {len(keys):,} 通り ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+import metrics
+
+# --- LLM プレイヤー用の非同期クライアント ---
+# 専用スレッドで asyncio のイベントループを回し、1 回の意思決定ごとに
+# 締め切り・リトライ (指数バックオフ)・キャンセルを扱う。結果はコールバックで通知する。
+
+VALID_ACTIONS = ('fold', 'check', 'call', 'raise', 'all-in')
+
+def parse_json_action(text):
+    # モデルの応答から JSON 部分を取り出す。不正な応答は例外にしてリトライ対象にする
+    action_data = json.loads(text[text.find('{'):text.rfind('}')+1])
+    if action_data.get("action") not in VALID_ACTIONS:
+        raise ValueError(f"unknown action: {action_data.get('action')!r}")
+    return action_data
+
+def gemini_model(api_key, model_name='gemini-2.5-flash'):
+    # Gemini のモデルを用意する。SDK (google.generativeai) はここで初めて読み込むので、
+    # Gemini プレイヤーを使わなければインストールされていなくてもよい。使えないときは None
+    if not api_key:
+        print("警告: GOOGLE_API_KEYが.envファイルに設定されていません。Geminiプレイヤーは使用できません。")
+        return None
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        print("警告: google-generativeai がインストールされていません。Geminiプレイヤーは使用できません。")
+        return None
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+class LLMClient:
+    def __init__(self, model, deadline=10.0, retries=2, backoff=0.5):
+        self.model = model
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def request(self, prompt, on_done, parse=parse_json_action):
+        # on_done(result, error) はループ側のスレッドから呼ばれる。締め切り切れや失敗時は result が None。
+        # 返り値の Future を cancel() すると問い合わせを中断し、on_done は呼ばれない
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(self._decide(prompt, parse), self._loop)
+        metrics.count("llm_requests")
+
+        def done(f):
+            if f.cancelled():
+                metrics.count("llm_cancelled")
+                return
+            error = f.exception()
+            metrics.observe("llm_decision_seconds", time.perf_counter() - start)
+            if error: metrics.count("llm_errors")
+            on_done(None if error else f.result(), error)
+        future.add_done_callback(done)
+        return future
+
+    async def _decide(self, prompt, parse):
+        deadline = self._loop.time() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"LLM の応答が {self.deadline} 秒以内に得られませんでした")
+            try:
+                metrics.count("llm_attempts")
+                text = await asyncio.wait_for(self._generate(prompt), remaining)
+                return parse(text)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                attempt += 1
+                if attempt > self.retries or deadline - self._loop.time() <= 0:
+                    raise
+                await asyncio.sleep(min(self.backoff * 2 ** (attempt - 1), max(0.0, deadline - self._loop.time())))
+
+    async def _generate(self, prompt):
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt)
+        else:
+            # 同期 API しかないモデルはスレッドで待つ (締め切りを過ぎたら結果を捨てる)
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return response.text
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+class FakeModel:
+    # テスト用のモデル。latency 秒待ってから text を返す。最初の failures 回は例外を投げる
+    def __init__(self, text='{"action": "call"}', latency=0.5, failures=0):
+        self.text = text
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+
+    def _respond(self):
+        self.calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("fake model failure")
+        return SimpleNamespace(text=self.text)
+
+    async def generate_content_async(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self._respond()
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return self._respond()
@@ -1,89 +1,156 @@
 
 import tkinter as tk
 from tkinter import simpledialog, messagebox, font
-import random
-import google.generativeai as genai
-import itertools
 import json
-import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
+import evaluator
+import metrics
+from decision_cache import DecisionCache
+from hand_history import HandRecorder
+from hand_tracker import HandTracker
+from cards import CARDS
+from engine import PokerEngine, Player, BETTING_OVER, ROUND_OVER
 
 # --- Gemini APIのセットアップ ---
 GOOGLE_API_KEY = "" #ENTER YOUR API KEY
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-else:
-    print("警告: GOOGLE_API_KEYが.envファイルに設定されていません。Geminiプレイヤーは使用できません。")
-    model = None
+GEMINI_MODEL = 'gemini-2.5-flash'
+
+# Gemini の判断キャッシュ: 保存先 (None ならメモリのみ) と丸めの粗さ (1〜3、大きいほど粗い)
+DECISION_CACHE_PATH = None
+DECISION_CACHE_COARSENESS = 1
+# Gemini の先読み: 前の席のプレイヤーが考えている間に、そのプレイヤーが PREFETCH_ACTIONS のどれかをした場合の
+# 次の Gemini の手番を先に問い合わせておく (当たらなかった問い合わせは捨てるので API の呼び出しは増える)
+GEMINI_PREFETCH = False
+PREFETCH_ACTIONS = ('call',)  # 'call' はコール不要ならチェックとして扱う。'fold' も加えられる
+# ハンド履歴 (JSONL) の保存先。None なら記録しない
+HAND_HISTORY_PATH = None
+# CPU の判断方法: "equity" (勝率とポットオッズ)、"search" (スナップショット上の先読み、1 手あたりの予算付き)、
+# "cfr" (ヘッズアップのとき cfr.py で学習した戦略表を引く。表がない・3 人以上なら "equity" と同じ)
+CPU_STRATEGY = "equity"
+SEARCH_NODES = 3000
+SEARCH_TIME_BUDGET = 0.5
+# プラグインのボット (bots.py): ワーカープロセス数、1 回の判断の制限時間 (秒)、ワーカーのメモリ上限 (バイト、None なら無制限)
+BOT_WORKERS = 2
+BOT_TIME_LIMIT = 5.0
+BOT_MEMORY_LIMIT = None
+# 勝率の表示 (UI スレッド以外で計算する): None なら表示しない、"self" は自分の席だけ (相手の手札は分からない前提)、
+# "all" は全員の手札が見えている前提で全席 (観戦・確認用。相手の手札が分かってしまう)
+LIVE_ODDS = None
+LIVE_ODDS_SAMPLES = 5000
+# 計測: 有効にするとハンドごとに METRICS_PATH (.json なら JSON、それ以外は Prometheus 形式) へ書き出し、
+# METRICS_PORT を指定すると http://127.0.0.1:<port>/metrics で公開する。PROFILE_DIR にはハンドごとの cProfile を保存する
+METRICS_ENABLED = False
+METRICS_PATH = None
+METRICS_PORT = None
+PROFILE_DIR = None
 
 # --- ゲームロジック（コア部分） ---
 
-SUITS = ['♠', '♥', '♦', '♣']
-RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-RANK_VALUES = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14}
-
-class Card:
-    def __init__(self, suit, rank):
-        self.suit = suit
-        self.rank = rank
-        self.value = RANK_VALUES[rank]
-
-    def __str__(self):
-        return f"{self.suit}{self.rank}"
-
-class Deck:
-    def __init__(self):
-        self.cards = [Card(s, r) for s in SUITS for r in RANKS]
-        self.shuffle()
-
-    def shuffle(self):
-        random.shuffle(self.cards)
-
-    def deal(self):
-        return self.cards.pop() if self.cards else None
-
-class Player:
-    def __init__(self, name, chips=1000, is_cpu=False, is_gemini=False):
-        self.name = name
-        self.hand = []
-        self.chips = chips
-        self.bet = 0
-        self.has_acted = False
-        self.is_folded = False
-        self.is_all_in = False
-        self.is_cpu = is_cpu
-        self.is_gemini = is_gemini
-        # GUI表示用の手札公開フラグ
-        self.show_hand = False
-
-class PokerGame:
-    def __init__(self, app, human_player_name, cpu_players=0, gemini_players=0):
+class PokerGame(PokerEngine):
+    __slots__ = ('app', 'llm', 'pending_decision', 'decision_cache', 'prefetcher', 'bot_pool', 'scheduled_calls')
+
+    # 表示用のウェイト (ミリ秒)。ルール自体は PokerEngine が時間に依存せず処理する
+    DELAYS = {"action": 1000, "cpu": 1500, "street": 1000, "round_end": 1000}
+
+    def __init__(self, app, human_player_name, cpu_players=0, gemini_players=0, bot_names=()):
+        super().__init__()
         self.app = app
-        self.players = []
-        self.deck = Deck()
-        self.community_cards = []
-        self.pot = 0
-        self.current_bet = 0
-        self.current_player_index = 0
-        self.game_stage = "pre-flop"
-        self.game_in_progress = False
-        self.small_blind_index = -1
-        self.big_blind_index = -1
-        self.small_blind_amount = 10
-        self.big_blind_amount = 20
-        self.action_queue = queue.Queue()
+        # Gemini への問い合わせ (締め切り・リトライ付き)。応答がなければ CPU と同じ判断で代替する
+        # SDK の読み込みとモデルの用意は Gemini プレイヤーがいるときだけ行う
+        self.llm = self.prefetcher = None
+        if gemini_players:
+            from llm_client import LLMClient, gemini_model
+            model = gemini_model(GOOGLE_API_KEY, GEMINI_MODEL)
+            self.llm = LLMClient(model) if model else None
+        if GEMINI_PREFETCH and self.llm:
+            from prefetch import Prefetcher
+            self.prefetcher = Prefetcher(self.llm)
+        self.pending_decision = None
+        # このハンドで root.after に予約した回数 (計測用)
+        self.scheduled_calls = 0
+        self.decision_cache = DecisionCache(path=DECISION_CACHE_PATH, coarseness=DECISION_CACHE_COARSENESS)
+        if HAND_HISTORY_PATH:
+            self.recorder = HandRecorder(HAND_HISTORY_PATH)
+        # 各席の役とアウツをストリートごとに更新する (Gemini へのプロンプトと勝率の表示に使う)
+        self.tracker = HandTracker()
+        # ボットはワーカープロセスで動かす。読み込めなかったボットは席に着かせない
+        self.bot_pool = None
+        if bot_names:
+            import bots
+            self.bot_pool = bots.BotPool(BOT_WORKERS, BOT_TIME_LIMIT, BOT_MEMORY_LIMIT)
+            for name, error in self.bot_pool.preload(bot_names).items():
+                self.app.log(f"ボット {name} を読み込めませんでした: {error}")
 
         # プレイヤーの追加
         self.add_player(human_player_name)
         for i in range(cpu_players):
             self.add_player(f"CPU {i+1}", is_cpu=True)
-        if model:
+        if self.llm:
             for i in range(gemini_players):
                 self.add_player(f"Gemini {i+1}", is_gemini=True)
+        for i, bot in enumerate(bot_names):
+            if bot in self.bot_pool.names:
+                self.add_player(f"{bot} {i+1}", bot=bot)
+
+    def add_player(self, name, is_cpu=False, is_gemini=False, bot=None):
+        self.players.append(Player(name, is_cpu=is_cpu, is_gemini=is_gemini, bot=bot))
+
+    def schedule(self, delay_key, callback, *args):
+        self.scheduled_calls += 1
+        self.app.root.after(self.DELAYS[delay_key], callback, *args)
+
+    # --- エンジンのフック: ログと画面更新 ---
+
+    def on_blind(self, player, amount, is_big):
+        blind_name = "ビッグブラインド" if is_big else "スモールブラインド"
+        self.app.log(f"{player.name}が{blind_name} {amount} をベット。")
+
+    def on_action(self, player, action, amount):
+        if action == 'fold':
+            self.app.log(f"{player.name}がフォールドしました。")
+        elif action == 'check':
+            self.app.log(f"{player.name}がチェックしました。")
+        elif action == 'call':
+            if player.is_all_in: self.app.log(f"{player.name}がオールインしました。")
+            else: self.app.log(f"{player.name}が{amount}コールしました。")
+        elif action == 'raise':
+            if player.is_all_in: self.app.log(f"{player.name}がオールインレイズ！ ({amount})")
+            else: self.app.log(f"{player.name}が{amount}にレイズしました。")
+
+    def on_street(self):
+        stage_names = {"flop": "フロップ", "turn": "ターン", "river": "リバー"}
+        self.app.log(f"--- {stage_names[self.game_stage]} ---")
+        self.app.log(f"コミュニティカード: {' '.join(map(str, self.community_cards))}")
+
+    def on_round_end(self, result):
+        self.app.log("--- ラウンド終了 ---")
+        for p in self.players: p.show_hand = True
+        self.app.update_display()
+
+        ranks = result["ranks"]
+        pots = result["pots"]
+        for i, pot in enumerate(pots):
+            winner_names = ", ".join([w.name for w in pot["winners"]])
+            if len(pots) == 1:
+                self.app.log(f"{winner_names} の勝利！ポット ({pot['amount']}) を獲得。")
+            else:
+                pot_name = "メインポット" if i == 0 else f"サイドポット{i}"
+                self.app.log(f"{winner_names} が{pot_name} ({pot['amount']}) を獲得。")
+        if not ranks:
+            return
+
+        best = pots[0]["winners"][0]
+        by_code = {c.code: c for c in best.hand + self.community_cards}
+        best_cards = evaluator.best_five(list(by_code))
+        win_hand_name = evaluator.HAND_NAMES[ranks[best][1]]
+        win_hand_str = ' '.join(str(by_code[c]) for c in best_cards)
+        self.app.log(f"役: {win_hand_name} ({win_hand_str})")
+
+        for p, (_, category) in ranks.items():
+            self.app.log(f"  - {p.name}: {' '.join(map(str, p.hand))} ({evaluator.HAND_NAMES[category]})")
 
-    def add_player(self, name, is_cpu=False, is_gemini=False):
-        self.players.append(Player(name, is_cpu=is_cpu, is_gemini=is_gemini))
+    # --- 進行 (エンジンの状態遷移 + 表示用ウェイト) ---
 
     def start_game(self):
         if len(self.players) < 2:
@@ -94,139 +161,170 @@ class PokerGame:
         self.start_round()
 
     def start_round(self):
-        self.game_in_progress = True
-        self.deck = Deck()
-        self.community_cards = []
-        self.pot = 0
-        self.current_bet = 0
-        self.game_stage = "pre-flop"
-
-        self.players = [p for p in self.players if p.chips > 0]
-        if len(self.players) < 2:
+        if not self.start_hand():
             self.app.log("プレイ可能なプレイヤーが2人未満になりました。ゲームを終了します。")
             self.app.show_end_game_options()
             return
-
-        for player in self.players:
-            player.hand = [self.deck.deal(), self.deck.deal()]
-            player.bet = 0
-            player.has_acted = False
-            player.is_folded = False
-            player.is_all_in = False
-            player.show_hand = isinstance(player, Player) and not player.is_cpu and not player.is_gemini
-
-        self.small_blind_index = (self.small_blind_index + 1) % len(self.players)
-        self.big_blind_index = (self.small_blind_index + 1) % len(self.players)
-
-        sb_player = self.players[self.small_blind_index]
-        bb_player = self.players[self.big_blind_index]
-        
-        self.app.log(f"{sb_player.name}がスモールブラインド {self.small_blind_amount} をベット。")
-        sb_player.bet = min(self.small_blind_amount, sb_player.chips)
-        sb_player.chips -= sb_player.bet
-        self.pot += sb_player.bet
-        if sb_player.chips == 0: sb_player.is_all_in = True
-
-        self.app.log(f"{bb_player.name}がビッグブラインド {self.big_blind_amount} をベット。")
-        bb_player.bet = min(self.big_blind_amount, bb_player.chips)
-        bb_player.chips -= bb_player.bet
-        self.pot += bb_player.bet
-        if bb_player.chips == 0: bb_player.is_all_in = True
-        
-        self.current_bet = self.big_blind_amount
-        self.current_player_index = (self.big_blind_index + 1) % len(self.players)
-        
-        self.start_betting_round()
+        self.scheduled_calls = 0
+        self.process_turn()
 
     def start_betting_round(self):
-        if self.game_stage != "pre-flop":
-            self.current_player_index = (self.small_blind_index) % len(self.players)
-            while self.players[self.current_player_index].is_folded or self.players[self.current_player_index].is_all_in:
-                self.current_player_index = (self.current_player_index + 1) % len(self.players)
-
-            self.current_bet = 0
-            for p in self.players:
-                if not p.is_folded and not p.is_all_in:
-                    p.has_acted = False
-                p.bet = 0
-        
+        super().start_betting_round()
         self.process_turn()
 
+    @metrics.timed("process_turn")
     def process_turn(self):
+        status = self.step()
         self.app.update_display()
-
-        active_players = [p for p in self.players if not p.is_folded]
-        if len(active_players) <= 1:
-            self.app.root.after(1000, self.end_round)
+        if status == ROUND_OVER:
+            self.schedule("round_end", self.end_round)
             return
-
-        active_not_allin = [p for p in active_players if not p.is_all_in]
-        acted_players = [p for p in active_not_allin if p.has_acted]
-        bets = {p.bet for p in active_not_allin}
-
-        if len(acted_players) == len(active_not_allin) and len(bets) <= 1:
-            self.app.root.after(1000, self.end_betting_round)
+        if status == BETTING_OVER:
+            self.schedule("street", self.end_betting_round)
             return
 
         current_player = self.players[self.current_player_index]
-        if current_player.is_folded or current_player.is_all_in:
-            self.current_player_index = (self.current_player_index + 1) % len(self.players)
-            self.app.root.after(100, self.process_turn)
-            return
-
-        self.app.update_display()
-        
         if current_player.is_cpu:
             self.app.log(f"{current_player.name}のターン...")
-            self.app.root.after(1500, self.get_cpu_action, current_player)
+            self.schedule("cpu", self.get_cpu_action, current_player)
         elif current_player.is_gemini:
             self.app.log(f"{current_player.name} (Gemini) が思考中です...")
-            threading.Thread(target=self.get_gemini_poker_action, args=(current_player,), daemon=True).start()
-            self.app.root.after(100, self.check_gemini_queue)
+            self.request_gemini_action(current_player)
+        elif current_player.bot:
+            self.app.log(f"{current_player.name} (ボット) が思考中です...")
+            self.request_bot_action(current_player)
         else: # Human player
             self.app.log(f"あなたのターンです。")
             self.app.enable_action_buttons()
+        # 現在の手番の間に、次の Gemini の手番を先読みしておく
+        if self.players[self.current_player_index] is current_player:
+            self.prefetch_gemini_actions()
 
     def get_cpu_action(self, player):
-        amount_to_call = self.current_bet - player.bet
-        if amount_to_call > 0:
-            if amount_to_call >= player.chips:
-                self.handle_action('call')
-            else:
-                if random.random() < 0.7: self.handle_action('call')
-                else: self.handle_action('fold')
-        else:
-            self.handle_action('check')
+        if CPU_STRATEGY == "search":
+            # 探索は SEARCH_TIME_BUDGET 秒ほどかかるので UI スレッド以外で行い、結果を UI スレッドに戻す
+            import search
+            future = self.pending_decision = self.app.background().submit(
+                search.search_action, self, player, SEARCH_NODES, SEARCH_TIME_BUDGET, self.rng)
+            future.add_done_callback(lambda f: self.app.call_from_thread(self.on_worker_decision, player, f))
+            return
+        decision = None
+        if CPU_STRATEGY == "cfr":
+            import cfr  # numpy を読み込むので使うときだけ
+            decision = cfr.cfr_action(self, player)
+        self.handle_action(*(decision or self.cpu_action(player)))
+
+    def request_gemini_action(self, player):
+        # 似た状況での回答がキャッシュにあればモデルに問い合わせない
+        key = self.decision_cache.key(self, player)
+        entry = self.decision_cache.get(key)
+        if entry is not None:
+            metrics.count("decision_cache_hits")
+            if self.prefetcher: self.prefetcher.discard()
+            self.on_gemini_decision(player, self.decision_cache.to_action_data(entry, self), None)
+            return
+        # 応答はループ側のスレッドで届くので、UI スレッドに戻してから処理する
+        on_done = lambda action_data, error: self.app.call_from_thread(self.on_gemini_decision, player, action_data, error, key)
+        if self.prefetcher:
+            # 先読みした状態と完全に一致すれば、その問い合わせの結果を使う
+            from prefetch import state_key
+            self.pending_decision = self.prefetcher.take(state_key(self, player), on_done)
+            if self.pending_decision is not None:
+                return
+        self.pending_decision = self.llm.request(self.build_gemini_prompt(player), on_done)
+
+    def request_bot_action(self, player):
+        # ワーカープロセスでの判断が終わったら UI スレッドに戻す (時間切れなら既定のアクションが返る)
+        import bots
+        future = self.pending_decision = self.bot_pool.request(player.bot, bots.observation(self, player))
+        future.add_done_callback(lambda f: self.app.call_from_thread(self.on_worker_decision, player, f))
+
+    def on_worker_decision(self, player, future):
+        # ボット・探索の判断を UI スレッドで適用する。失敗していれば CPU と同じ判断で代替する
+        if future is not self.pending_decision or future.cancelled():
+            return  # 取り消した・既に終わったハンドの判断は捨てる
+        self.pending_decision = None
+        error = future.exception()
+        if error is not None:
+            self.app.log(f"{player.name} の判断に失敗したため、既定のアクションを選びます: {error!r}")
+            self.handle_action(*self.cpu_action(player))
+            return
+        self.handle_action(*future.result())
 
-    def check_gemini_queue(self):
-        try:
-            action_data = self.action_queue.get_nowait()
-            action = action_data.get("action")
-            amount = action_data.get("amount", 0)
-            self.app.log(f"Geminiのアクション: {action} {amount if action == 'raise' else ''}")
-            self.handle_action(action, amount)
-        except queue.Empty:
-            self.app.root.after(100, self.check_gemini_queue)
-
-    def get_gemini_poker_action(self, player):
+    def prefetch_gemini_actions(self):
+        # 現在の手番が PREFETCH_ACTIONS をした後に Gemini の手番が来るなら、その状態で先に問い合わせる
+        if self.prefetcher is None:
+            return
+        from prefetch import speculative_view, state_key
+        for action in PREFETCH_ACTIONS:
+            speculation = speculative_view(self, action)
+            if speculation is None:
+                continue
+            view, seat = speculation
+            if not self.players[seat].is_gemini:
+                continue
+            player = view.players[seat]
+            key = state_key(view, player)
+            if key in self.prefetcher or self.decision_cache.key(view, player) in self.decision_cache.entries:
+                continue
+            self.prefetcher.issue(key, self.build_gemini_prompt(player, view))
+
+    def on_gemini_decision(self, player, action_data, error, cache_key=None):
+        if not self.game_in_progress or self.players[self.current_player_index] is not player:
+            return  # 既に終わったハンド・手番への応答は捨てる
+        self.pending_decision = None
+        if action_data is not None and cache_key is not None:
+            self.decision_cache.put(cache_key, self, action_data)
+        if action_data is None:
+            self.app.log(f"{player.name} の応答が得られなかったため、既定のアクションを選びます: {error}")
+            action, amount = self.cpu_action(player)
+        else:
+            action, amount = self.normalize_gemini_action(player, action_data)
+        self.app.log(f"Geminiのアクション: {action} {amount if action == 'raise' else ''}")
+        self.handle_action(action, amount)
+
+    def close(self):
+        # 終了時: 書きかけのハンド履歴を書き出し、ボットのワーカーと Gemini のループを止める
+        self.cancel_pending_decision()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.bot_pool:
+            self.bot_pool.close()
+        if self.llm:
+            self.llm.close()
+
+    def cancel_pending_decision(self):
+        if self.pending_decision is not None:
+            self.pending_decision.cancel()
+            self.pending_decision = None
+
+    def build_gemini_prompt(self, player, game=None):
+        # game には先読み用の仮の状態 (prefetch.speculative_view) も渡せる。省略時は現在の状態
+        game = game or self
         hand_str = ' '.join(map(str, player.hand))
-        community_str = ' '.join(map(str, self.community_cards))
-        player_states = [{"name": p.name, "chips": p.chips, "bet": p.bet, "is_folded": p.is_folded, "is_all_in": p.is_all_in, "is_me": p == player} for p in self.players]
-        amount_to_call = self.current_bet - player.bet
-        min_raise = self.current_bet * 2 if self.current_bet > 0 else self.big_blind_amount
+        community_str = ' '.join(map(str, game.community_cards))
+        player_states = [{"name": p.name, "chips": p.chips, "bet": p.bet, "is_folded": p.is_folded, "is_all_in": p.is_all_in, "is_me": p == player} for p in game.players]
+        amount_to_call = game.current_bet - player.bet
+        min_raise = game.min_raise()
+        made = self.tracker.summary_for([c.code for c in player.hand], [c.code for c in game.community_cards])
+        outs = made["outs"]
+        outs_str = f"{len(outs)} 枚 ({' '.join(str(CARDS[c]) for c in outs)})" if outs else "なし"
 
         prompt = f"""
             あなたはプロのテキサスホールデムポーカープレイヤーです。
             以下のゲーム状況を分析し、あなたの取るべき最適なアクションをJSON形式で出力してください。
             # ゲーム状況
-            - ゲームステージ: {self.game_stage}
+            - ゲームステージ: {game.game_stage}
             - あなたの手札: {hand_str}
             - コミュニティカード: {community_str or "なし"}
-            - ポット合計: {self.pot}
+            - あなたの現在の役: {made["hand_name"]}
+            - 次の1枚で役が上がるカード (アウツ): {outs_str if 3 <= len(game.community_cards) < 5 else "対象外"}
+            - ポット合計: {game.pot}
             - 現在のラウンドでのあなたのベット額: {player.bet}
-            - 現在のコールに必要な合計ベット額: {self.current_bet}
+            - 現在のコールに必要な合計ベット額: {game.current_bet}
             - あなたの残りチップ: {player.chips}
-            - プレイヤーの状態: {json.dumps(player_states, indent=2, ensure_ascii=False)}
+            - プレイヤーの状態: {json.dumps(player_states, ensure_ascii=False)}
             # あなたが実行可能なアクション
             - `fold`: ゲームから降ります。
             - `check`: 追加のベットをせずに行動を次のプレイヤーに回します。（コール不要の場合のみ）
@@ -244,166 +342,62 @@ class PokerGame:
             }}
             ```
             """
-        try:
-            response = model.generate_content(prompt)
-            json_part = response.text[response.text.find('{'):response.text.rfind('}')+1]
-            action_data = json.loads(json_part)
-            
-            action = action_data.get("action")
-            amount = action_data.get("amount", 0)
-            can_check = amount_to_call <= 0
-
-            final_action = 'fold'
-            final_amount = 0
-
-            if action == 'fold': final_action = 'fold'
-            elif action == 'check': final_action = 'check' if can_check else 'call'
-            elif action == 'call': final_action = 'check' if can_check else 'call'
-            elif action == 'raise':
-                amount = min(amount, player.chips + player.bet)
-                if amount < min_raise and player.chips + player.bet > min_raise: amount = min_raise
-                final_action = 'raise' if amount > self.current_bet else 'call'
-                final_amount = amount
-            elif action == 'all-in':
-                final_action = 'raise'
-                final_amount = player.chips + player.bet
-            
-            self.action_queue.put({"action": final_action, "amount": final_amount})
-
-        except Exception as e:
-            print(f"Gemini action error: {e}")
-            self.action_queue.put({"action": "fold", "amount": 0})
+        return prompt
+
+    def normalize_gemini_action(self, player, action_data):
+        action = action_data.get("action")
+        amount = action_data.get("amount", 0) or 0
+        can_check = self.current_bet - player.bet <= 0
+        min_raise = self.min_raise()
+
+        if action in ('check', 'call'):
+            return ('check' if can_check else 'call'), 0
+        if action == 'raise':
+            amount = min(amount, player.chips + player.bet)
+            if amount < min_raise and player.chips + player.bet > min_raise: amount = min_raise
+            return ('raise' if amount > self.current_bet else 'call'), amount
+        if action == 'all-in':
+            return 'raise', player.chips + player.bet
+        return 'fold', 0
 
     def end_betting_round(self):
-        for p in self.players:
-            self.pot += p.bet
-            p.bet = 0
-        
-        if self.game_stage == "pre-flop":
-            self.game_stage = "flop"
-            self.community_cards.extend([self.deck.deal() for _ in range(3)])
-            self.app.log(f"--- フロップ ---")
-        elif self.game_stage == "flop":
-            self.game_stage = "turn"
-            self.community_cards.append(self.deck.deal())
-            self.app.log(f"--- ターン ---")
-        elif self.game_stage == "turn":
-            self.game_stage = "river"
-            self.community_cards.append(self.deck.deal())
-            self.app.log(f"--- リバー ---")
-        elif self.game_stage == "river":
-            self.game_stage = "showdown"
-            self.app.root.after(1000, self.end_round)
-            return
-        
-        self.app.log(f"コミュニティカード: {' '.join(map(str, self.community_cards))}")
-        self.app.root.after(1000, self.start_betting_round)
+        if super().end_betting_round():
+            self.schedule("street", self.start_betting_round)
+        else:
+            self.schedule("round_end", self.end_round)
 
+    @metrics.timed("handle_action")
     def handle_action(self, action, amount=0):
-        player = self.players[self.current_player_index]
-        
-        if action == 'fold':
-            player.is_folded = True
-            self.app.log(f"{player.name}がフォールドしました。")
-        elif action == 'check':
-            self.app.log(f"{player.name}がチェックしました。")
-        elif action == 'call':
-            amount_to_call = self.current_bet - player.bet
-            if amount_to_call >= player.chips:
-                self.app.log(f"{player.name}がオールインしました。")
-                player.bet += player.chips
-                player.chips = 0
-                player.is_all_in = True
-            else:
-                self.app.log(f"{player.name}が{amount_to_call}コールしました。")
-                player.chips -= amount_to_call
-                player.bet += amount_to_call
-        elif action == 'raise':
-            if amount >= player.chips + player.bet:
-                amount = player.chips + player.bet
-                player.is_all_in = True
-                self.app.log(f"{player.name}がオールインレイズ！ ({amount})")
-            else:
-                self.app.log(f"{player.name}が{amount}にレイズしました。")
-
-            amount_to_raise = amount - player.bet
-            player.chips -= amount_to_raise
-            player.bet = amount
-            self.current_bet = player.bet
-            for p in self.players:
-                if p != player and not p.is_folded and not p.is_all_in:
-                    p.has_acted = False
-        
-        player.has_acted = True
-        self.current_player_index = (self.current_player_index + 1) % len(self.players)
-        self.app.root.after(1000, self.process_turn)
-
-    def evaluate_hand(self, hand):
-        all_hands = list(itertools.combinations(hand, 5))
-        best_hand_rank = (-1, [])
-        for h in all_hands:
-            rank = self.get_hand_rank(h)
-            if rank[0] > best_hand_rank[0] or (rank[0] == best_hand_rank[0] and sorted([c.value for c in rank[1]], reverse=True) > sorted([c.value for c in best_hand_rank[1]], reverse=True)):
-                best_hand_rank = rank
-        return best_hand_rank
-
-    def get_hand_rank(self, hand):
-        hand = sorted(hand, key=lambda card: card.value, reverse=True)
-        values = [c.value for c in hand]; suits = [c.suit for c in hand]
-        is_flush = len(set(suits)) == 1
-        is_straight = (len(set(values)) == 5 and max(values) - min(values) == 4) or (values == [14, 5, 4, 3, 2])
-        if is_straight and is_flush: return (8, hand) if values != [14, 13, 12, 11, 10] else (9, hand)
-        counts = sorted({v: values.count(v) for v in set(values)}.items(), key=lambda item: (item[1], item[0]), reverse=True)
-        if counts[0][1] == 4: return (7, sorted(hand, key=lambda c: (c.value != counts[0][0], c.value), reverse=True))
-        if counts[0][1] == 3 and counts[1][1] == 2: return (6, hand)
-        if is_flush: return (5, hand)
-        if is_straight: return (4, [c for c in hand if c.value != 14] + [c for c in hand if c.value == 14]) if values == [14, 5, 4, 3, 2] else (4, hand)
-        if counts[0][1] == 3: return (3, sorted(hand, key=lambda c: (c.value != counts[0][0], c.value), reverse=True))
-        if counts[0][1] == 2 and counts[1][1] == 2: return (2, sorted(hand, key=lambda c: (c.value != counts[0][0] and c.value != counts[1][0], c.value), reverse=True))
-        if counts[0][1] == 2: return (1, sorted(hand, key=lambda c: (c.value != counts[0][0], c.value), reverse=True))
-        return (0, hand)
+        self.apply_action(action, amount)
+        self.schedule("action", self.process_turn)
 
     def end_round(self):
-        self.pot += sum(p.bet for p in self.players)
-        for p in self.players: p.bet = 0
-
-        active_players = [p for p in self.players if not p.is_folded]
-        
-        self.app.log("--- ラウンド終了 ---")
-        for p in self.players: p.show_hand = True
-        self.app.update_display()
-
-        if len(active_players) == 1:
-            winner = active_players[0]
-            winner.chips += self.pot
-            self.app.log(f"{winner.name} の勝利！ポット ({self.pot}) を獲得。")
-        else:
-            winner_data = sorted([{"player": p, "rank": self.evaluate_hand(p.hand + self.community_cards)} for p in active_players], key=lambda x: (x["rank"][0], [c.value for c in x["rank"][1]]), reverse=True)
-            best_rank_tuple = (winner_data[0]["rank"][0], [c.value for c in winner_data[0]["rank"][1]])
-            winners = [d for d in winner_data if (d["rank"][0], [c.value for c in d["rank"][1]]) == best_rank_tuple]
-            
-            winnings = self.pot // len(winners)
-            for w_data in winners:
-                w_data["player"].chips += winnings
-            
-            hand_names = ["ハイカード", "ワンペア", "ツーペア", "スリーカード", "ストレート", "フラッシュ", "フルハウス", "フォーカード", "ストレートフラッシュ", "ロイヤルフラッシュ"]
-            win_hand_name = hand_names[winner_data[0]["rank"][0]]
-            win_hand_str = ' '.join(map(str, winner_data[0]["rank"][1]))
-            winner_names = ", ".join([w["player"].name for w in winners])
-            
-            self.app.log(f"{winner_names} の勝利！ポット ({self.pot}) を獲得。")
-            self.app.log(f"役: {win_hand_name} ({win_hand_str})")
-            
-            for p in active_players:
-                p_rank = self.evaluate_hand(p.hand + self.community_cards)
-                self.app.log(f"  - {p.name}: {' '.join(map(str, p.hand))} ({hand_names[p_rank[0]]})")
-
-        self.game_in_progress = False
+        self.cancel_pending_decision()
+        super().end_round()
+        self.decision_cache.save()
+        if self.prefetcher:
+            self.prefetcher.discard()
+            stats = self.prefetcher.stats()
+            self.app.log(f"先読み: 的中 {stats['hits']}/{stats['hits'] + stats['misses']} ({stats['hit_rate']:.0%}), "
+                         f"無駄な問い合わせ {stats['wasted']}/{stats['issued']}, 短縮 {stats['saved_seconds']:.1f}秒")
+        if self.bot_pool:
+            for name, stats in self.bot_pool.stats().items():
+                self.app.log(f"ボット {name}: 平均 {stats['mean'] * 1000:.0f}ms, p99 {stats['p99'] * 1000:.0f}ms, "
+                             f"時間切れ {stats['timeouts']}/{stats['decisions']}")
+        metrics.observe("scheduled_calls_per_hand", self.scheduled_calls, metrics.COUNT_BUCKETS)
+        if metrics.ENABLED and METRICS_PATH:
+            metrics.dump(METRICS_PATH)
         self.app.show_end_game_options()
 
 # --- GUIアプリケーション ---
 
 class PokerApp:
+    # 席の配置 (円形)
+    SEAT_POSITIONS = [
+        (0.5, 0.85), (0.15, 0.7), (0.1, 0.4), (0.15, 0.1),
+        (0.5, 0.05), (0.85, 0.1), (0.9, 0.4), (0.85, 0.7)
+    ]
+
     def __init__(self, root):
         self.root = root
         self.root.title("ポーカーゲーム")
@@ -411,6 +405,19 @@ class PokerApp:
         self.root.configure(bg="#0d3d14")
 
         self.game = None
+        # 他スレッドからの呼び出しを UI スレッドで実行するためのキュー
+        self.ui_calls = queue.Queue()
+        self.root.bind("<<CallFromThread>>", self.run_thread_calls)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        # 差分描画用: 前回ウィジェットに設定した内容 (席ごと) と、まとめて書き込む前のログ
+        self.rendered_seats = {}
+        self.rendered_center = {}
+        self.pending_log = []
+        self.log_flush_scheduled = False
+        # 勝率の表示: 計算を依頼した局面のキーと、計算済みの (キー, 席ごとの勝率)
+        self.odds_requested = None
+        self.odds = (None, None)
+        self.odds_executor = None
         
         # フォント設定
         self.default_font = font.Font(family="Yu Gothic UI", size=10)
@@ -439,10 +446,15 @@ class PokerApp:
         tk.Label(self.setup_frame, text="Geminiプレイヤーの数:", fg="white", bg="#0d3d14").pack()
         self.gemini_entry = tk.Entry(self.setup_frame, font=self.default_font)
         self.gemini_entry.pack(pady=5)
-        self.gemini_entry.insert(0, "1" if model else "0")
-        if not model:
+        self.gemini_entry.insert(0, "1" if GOOGLE_API_KEY else "0")
+        if not GOOGLE_API_KEY:
             self.gemini_entry.config(state="disabled")
 
+        # 例は bots.BUILTIN_BOTS の名前 (ボットの席がなければ bots.py は読み込まない)
+        tk.Label(self.setup_frame, text="ボット (名前をカンマ区切り、例: equity, call, random):", fg="white", bg="#0d3d14").pack()
+        self.bot_entry = tk.Entry(self.setup_frame, font=self.default_font)
+        self.bot_entry.pack(pady=5)
+
         start_button = tk.Button(self.setup_frame, text="ゲーム開始", command=self.start_game_from_setup, font=self.default_font, bg="#4CAF50", fg="white")
         start_button.pack(pady=20)
 
@@ -451,10 +463,11 @@ class PokerApp:
         try:
             cpu_count = int(self.cpu_entry.get() or 0)
             gemini_count = int(self.gemini_entry.get() or 0)
-            if cpu_count + gemini_count > 7:
-                messagebox.showerror("エラー", "CPUとGeminiの合計は7人以下にしてください。")
+            bot_names = [b.strip() for b in self.bot_entry.get().split(",") if b.strip()]
+            if cpu_count + gemini_count + len(bot_names) > 7:
+                messagebox.showerror("エラー", "CPUとGeminiとボットの合計は7人以下にしてください。")
                 return
-            if cpu_count + gemini_count < 1:
+            if cpu_count + gemini_count + len(bot_names) < 1:
                 messagebox.showerror("エラー", "対戦相手を1人以上指定してください。")
                 return
         except ValueError:
@@ -463,7 +476,7 @@ class PokerApp:
 
         self.setup_frame.destroy()
         self.create_game_frame()
-        self.game = PokerGame(self, name, cpu_count, gemini_count)
+        self.game = PokerGame(self, name, cpu_count, gemini_count, bot_names)
         self.game.start_game()
 
     def create_game_frame(self):
@@ -476,11 +489,6 @@ class PokerApp:
         table_frame.pack(fill="both", expand=True)
 
         self.player_frames = {}
-        # プレイヤーの位置を円形に配置
-        player_positions = [
-            (0.5, 0.85), (0.15, 0.7), (0.1, 0.4), (0.15, 0.1),
-            (0.5, 0.05), (0.85, 0.1), (0.9, 0.4), (0.85, 0.7)
-        ]
 
         for i in range(8): # 最大8人分のフレームを事前に用意
             p_frame = tk.Frame(table_frame, bg="#1a5221", relief="raised", borderwidth=2)
@@ -531,51 +539,115 @@ class PokerApp:
         scrollbar.pack(side="right", fill="y")
         self.log_text.pack(side="left", fill="both", expand=True)
 
-    def update_display(self):
-        if not self.game: return
+    def seat_view(self, index, player):
+        # 席の表示内容 (ウィジェット名 → 設定値)
+        status = ""
+        if player.is_folded: status = " (Fold)"
+        elif player.is_all_in: status = " (All-in)"
 
-        # プレイヤー情報を更新
-        player_positions = [
-            (0.5, 0.85), (0.15, 0.7), (0.1, 0.4), (0.15, 0.1),
-            (0.5, 0.05), (0.85, 0.1), (0.9, 0.4), (0.85, 0.7)
-        ]
-        
-        for i, p_frame_info in self.player_frames.items():
-            p_frame_info["frame"].place_forget()
-
-        for i, player in enumerate(self.game.players):
-            pos = player_positions[i]
-            info = self.player_frames[i]
-            frame = info["frame"]
-            
-            frame.place(relx=pos[0], rely=pos[1], anchor="center")
-
-            status = ""
-            if player.is_folded: status = " (Fold)"
-            elif player.is_all_in: status = " (All-in)"
-            
-            info["name"].config(text=f"{player.name}{status}")
-            info["chips"].config(text=f"Chips: {player.chips}Bet: {player.bet}")
-            
-            if player.show_hand:
-                hand_str = ' '.join(map(str, player.hand))
-                card_color = "cyan" if not player.is_cpu and not player.is_gemini else "white"
-                info["hand"].config(text=hand_str, fg=card_color)
-            else:
-                info["hand"].config(text="🂠 🂠", fg="white")
+        if player.show_hand:
+            hand_text = ' '.join(map(str, player.hand))
+            card_color = "cyan" if not player.is_cpu and not player.is_gemini and player.bot is None else "white"
+        else:
+            hand_text, card_color = "🂠 🂠", "white"
+
+        chips_text = f"Chips: {player.chips}\nBet: {player.bet}"
+        key, odds = self.odds
+        if self.game.game_in_progress and key == self.odds_requested and odds and odds[index] is not None and not player.is_folded:
+            chips_text += f"\n勝率: {odds[index]:.0%}"
+
+        # 現在のプレイヤーをハイライト
+        is_current = self.game.game_in_progress and index == self.game.current_player_index
+        bg = "#e8b422" if is_current else "#1a5221" # Gold / Green
+        return {
+            "frame": {"bg": bg},
+            "name": {"text": f"{player.name}{status}", "bg": bg},
+            "chips": {"text": chips_text, "bg": bg},
+            "hand": {"text": hand_text, "fg": card_color, "bg": bg},
+        }
 
-            # 現在のプレイヤーをハイライト
-            if self.game.game_in_progress and i == self.game.current_player_index:
-                frame.config(bg="#e8b422") # Gold
-                for widget in frame.winfo_children(): widget.config(bg="#e8b422")
-            else:
-                frame.config(bg="#1a5221") # Green
-                for widget in frame.winfo_children(): widget.config(bg="#1a5221")
+    def apply_view(self, widgets, rendered, view):
+        # 前回の設定と異なるオプションだけ config する
+        for name, options in view.items():
+            previous = rendered.setdefault(name, {})
+            changed = {k: v for k, v in options.items() if previous.get(k) != v}
+            if changed:
+                widgets[name].config(**changed)
+                previous.update(changed)
+
+    @metrics.timed("request_odds")
+    def request_odds(self):
+        # 局面 (ハンド, ボードの枚数, 残っている席) が変わっていれば、勝率の計算を UI スレッド以外で始める
+        game = self.game
+        if not LIVE_ODDS or not game.game_in_progress:
+            return
+        live = [i for i, p in enumerate(game.players) if not p.is_folded]
+        key = (game.tracker.hand, len(game.community_cards), tuple(live))
+        if key == self.odds_requested:
+            return
+        self.odds_requested = key
+        if LIVE_ODDS == "all":
+            job = lambda: game.tracker.win_probabilities(live)
+        else:
+            me = next((i for i in live if not (game.players[i].is_cpu or game.players[i].is_gemini or game.players[i].bot)), None)
+            if me is None:
+                return
+            hole = [c.code for c in game.players[me].hand]
+            board = [c.code for c in game.community_cards]
+            def job():
+                # 相手の手札は分からない前提の勝率 (equity.py のサンプリング)
+                import numpy as np
+                import equity
+                odds = [None] * len(game.players)
+                odds[me] = equity.estimate_equity(hole, board, len(live) - 1, samples=LIVE_ODDS_SAMPLES,
+                                                  rng=np.random.default_rng(key[0]))["equity"]
+                return odds
+        def run():
+            try:
+                odds, error = job(), None
+            except Exception as e:
+                odds, error = None, e
+            self.call_from_thread(self.on_odds, key, odds, error)
+        self.background().submit(run)
+
+    def background(self):
+        # 勝率の計算と CPU の探索を UI スレッド以外で行うスレッド (1 本、初めて使うときに作る)
+        if self.odds_executor is None:
+            self.odds_executor = ThreadPoolExecutor(max_workers=1)
+        return self.odds_executor
+
+    def on_odds(self, key, odds, error=None):
+        if key != self.odds_requested:
+            return  # 計算している間に局面が進んだ
+        if error is not None:
+            # この局面の勝率は表示しない (同じ局面で計算し直さないよう odds_requested はそのまま)
+            self.log(f"勝率を計算できませんでした: {error!r}")
+        self.odds = (key, odds)
+        self.update_display()
+
+    @metrics.timed("update_display")
+    def update_display(self):
+        if not self.game: return
+        self.request_odds()
+
+        # プレイヤー情報を更新 (内容が変わったウィジェットだけ触る)
+        for i, info in self.player_frames.items():
+            if i >= len(self.game.players):
+                if i in self.rendered_seats:
+                    info["frame"].place_forget()
+                    del self.rendered_seats[i]
+                continue
+            if i not in self.rendered_seats:
+                relx, rely = self.SEAT_POSITIONS[i]
+                info["frame"].place(relx=relx, rely=rely, anchor="center")
+                self.rendered_seats[i] = {}
+            self.apply_view(info, self.rendered_seats[i], self.seat_view(i, self.game.players[i]))
 
         # ポットとコミュニティカードを更新
-        self.pot_label.config(text=f"Pot: {self.game.pot + sum(p.bet for p in self.game.players)}")
-        self.community_label.config(text=' '.join(map(str, self.game.community_cards)))
-        self.root.update_idletasks()
+        self.apply_view({"pot": self.pot_label, "community": self.community_label}, self.rendered_center, {
+            "pot": {"text": f"Pot: {self.game.pot + sum(p.bet for p in self.game.players)}"},
+            "community": {"text": ' '.join(map(str, self.game.community_cards))},
+        })
 
     def enable_action_buttons(self):
         player = self.game.players[self.game.current_player_index]
@@ -607,7 +679,7 @@ class PokerApp:
 
     def prompt_for_raise(self):
         player = self.game.players[self.game.current_player_index]
-        min_raise = self.game.current_bet * 2 if self.game.current_bet > 0 else self.game.big_blind_amount
+        min_raise = self.game.min_raise()
         max_raise = player.chips + player.bet
         
         amount = simpledialog.askinteger(
@@ -621,22 +693,61 @@ class PokerApp:
             self.game.handle_action('raise', amount)
 
     def log(self, message):
+        # 同じフレーム内のログはまとめて 1 回で書き込む
+        self.pending_log.append(message)
+        if not self.log_flush_scheduled:
+            self.log_flush_scheduled = True
+            self.root.after_idle(self.flush_log)
+
+    @metrics.timed("flush_log")
+    def flush_log(self):
+        self.log_flush_scheduled = False
+        if not self.pending_log:
+            return
+        text = "\n".join(self.pending_log) + "\n"
+        self.pending_log.clear()
         self.log_text.config(state="normal")
-        self.log_text.insert(tk.END, message + "")
+        self.log_text.insert(tk.END, text)
         self.log_text.see(tk.END)
         self.log_text.config(state="disabled")
-        self.root.update_idletasks()
+
+    def call_from_thread(self, callback, *args):
+        # 任意のスレッドから呼べる。Tk のイベントで UI スレッドを起こして callback を実行する
+        self.ui_calls.put((callback, args))
+        self.root.event_generate("<<CallFromThread>>", when="tail")
+
+    def run_thread_calls(self, event=None):
+        while True:
+            try:
+                callback, args = self.ui_calls.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
 
     def show_end_game_options(self):
+        self.flush_log()
         self.disable_action_buttons()
         result = messagebox.askyesno("ゲーム終了", "もう一度プレイしますか？")
         if result:
             self.log("--- 新しいラウンドを開始します ---")
             self.game.start_round()
         else:
-            self.root.quit()
+            self.quit()
+
+    def quit(self):
+        # 「もう一度プレイしない」・ウィンドウを閉じたとき。ゲームとバックグラウンドのスレッドを片付けてから終わる
+        if self.game is not None:
+            self.game.close()
+        if self.odds_executor is not None:
+            self.odds_executor.shutdown(wait=True, cancel_futures=True)
+            self.odds_executor = None
+        self.root.quit()
 
 if __name__ == "__main__":
+    metrics.enable(METRICS_ENABLED)
+    metrics.profile_hands(PROFILE_DIR)
+    if METRICS_ENABLED and METRICS_PORT:
+        metrics.serve(METRICS_PORT)
     root = tk.Tk()
     app = PokerApp(root)
     root.mainloop()
@@ -0,0 +1,171 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# --- 計測 (タイマー・カウンター・ヒストグラム) ---
+# enable() を呼ぶまでは何も記録しない。無効時のコストは関数呼び出し 1 段とフラグの確認だけ。
+# 結果は JSON か Prometheus のテキスト形式でファイルに書き出すか、serve() でローカルに公開する。
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+ENABLED = False
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+_profile_dir = None
+_profiler = None
+_profiled_hands = 0
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'total')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最後は +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        i = 0
+        for edge in self.buckets:
+            if value <= edge:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+def enable(flag=True):
+    global ENABLED
+    ENABLED = flag
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def count(name, value=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def observe(name, value, buckets=LATENCY_BUCKETS):
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+def timed(name):
+    # 関数の実行時間を name_seconds のヒストグラムに記録するデコレーター
+    metric = f"{name}_seconds"
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(metric, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+# --- ハンド単位の cProfile ---
+
+def profile_hands(directory):
+    # directory を指定すると、ハンドごとに cProfile を取り hand_<n>.prof に保存する。None で無効
+    global _profile_dir
+    _profile_dir = directory
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+def start_hand_profile():
+    global _profiler
+    if _profile_dir is None or _profiler is not None:
+        return
+    import cProfile
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+def stop_hand_profile():
+    global _profiler, _profiled_hands
+    if _profiler is None:
+        return
+    _profiler.disable()
+    _profiler.dump_stats(os.path.join(_profile_dir, f"hand_{_profiled_hands}.prof"))
+    _profiler = None
+    _profiled_hands += 1
+
+# --- 出力 ---
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {name: {"buckets": list(h.buckets), "counts": list(h.counts), "count": h.count, "sum": h.total}
+                           for name, h in _histograms.items()},
+        }
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+def to_prometheus(prefix="pokerpy_"):
+    data = snapshot()
+    lines = []
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"# TYPE {prefix}{name}_total counter")
+        lines.append(f"{prefix}{name}_total {value}")
+    for name, h in sorted(data["histograms"].items()):
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        cumulative = 0
+        for edge, c in zip(h["buckets"], h["counts"]):
+            cumulative += c
+            lines.append(f'{prefix}{name}_bucket{{le="{edge}"}} {cumulative}')
+        lines.append(f'{prefix}{name}_bucket{{le="+Inf"}} {h["count"]}')
+        lines.append(f"{prefix}{name}_sum {h['sum']}")
+        lines.append(f"{prefix}{name}_count {h['count']}")
+    return "\n".join(lines) + "\n"
+
+def dump(path):
+    # 拡張子が .json なら JSON、それ以外は Prometheus のテキスト形式
+    text = to_json() if path.endswith(".json") else to_prometheus()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def serve(port=9464, host="127.0.0.1"):
+    # /metrics (Prometheus) と /metrics.json をバックグラウンドで公開する。http.server は使うときだけ読み込む
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body, content_type = to_json(), "application/json"
+            elif self.path.startswith("/metrics"):
+                body, content_type = to_prometheus(), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
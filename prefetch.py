@@ -0,0 +1,111 @@
+import threading
+import time
+from types import SimpleNamespace
+import metrics
+import snapshot
+from cards import CARDS
+from engine import STAGES
+
+# --- Gemini の判断の先読み ---
+# 前の席のプレイヤーが考えている間に、「そのプレイヤーがチェック / コールした」などの仮定で次の Gemini の手番の
+# 状態を作り、先に問い合わせておく。結果は仮定した状態そのもの (プロンプトに入る値の組) をキーに持ち、
+# 実際の手番の状態が一致すれば待たずに (または途中から) 使い、一致しなければ捨てる。
+
+def speculative_view(engine, action):
+    # engine の現在の手番が action をした後の状態を、build_gemini_prompt と decision_key が読める形で返す。
+    # (状態, 次に行動するプレイヤーの添字)。ハンドが終わる場合は None
+    state = snapshot.from_engine(engine).apply(action)
+    if state.is_terminal():
+        return None
+    players = [SimpleNamespace(name=p.name, hand=p.hand, chips=state.chips[i], bet=state.bets[i],
+                               is_folded=state.folded[i], is_all_in=state.all_in[i])
+               for i, p in enumerate(engine.players)]
+    view = SimpleNamespace(players=players, community_cards=[CARDS[c] for c in state.board], pot=state.pot,
+                           current_bet=state.current_bet, big_blind_amount=state.big_blind_amount,
+                           small_blind_index=state.small_blind_index, game_stage=STAGES[state.stage],
+                           min_raise=state.min_raise)
+    return view, state.current
+
+def state_key(game, player):
+    # プロンプトの内容を決める値の組 (同じキーなら同じプロンプトになる)
+    return (game.game_stage, game.pot, game.current_bet, game.min_raise(), game.players.index(player),
+            tuple(c.code for c in player.hand), tuple(c.code for c in game.community_cards),
+            tuple((p.name, p.chips, p.bet, p.is_folded, p.is_all_in) for p in game.players))
+
+class _Entry:
+    __slots__ = ('future', 'start', 'finished', 'result', 'error', 'waiter')
+
+    def __init__(self, start):
+        self.future = None
+        self.start = start
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.waiter = None
+
+class Prefetcher:
+    # 先読みした問い合わせの管理。issue / take / discard は UI スレッドから、応答はループ側のスレッドから届く
+    __slots__ = ('llm', 'entries', 'lock', 'issued', 'hits', 'misses', 'wasted', 'saved_seconds')
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.issued = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def issue(self, key, prompt):
+        entry = self.entries[key] = _Entry(time.perf_counter())
+        self.issued += 1
+        metrics.count("gemini_prefetch_issued")
+
+        def done(result, error):
+            with self.lock:
+                entry.finished = time.perf_counter()
+                entry.result, entry.error = result, error
+                waiter = entry.waiter
+            if waiter is not None:
+                waiter(result, error)
+        entry.future = self.llm.request(prompt, done)
+
+    def take(self, key, on_done):
+        # 実際の手番の状態 key に一致する先読みがあれば、その結果で on_done(result, error) を呼ぶ
+        # (まだ応答がなければ届いたときに呼ぶ)。一致しない先読みはここで捨てる。一致したら先読みの Future を返す
+        entry = self.entries.pop(key, None)
+        self.discard()
+        if entry is None:
+            self.misses += 1
+            metrics.count("gemini_prefetch_misses")
+            return None
+        self.hits += 1
+        metrics.count("gemini_prefetch_hits")
+        now = time.perf_counter()
+        with self.lock:
+            finished = entry.finished is not None
+            if not finished:
+                entry.waiter = on_done
+        saved = (entry.finished if finished else now) - entry.start
+        self.saved_seconds += saved
+        metrics.observe("gemini_prefetch_saved_seconds", saved)
+        if finished:
+            on_done(entry.result, entry.error)
+        return entry.future
+
+    def discard(self):
+        # 使われなかった先読みをすべて捨てる (応答待ちのものは取り消す)
+        for entry in self.entries.values():
+            entry.future.cancel()
+            self.wasted += 1
+            metrics.count("gemini_prefetch_wasted")
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"issued": self.issued, "hits": self.hits, "misses": self.misses, "wasted": self.wasted,
+                "hit_rate": self.hits / total if total else 0.0, "saved_seconds": self.saved_seconds}
@@ -0,0 +1,187 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import equity
+import ranges
+from cards import RANK_CHARS, hand_class
+
+# --- プリフロップ勝率表 (169 クラス) ---
+# スートを区別しない 169 種類のスターティングハンドについて、ランダムな 1〜7 人を相手にした
+# オールイン時の勝率と、クラス同士の勝率を事前に計算して 1 つのバイナリファイルに保存する。
+# 実行時はファイルを np.memmap で開くだけなので、参照は配列の添字 1 回で済む。
+# 作り方: python preflop_table.py build [--samples 20000 --class-samples 2000]
+#
+# ファイル形式 (リトルエンディアン):
+#   ヘッダー: マジック b'PFEQ', バージョン u16, クラス数 u16, 最大相手数 u16, サンプル数 u32, クラス対のサンプル数 u32
+#   vs_random: u16[169][7]   (勝率 * 65535)
+#   vs_class:  u16[169][169] (行のクラスが列のクラスに対して持つ勝率 * 65535)
+
+MAGIC = b'PFEQ'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHII')
+MAX_OPPONENTS = 7
+SCALE = 65535
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.bin")
+
+# クラスの並び: ランクの組ごとにペア、またはスーテッド → オフスート
+CLASS_NAMES = []
+for _high in range(13):
+    for _low in range(_high + 1):
+        if _high == _low:
+            CLASS_NAMES.append(RANK_CHARS[_high] * 2)
+        else:
+            CLASS_NAMES.append(RANK_CHARS[_high] + RANK_CHARS[_low] + 's')
+            CLASS_NAMES.append(RANK_CHARS[_high] + RANK_CHARS[_low] + 'o')
+CLASS_INDEX = {name: i for i, name in enumerate(CLASS_NAMES)}
+
+# 2 枚のカードコード → クラス番号
+_CODE_CLASS = np.full((52, 52), -1, dtype=np.int16)
+for _a in range(52):
+    for _b in range(52):
+        if _a != _b:
+            _CODE_CLASS[_a, _b] = CLASS_INDEX[hand_class((_a, _b))]
+
+_table = None
+_loaded = False
+
+def class_index(hole):
+    a, b = (c if isinstance(c, int) else c.code for c in hole)
+    return int(_CODE_CLASS[a, b])
+
+class PreflopTable:
+    __slots__ = ('vs_random', 'vs_class', 'samples', 'class_samples')
+
+    def __init__(self, vs_random, vs_class, samples, class_samples):
+        self.vs_random = vs_random
+        self.vs_class = vs_class
+        self.samples = samples
+        self.class_samples = class_samples
+
+    def equity(self, hole, opponents=1):
+        # ランダムな opponents 人を相手にした勝率。表の範囲外なら None
+        if not 1 <= opponents <= MAX_OPPONENTS:
+            return None
+        return self.vs_random[class_index(hole), opponents - 1] / SCALE
+
+    def versus(self, hole, other):
+        # hole のクラスが other のクラスに対して持つ勝率 (カードの重なりは考慮しない平均値)
+        return self.vs_class[class_index(hole), class_index(other)] / SCALE
+
+    def class_equity(self, name, opponents=1):
+        return self.vs_random[CLASS_INDEX[name], opponents - 1] / SCALE
+
+def load(path=DEFAULT_PATH):
+    # ファイルを読み取り専用でメモリマップする。ファイルがなければ None
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path}: ヘッダーが壊れています")
+    magic, version, classes, max_opponents, samples, class_samples = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or classes != len(CLASS_NAMES) or max_opponents != MAX_OPPONENTS:
+        raise ValueError(f"{path}: 対応していない勝率表です (version {version})")
+    expected = HEADER.size + 2 * classes * (max_opponents + classes)
+    if os.path.getsize(path) != expected:
+        raise ValueError(f"{path}: ファイルサイズが一致しません")
+    vs_random = np.memmap(path, dtype='<u2', mode='r', offset=HEADER.size, shape=(classes, max_opponents))
+    vs_class = np.memmap(path, dtype='<u2', mode='r', offset=HEADER.size + 2 * classes * max_opponents, shape=(classes, classes))
+    return PreflopTable(vs_random, vs_class, samples, class_samples)
+
+def get_table():
+    # 既定のファイルを初回だけ読み込む。壊れている・古い表は一度だけ警告して、表がないものとして扱う
+    # (preflop_equity が None を返し、呼び出し側はサンプリングで求める)
+    global _table, _loaded
+    if not _loaded:
+        _loaded = True
+        try:
+            _table = load(DEFAULT_PATH)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"警告: プリフロップの勝率表を使えません ({e})", file=sys.stderr)
+            _table = None
+    return _table
+
+def preflop_equity(hole, opponents=1):
+    # 勝率表があれば O(1) で返す。表がないか範囲外なら None (呼び出し側でサンプリングする)
+    table = get_table()
+    return table.equity(hole, opponents) if table is not None else None
+
+# --- 生成 ---
+
+def _random_row(index, samples):
+    hole = ranges.parse_range(CLASS_NAMES[index])[0]
+    rng = np.random.default_rng(index)
+    return [equity.estimate_equity(hole, (), k, samples=samples, rng=rng)["equity"] for k in range(1, MAX_OPPONENTS + 1)]
+
+def _class_row(index, samples):
+    # 対角より右側だけ計算する (左側は 1 - 勝率で埋める)
+    hero = ranges.parse_range(CLASS_NAMES[index])
+    return [ranges.range_equity(hero, ranges.parse_range(CLASS_NAMES[j]), (), samples=samples, seed=index * 169 + j)["equity"]
+            for j in range(index, len(CLASS_NAMES))]
+
+def _build_row(kind, index, samples):
+    return kind, index, (_random_row if kind == "random" else _class_row)(index, samples)
+
+def build(path=DEFAULT_PATH, samples=20000, class_samples=2000, workers=None, progress=None):
+    classes = len(CLASS_NAMES)
+    vs_random = np.zeros((classes, MAX_OPPONENTS))
+    vs_class = np.zeros((classes, classes))
+    tasks = [("random", i, samples) for i in range(classes)] + [("class", i, class_samples) for i in range(classes)]
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(_build_row, *task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            kind, i, row = future.result()
+            if kind == "random":
+                vs_random[i] = row
+            else:
+                vs_class[i, i:] = row
+                vs_class[i:, i] = 1 - np.array(row)
+            if progress:
+                progress(done, len(tasks))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, classes, MAX_OPPONENTS, samples, class_samples))
+        f.write(np.round(vs_random * SCALE).astype('<u2').tobytes())
+        f.write(np.round(vs_class * SCALE).astype('<u2').tobytes())
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="プリフロップ勝率表の生成と参照")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="勝率表を計算して保存する")
+    build_parser.add_argument("--out", default=DEFAULT_PATH)
+    build_parser.add_argument("--samples", type=int, default=20000, help="クラス × 相手人数ごとのサンプル数")
+    build_parser.add_argument("--class-samples", type=int, default=2000, help="クラス対ごとのサンプル数")
+    build_parser.add_argument("--workers", type=int, default=None)
+    show_parser = sub.add_parser("show", help="クラスの勝率を表示する (例: show AKs QQ)")
+    show_parser.add_argument("classes", nargs="+")
+    show_parser.add_argument("--path", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        def report(done, total):
+            print(f"\r{done}/{total} 行 ({time.perf_counter() - start:.1f}s)", end="", file=sys.stderr, flush=True)
+        build(args.out, args.samples, args.class_samples, args.workers, report)
+        print(file=sys.stderr)
+        print(f"{args.out} に保存しました")
+        return
+
+    table = load(args.path)
+    if table is None:
+        sys.exit(f"{args.path} がありません。先に build を実行してください")
+    for name in args.classes:
+        row = " ".join(f"{table.class_equity(name, k):.3f}" for k in range(1, MAX_OPPONENTS + 1))
+        print(f"{name:4s} 相手 1〜{MAX_OPPONENTS} 人: {row}")
+    if len(args.classes) == 2:
+        a, b = args.classes
+        print(f"{a} 対 {b}: {table.vs_class[CLASS_INDEX[a], CLASS_INDEX[b]] / SCALE:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from itertools import combinations
+import numpy as np
+import evaluator
+import equity
+from cards import SUITS, RANKS, RANK_VALUES, hand_class
+
+# --- レンジ対レンジの勝率 ---
+# レンジの書式 (カンマ区切り): "QQ+", "22-55", "AKs", "AKo", "AK", "A2s+", "KTs-K8s", "AhKh" / "A♥K♥",
+# "any" (全 1326 通り), "20%" / "top 20%" (強い順のクラスから 20% 分)。10 は "T" でも "10" でもよい。
+# フロップ以降は残りのランアウトをすべて数え上げ、プリフロップはサンプリングで求める。
+
+RANK_INDEX = {r: RANK_VALUES[r] - 2 for r in RANKS}
+RANK_INDEX['T'] = RANK_INDEX['10']
+SUIT_INDEX = {s: i for i, s in enumerate(SUITS)}
+SUIT_INDEX.update({c: i for i, c in enumerate('shdc')})  # SUITS と同じ順 (♠♥♦♣)
+
+CACHE_SIZE = 256
+_cache = OrderedDict()
+_ranking = None
+
+def _rank(ch):
+    if ch not in RANK_INDEX:
+        raise ValueError(f"不正なランク: {ch!r}")
+    return RANK_INDEX[ch]
+
+def _card(text):
+    # "Ah", "A♥" などを整数コードに
+    rank, suit = text[0], text[1]
+    if suit not in SUIT_INDEX:
+        raise ValueError(f"不正なスート: {text!r}")
+    return SUIT_INDEX[suit] * 13 + _rank(rank)
+
+def class_combos(high, low, kind=None):
+    # ランク番号 high, low のクラスに含まれる組み合わせ。kind: 's' (スーテッド) / 'o' (オフスート) / None (両方)
+    if high == low:
+        return [(s1 * 13 + high, s2 * 13 + high) for s1, s2 in combinations(range(4), 2)]
+    combos = []
+    for s1 in range(4):
+        for s2 in range(4):
+            if (kind == 's' and s1 != s2) or (kind == 'o' and s1 == s2):
+                continue
+            combos.append((s1 * 13 + high, s2 * 13 + low))
+    return combos
+
+def _parse_class(token):
+    # "AKs" → (12, 11, 's')。ペアは kind が None
+    high, low = _rank(token[0]), _rank(token[1])
+    kind = token[2] if len(token) > 2 else None
+    if kind not in (None, 's', 'o') or len(token) > 3:
+        raise ValueError(f"不正なハンド表記: {token!r}")
+    if high < low:
+        high, low = low, high
+    return high, low, kind
+
+def class_ranking():
+    # 169 クラスをランダムな 1 人に対する勝率の高い順に並べたもの (初回に計算してキャッシュ)
+    # プリフロップ勝率表 (preflop_table.py) があればそれを使い、なければサンプリングで求める
+    global _ranking
+    if _ranking is None:
+        import preflop_table  # preflop_table は ranges を使って表を作るので、ここで読み込む
+        table = preflop_table.get_table()
+        if table is not None:
+            _ranking = sorted(preflop_table.CLASS_NAMES, key=lambda name: -table.class_equity(name))
+            return _ranking
+        rng = np.random.default_rng(0)
+        scores = {}
+        for high in range(13):
+            for low in range(high + 1):
+                for kind in ((None,) if high == low else ('s', 'o')):
+                    hole = class_combos(high, low, kind)[0]
+                    scores[hand_class(hole)] = equity.estimate_equity(hole, (), 1, samples=4000, rng=rng)["equity"]
+        _ranking = sorted(scores, key=lambda name: -scores[name])
+    return _ranking
+
+def _top_percent(percent):
+    target = 1326 * percent / 100
+    combos = []
+    for name in class_ranking():
+        if len(combos) >= target:
+            break
+        combos.extend(class_combos(*_parse_class(name)))
+    return combos
+
+def _expand_token(token):
+    if token == 'any':
+        return list(combinations(range(52), 2))
+    if token.endswith('%'):
+        return _top_percent(float(token[:-1].replace('top', '')))
+    token = token.replace('10', 'T')
+    if len(token) == 4 and token[1] in SUIT_INDEX and token[3] in SUIT_INDEX:
+        # 具体的な 2 枚 ("AhKh", "A♥K♥")
+        return [(_card(token[:2]), _card(token[2:]))]
+    if '-' in token:
+        start, end = token.split('-')
+        h1, l1, k1 = _parse_class(start)
+        h2, l2, k2 = _parse_class(end)
+        if h1 == l1 and h2 == l2:  # 22-55
+            return [c for r in range(min(h1, h2), max(h1, h2) + 1) for c in class_combos(r, r)]
+        if h1 != h2 or k1 != k2:
+            raise ValueError(f"不正な範囲: {token!r}")
+        return [c for r in range(min(l1, l2), max(l1, l2) + 1) for c in class_combos(h1, r, k1)]
+    if token.endswith('+'):
+        high, low, kind = _parse_class(token[:-1])
+        if high == low:  # QQ+
+            return [c for r in range(high, 13) for c in class_combos(r, r)]
+        return [c for r in range(low, high) for c in class_combos(high, r, kind)]  # A2s+
+    return class_combos(*_parse_class(token))
+
+def parse_range(text):
+    # レンジ表記を重複のない組み合わせ (小さいコード, 大きいコード) のリストにする
+    combos = set()
+    for token in text.replace(' ', '').split(','):
+        if not token:
+            continue
+        for a, b in _expand_token(token):
+            if a == b:
+                raise ValueError(f"同じカードを 2 枚含む組み合わせ: {token!r}")
+            combos.add((min(a, b), max(a, b)))
+    return sorted(combos)
+
+def combo_array(hand_range, board=()):
+    # レンジ (表記または組み合わせのリスト) を形状 (n, 2) の配列にし、ボードと重なる組み合わせを除く
+    combos = parse_range(hand_range) if isinstance(hand_range, str) else sorted((min(a, b), max(a, b)) for a, b in hand_range)
+    dead = set(board)
+    return np.array([c for c in combos if c[0] not in dead and c[1] not in dead], dtype=np.int64).reshape(-1, 2)
+
+def range_categories(hand_range, board):
+    # ボード上でレンジ内の組み合わせが作っている役の割合 {役名: 割合}
+    combos = combo_array(hand_range, board)
+    if len(combos) == 0 or len(board) < 3:
+        return {}
+    cards = np.concatenate([combos, np.broadcast_to(np.array(board, dtype=np.int64), (len(combos), len(board)))], axis=1)
+    categories = equity.evaluate_batch(cards) >> evaluator.CATEGORY_SHIFT
+    counts = np.bincount(categories, minlength=len(evaluator.HAND_NAMES))
+    return {evaluator.HAND_NAMES[i]: int(n) / len(combos) for i, n in enumerate(counts) if n}
+
+def _exact(hero, villain, board):
+    # 残りのランアウトをすべて数え上げる。組み合わせの対ごとに勝率を出し、対について平均する
+    board = list(board)
+    deck = [c for c in range(52) if c not in board]
+    runouts = list(combinations(deck, 5 - len(board)))
+    runouts = np.array(runouts, dtype=np.int64).reshape(len(runouts), 5 - len(board))
+    full = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int64), (len(runouts), len(board))), runouts], axis=1)
+    runout_masks = np.left_shift(np.int64(1), runouts).sum(axis=1)
+
+    def strengths(combos):
+        cards = np.concatenate([np.broadcast_to(combos[:, None, :], (len(combos), len(full), 2)),
+                                np.broadcast_to(full[None], (len(combos), len(full), 5))], axis=2)
+        masks = np.left_shift(np.int64(1), combos).sum(axis=1)
+        return _evaluate_rows(cards), (runout_masks[None, :] & masks[:, None]) == 0
+
+    hero_strength, hero_valid = strengths(hero)
+    villain_strength, villain_valid = strengths(villain)
+    hero_masks = np.left_shift(np.int64(1), hero).sum(axis=1)
+    villain_masks = np.left_shift(np.int64(1), villain).sum(axis=1)
+
+    win = tie = 0.0
+    pairs = 0
+    for i in range(len(hero)):
+        others = (villain_masks & hero_masks[i]) == 0
+        if not others.any():
+            continue
+        valid = villain_valid[others] & hero_valid[i]
+        s = hero_strength[i]
+        v = villain_strength[others]
+        n = valid.sum(axis=1)
+        win += (((s > v) & valid).sum(axis=1) / n).sum()
+        tie += (((s == v) & valid).sum(axis=1) / n).sum()
+        pairs += int(others.sum())
+    return win, tie, pairs, len(runouts)
+
+def _evaluate_rows(cards):
+    # 大きな配列はメモリを抑えるため行ごとに分けて評価する
+    out = np.empty(cards.shape[:-1], dtype=np.int32)
+    step = max(1, 1_000_000 // max(1, cards.shape[1]))
+    for start in range(0, len(cards), step):
+        out[start:start + step] = equity.evaluate_batch(cards[start:start + step])
+    return out
+
+def _sampled(hero, villain, samples, seed, batch_size=20000):
+    # ランダムな組み合わせの対と 5 枚のボードを一括で引く (カードが重なる対は捨てる)
+    rng = np.random.default_rng(seed)
+    hero_masks = np.left_shift(np.int64(1), hero).sum(axis=1)
+    villain_masks = np.left_shift(np.int64(1), villain).sum(axis=1)
+    win = tie = 0.0
+    done = attempts = 0
+    while done < samples:
+        batch = min(batch_size, samples - done)
+        i = rng.integers(len(hero), size=batch)
+        j = rng.integers(len(villain), size=batch)
+        ok = (hero_masks[i] & villain_masks[j]) == 0
+        attempts += batch
+        if not ok.any():
+            if attempts > samples * 100:
+                break  # 両レンジがほぼ完全に重なっている
+            continue
+        i, j = i[ok], j[ok]
+        n = len(i)
+        keys = rng.random((n, 52))
+        rows = np.arange(n)[:, None]
+        keys[rows, hero[i]] = 2.0
+        keys[rows, villain[j]] = 2.0
+        board = np.argpartition(keys, 5, axis=1)[:, :5].astype(np.int64)
+        s = equity.evaluate_batch(np.concatenate([hero[i], board], axis=1))
+        v = equity.evaluate_batch(np.concatenate([villain[j], board], axis=1))
+        win += float((s > v).sum())
+        tie += float((s == v).sum())
+        done += n
+    return win, tie, done
+
+def range_equity(hero_range, villain_range, board=(), samples=200000, seed=0):
+    # board は 0 枚 (サンプリング) か 3〜5 枚 (全列挙)。戻り値: {"equity", "win", "tie", "combos": [自分, 相手], "pairs" or "samples", "exact", "categories"}
+    # 結果は (レンジ, レンジ, ボード, サンプル数, シード) ごとにキャッシュする
+    board = [c if isinstance(c, int) else c.code for c in board]
+    if len(board) not in (0, 3, 4, 5):
+        # 1〜2 枚のボードはサンプリングで無視されてしまうので受け付けない
+        raise ValueError(f"ボードは 0・3・4・5 枚にしてください ({len(board)} 枚)")
+    hero = combo_array(hero_range, board)
+    villain = combo_array(villain_range, board)
+    key = (hero.tobytes(), villain.tobytes(), tuple(sorted(board)), samples if len(board) < 3 else None, seed)
+    cached = _cache.get(key)
+    if cached is not None:
+        _cache.move_to_end(key)
+        return cached
+    if len(hero) == 0 or len(villain) == 0:
+        raise ValueError("ボードと重ならない組み合わせがレンジにありません")
+
+    if len(board) >= 3:
+        win, tie, pairs, runouts = _exact(hero, villain, board)
+        result = {"exact": True, "pairs": pairs, "runouts": runouts,
+                  "categories": [range_categories(hero, board), range_categories(villain, board)]}
+        total = pairs
+    else:
+        win, tie, total = _sampled(hero, villain, samples, seed)
+        result = {"exact": False, "samples": total, "categories": [{}, {}]}
+    if total == 0:
+        raise ValueError("カードが重ならない組み合わせの対がありません")
+    result.update({"equity": float(win + tie / 2) / total, "win": float(win) / total, "tie": float(tie) / total,
+                   "combos": [len(hero), len(villain)]})
+
+    _cache[key] = result
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
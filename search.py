@@ -0,0 +1,91 @@
+import math
+import random
+import time
+import evaluator
+import snapshot
+
+# --- 先読みする CPU (スナップショット上のモンテカルロ探索) ---
+# 候補アクションごとに、見えないカードを配り直した状態 (determinize) で最後までプレイアウトし、
+# 精算後のチップの平均が大きいアクションを選ぶ。候補の試し方は UCB1 で、最後は最も多く試したものにする。
+# 1 手あたりの予算は適用したアクション数 (nodes) と秒数 (time_budget) の早い方で打ち切る。
+
+EXPLORATION = 1.4
+
+def candidate_actions(state):
+    # 探索する候補: フォールド / チェックまたはコール / 最低レイズ / ポットサイズ / オールイン
+    seat = state.current
+    to_call = state.to_call()
+    actions = [('check', 0)] if to_call <= 0 else [('fold', 0), ('call', 0)]
+    if state.chips[seat] > to_call:
+        stack = state.chips[seat] + state.bets[seat]
+        amounts = {min(state.min_raise(), stack), min(state.current_bet + state.pot_total() + to_call, stack), stack}
+        actions.extend(('raise', amount) for amount in sorted(amounts) if amount > state.current_bet)
+    return actions
+
+def hand_score(state, seat):
+    # プレイアウト用の大まかな勝率 (ランダムな 1 人に対する値に近づけたもの)。
+    # プリフロップはランクとペア・スート、以降は役のカテゴリから決める
+    hole = state.holes[seat]
+    if not state.board:
+        high, low = max(c % 13 for c in hole), min(c % 13 for c in hole)
+        if high == low:
+            return 0.5 + high * 0.028
+        return 0.3 + (high * 2 + low) / 36 * 0.35 + (0.03 if hole[0] // 13 == hole[1] // 13 else 0)
+    return _CATEGORY_SCORES[evaluator.hand_category(evaluator.evaluate(list(hole) + list(state.board)))]
+
+_CATEGORY_SCORES = (0.25, 0.55, 0.75, 0.85, 0.88, 0.9, 0.94, 0.97, 1.0, 1.0)
+
+def rollout_action(state, rng):
+    # プレイアウト用の軽い方針 (通常の CPU に近いもの): 勝率の見積もりがポットオッズを下回れば降り、
+    # 十分強ければときどきレイズする
+    seat = state.current
+    to_call = state.to_call()
+    win_rate = hand_score(state, seat) ** (len(state.live_seats()) - 1)
+    can_raise = state.chips[seat] > to_call
+    if to_call > 0 and win_rate < to_call / (state.pot_total() + to_call):
+        return 'fold', 0
+    if can_raise and win_rate > 0.6 and rng.random() < 0.3:
+        return 'raise', state.min_raise()
+    return ('check' if to_call <= 0 else 'call'), 0
+
+def search_action(engine, player, nodes=3000, time_budget=0.2, rng=None):
+    # engine の現在の手番 (player) のアクションを探索で決める。戻り値は (action, amount)
+    rng = rng or random
+    root = snapshot.from_engine(engine)
+    seat = engine.players.index(player)
+    actions = candidate_actions(root)
+    if len(actions) == 1:
+        return actions[0]
+
+    # 値は「このハンドの開始からのチップの増減」を卓上の総チップで正規化したもの
+    start = root.chips[seat] + root.contributed[seat]
+    scale = sum(root.chips) + root.pot_total() or 1
+    visits = [0] * len(actions)
+    totals = [0.0] * len(actions)
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    spent = 0
+    while spent < nodes:
+        total_visits = sum(visits) + 1
+        k = max(range(len(actions)), key=lambda i: float('inf') if visits[i] == 0 else
+                totals[i] / visits[i] + EXPLORATION * math.sqrt(math.log(total_visits) / visits[i]))
+        state = root.determinize(seat, rng).apply(*actions[k])
+        spent += 1
+        while not state.is_terminal():
+            state = state.apply(*rollout_action(state, rng))
+            spent += 1
+        visits[k] += 1
+        totals[k] += (state.payoffs()[seat] - start) / scale
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+
+    # 平均値の最大ではなく最も多く試した候補を選ぶ (分散の大きいオールインが偶然選ばれにくい)
+    best = max(range(len(actions)), key=lambda i: (visits[i], totals[i]))
+    return actions[best]
+
+def search_policy(nodes=3000, time_budget=0.2, seats=None, rng=None):
+    # PokerEngine.play_hand に渡す decide。seats (プレイヤーの集合) 以外は通常の CPU ロジックで判断する
+    def decide(engine, player):
+        if seats is not None and player not in seats:
+            return engine.cpu_action(player)
+        return search_action(engine, player, nodes, time_budget, rng or engine.rng)
+    return decide
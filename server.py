@@ -0,0 +1,647 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import time
+import metrics
+from engine import PokerEngine, Player, ACTION, BETTING_OVER
+
+# --- 複数テーブルのゲームサーバー (asyncio, 1 プロセス) ---
+# localhost の 1 つのポートで、1 行 1 JSON の TCP と WebSocket (最初の行が "GET " なら WebSocket) を受け付ける。
+# ルールは PokerEngine と同じ。カードは 0〜51 の整数コード (hand_history.py と同じ)。
+#
+# クライアント → サーバー:
+#   {"op": "join", "table": "t1", "name": "alice", "size": 6}  テーブルに座る (table 省略時は空いている卓)
+#   {"op": "act", "action": "fold|check|call|raise|all-in", "amount": 額}
+#   {"op": "leave"} / {"op": "stats"}
+# サーバー → クライアント:
+#   {"op": "joined", "table", "seat"}  {"op": "state", "seq", ...全体}  {"op": "delta", "seq", ...変わった項目だけ}
+#   {"op": "hole", "hand", "cards"}  {"op": "turn", "hand", "legal", "to_call", "min_raise", "timeout"}
+#   {"op": "result", "hand", "payouts": {席: 額}, "shown": {席: [カード, カード]}}  {"op": "busted"}  {"op": "error", "message"}
+# 読めないメッセージ (JSON でない・オブジェクトでない・項目の型が違う) には error を返して接続は続ける。
+# WebSocket のフレームが MAX_FRAME バイトを超えたらクローズコード 1009 で切断する。
+# 状態: {"stage", "pot", "bet", "sb", "board": [カード], "seats": {席: [名前, チップ, ベット, 降りた, オールイン]}}
+# delta の "act" は直前のアクション [席, アクション, 額]。手番が ACTION_TIMEOUT 秒以内に来なければ
+# チェック (できなければフォールド) で進める。
+# 使い方: python server.py serve [--port 9100] / 負荷試験: python server.py load [--tables 100 --players 6 --hands 50]
+
+ACTION_TIMEOUT = 10.0
+STARTING_CHIPS = 1000
+FILL_WAIT = 1.0        # 2 人以上座ってからこの秒数だれも来なければ満席でなくても始める
+MAX_WRITE_BUFFER = 1 << 20  # 送信待ちがこれを超えたクライアントは切断する
+MAX_FRAME = 1 << 16         # 受け付ける WebSocket のメッセージの最大バイト数 (JSON Lines の 1 行も同じく asyncio の既定 64KiB まで)
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B7C"
+VALID_ACTIONS = ('fold', 'check', 'call', 'raise', 'all-in')
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':'))
+
+class MessageError(ValueError):
+    # クライアントのメッセージの形が違う (接続は切らずに error を返す)
+    pass
+
+def _field(message, name, kind, default=None):
+    value = message.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise MessageError(f"{name} の型が違います: {value!r}")
+    return value
+
+# --- 接続 (JSON Lines / WebSocket) ---
+
+class LineConnection:
+    __slots__ = ('reader', 'writer', 'closed')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    async def read(self):
+        line = await self.reader.readline()
+        return json.loads(line) if line else None
+
+    def send(self, data):
+        if self.closed or self.writer.transport.is_closing():
+            self.closed = True
+            return
+        self.writer.write(data.encode() + b"\n")
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+def _mask(payload, key):
+    n = len(payload)
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes((key * (n // 4 + 1))[:n], 'big')).to_bytes(n, 'big')
+
+class WebSocketConnection(LineConnection):
+    # テキストフレームだけを扱う最小限の RFC 6455。client=True なら送信フレームをマスクする
+    __slots__ = ('client',)
+
+    def __init__(self, reader, writer, client=False):
+        super().__init__(reader, writer)
+        self.client = client
+
+    async def read(self):
+        message = b""
+        try:
+            while True:
+                head = await self.reader.readexactly(2)
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack('>H', await self.reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack('>Q', await self.reader.readexactly(8))[0]
+                if len(message) + length > MAX_FRAME:
+                    self._frame(0x8, struct.pack('>H', 1009))  # Message Too Big
+                    self.close()
+                    return None
+                key = await self.reader.readexactly(4) if head[1] & 0x80 else None
+                payload = await self.reader.readexactly(length)
+                if key:
+                    payload = _mask(payload, key)
+                opcode = head[0] & 0x0F
+                if opcode == 0x8:
+                    return None
+                if opcode == 0x9:
+                    self._frame(0xA, payload)
+                    continue
+                if opcode == 0xA:
+                    continue
+                message += payload
+                if head[0] & 0x80:
+                    return json.loads(message)
+        except asyncio.IncompleteReadError:
+            return None
+
+    def send(self, data):
+        if self.closed or self.writer.transport.is_closing():
+            self.closed = True
+            return
+        self._frame(0x1, data.encode())
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.close()
+
+    def _frame(self, opcode, payload):
+        n = len(payload)
+        mask_bit = 0x80 if self.client else 0
+        if n < 126:
+            head = struct.pack('>BB', 0x80 | opcode, mask_bit | n)
+        elif n < 1 << 16:
+            head = struct.pack('>BBH', 0x80 | opcode, mask_bit | 126, n)
+        else:
+            head = struct.pack('>BBQ', 0x80 | opcode, mask_bit | 127, n)
+        if self.client:
+            key = os.urandom(4)
+            head += key
+            payload = _mask(payload, key)
+        self.writer.write(head + payload)
+
+async def _read_headers(reader):
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+async def accept_websocket(reader, writer):
+    # リクエスト行は読み終えた状態で呼ぶ
+    headers = await _read_headers(reader)
+    key = headers.get('sec-websocket-key')
+    if key is None:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+        writer.close()
+        return None
+    accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+    writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+    return WebSocketConnection(reader, writer)
+
+async def connect(host, port, websocket=False):
+    # クライアント側の接続 (負荷試験用)
+    reader, writer = await asyncio.open_connection(host, port)
+    if not websocket:
+        return LineConnection(reader, writer)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    status = await reader.readline()
+    await _read_headers(reader)
+    if b" 101 " not in status:
+        raise ConnectionError(f"WebSocket のハンドシェイクに失敗しました: {status!r}")
+    return WebSocketConnection(reader, writer, client=True)
+
+# --- テーブル ---
+
+class TableEngine(PokerEngine):
+    __slots__ = ('result',)
+
+    def on_round_end(self, result):
+        self.result = result
+
+class Client:
+    __slots__ = ('conn', 'name', 'table', 'seat', 'player', 'pending', 'gone')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.name = None
+        self.table = None
+        self.seat = None
+        self.player = None
+        self.pending = None
+        self.gone = False
+
+class Table:
+    __slots__ = ('id', 'size', 'server', 'seats', 'engine', 'seat_of', 'view', 'seq', 'hands', 'changed', 'task')
+
+    def __init__(self, table_id, size, server):
+        self.id = table_id
+        self.size = size
+        self.server = server
+        self.seats = [None] * size
+        self.engine = TableEngine(seed=server.rng.getrandbits(64))
+        self.engine.result = None
+        self.seat_of = {}
+        self.view = None
+        self.seq = 0
+        self.hands = 0
+        self.changed = asyncio.Event()
+        self.task = None
+
+    def seated(self):
+        return [c for c in self.seats if c is not None]
+
+    def sit(self, client):
+        seat = self.seats.index(None)
+        self.seats[seat] = client
+        client.table, client.seat = self, seat
+        client.player = Player(client.name, chips=self.server.chips)
+        self.changed.set()
+        return seat
+
+    def unseat(self, client):
+        self.seats[client.seat] = None
+        client.table = None
+        self.changed.set()
+
+    # --- 状態と差分 ---
+
+    def snapshot_view(self):
+        engine = self.engine
+        in_hand = set(map(id, engine.players)) if engine.game_in_progress else set()
+        seats = {}
+        for client in self.seated():
+            p = client.player
+            playing = id(p) in in_hand
+            seats[str(client.seat)] = [p.name, p.chips, p.bet if playing else 0, p.is_folded or not playing, p.is_all_in and playing]
+        sb = engine.players[engine.small_blind_index] if engine.players and engine.small_blind_index >= 0 else None
+        return {"stage": engine.game_stage, "pot": engine.pot, "bet": engine.current_bet,
+                "sb": self.seat_of.get(id(sb)), "board": [c.code for c in engine.community_cards], "seats": seats}
+
+    def full_state(self):
+        return dict(self.view or self.snapshot_view(), op="state", table=self.id, seq=self.seq)
+
+    def broadcast_delta(self, act=None, exclude=None):
+        # 前回送った状態から変わった項目だけを送る
+        view = self.snapshot_view()
+        old = self.view or {}
+        delta = {key: value for key, value in view.items() if key != "seats" and old.get(key) != value}
+        old_seats = old.get("seats", {})
+        seats = {seat: row for seat, row in view["seats"].items() if old_seats.get(seat) != row}
+        if seats:
+            delta["seats"] = seats
+        removed = [seat for seat in old_seats if seat not in view["seats"]]
+        if removed:
+            delta["left"] = removed
+        self.view = view
+        self.seq += 1
+        delta.update(op="delta", seq=self.seq)
+        if act is not None:
+            delta["act"] = act
+        self.broadcast(delta, exclude)
+
+    def broadcast(self, message, exclude=None):
+        data = encode(message)
+        for client in self.seated():
+            if client is not exclude:
+                client.conn.send(data)
+
+    # --- 進行 ---
+
+    async def run(self):
+        try:
+            while await self.wait_for_players():
+                await self.play_hand()
+                await asyncio.sleep(self.server.hand_delay)
+        finally:
+            self.server.tables.pop(self.id, None)
+
+    async def wait_for_players(self):
+        while True:
+            self.cleanup()
+            seated = self.seated()
+            if not seated:
+                return False
+            if len(seated) >= self.size:
+                return True
+            self.changed.clear()
+            if len(seated) < 2:
+                await self.changed.wait()
+                continue
+            try:
+                await asyncio.wait_for(self.changed.wait(), self.server.fill_wait)
+            except asyncio.TimeoutError:
+                return True
+
+    def cleanup(self):
+        # 切断したクライアントとチップがなくなったクライアントを席から外す
+        removed = False
+        for client in self.seated():
+            if client.gone:
+                self.unseat(client)
+                removed = True
+            elif client.player.chips <= 0:
+                client.conn.send(encode({"op": "busted", "table": self.id}))
+                self.unseat(client)
+                removed = True
+        if removed and self.view is not None:
+            self.broadcast_delta()
+
+    async def play_hand(self):
+        engine = self.engine
+        clients = [c for c in self.seated() if not c.gone]
+        engine.players = [c.player for c in clients]
+        self.seat_of = {id(c.player): c.seat for c in clients}
+        if not engine.start_hand():
+            return
+        self.hands += 1
+        for client in clients:
+            client.conn.send(encode({"op": "hole", "table": self.id, "hand": self.hands, "cards": [c.code for c in client.player.hand]}))
+        self.broadcast_delta()
+
+        while True:
+            status = engine.step()
+            if status == ACTION:
+                player = engine.players[engine.current_player_index]
+                seat = self.seat_of[id(player)]
+                action, amount = await self.ask(self.seats[seat], player)
+                engine.apply_action(action, amount)
+                self.server.actions += 1
+                self.broadcast_delta([seat, action, amount])
+            elif status == BETTING_OVER and engine.end_betting_round():
+                engine.start_betting_round()
+                self.broadcast_delta()
+            else:
+                break
+
+        engine.end_round()
+        result = engine.result
+        self.server.hands += 1
+        metrics.count("server_hands")
+        shown = {str(self.seat_of[id(p)]): [c.code for c in p.hand] for p in result["ranks"]}
+        self.broadcast_delta()
+        self.broadcast({"op": "result", "table": self.id, "hand": self.hands,
+                        "payouts": {str(self.seat_of[id(p)]): amount for p, amount in result["payouts"].items()},
+                        "shown": shown})
+
+    async def ask(self, client, player):
+        # 手番のクライアントにアクションを求める。時間切れ・切断ならチェック (できなければフォールド)
+        engine = self.engine
+        to_call = engine.current_bet - player.bet
+        default = ('check' if to_call <= 0 else 'fold'), 0
+        if client.gone:
+            return default
+        client.pending = asyncio.get_running_loop().create_future()
+        client.conn.send(encode({"op": "turn", "table": self.id, "hand": self.hands, "legal": engine.legal_actions(),
+                                 "to_call": min(to_call, player.chips), "min_raise": engine.min_raise(),
+                                 "timeout": self.server.action_timeout}))
+        try:
+            decision = await asyncio.wait_for(client.pending, self.server.action_timeout)
+        except asyncio.TimeoutError:
+            self.server.timeouts += 1
+            metrics.count("server_action_timeouts")
+            return default
+        finally:
+            client.pending = None
+        if decision is None:
+            return default
+        action, amount = decision
+        if action == 'all-in':
+            return 'raise', player.chips + player.bet
+        return action, amount
+
+# --- サーバー ---
+
+class GameServer:
+    __slots__ = ('tables', 'clients', 'chips', 'action_timeout', 'fill_wait', 'hand_delay', 'rng',
+                 'hands', 'actions', 'timeouts', 'started', 'next_table')
+
+    def __init__(self, chips=STARTING_CHIPS, action_timeout=ACTION_TIMEOUT, fill_wait=FILL_WAIT, hand_delay=0.0, seed=None):
+        self.tables = {}
+        self.clients = 0
+        self.chips = chips
+        self.action_timeout = action_timeout
+        self.fill_wait = fill_wait
+        self.hand_delay = hand_delay
+        self.rng = random.Random(seed)
+        self.hands = 0
+        self.actions = 0
+        self.timeouts = 0
+        self.started = time.perf_counter()
+        self.next_table = 0
+
+    async def start(self, host="127.0.0.1", port=9100):
+        return await asyncio.start_server(self.handle, host, port)
+
+    def stats(self):
+        return {"op": "stats", "tables": len(self.tables), "clients": self.clients, "hands": self.hands,
+                "actions": self.actions, "timeouts": self.timeouts, "cpu_seconds": time.process_time(),
+                "uptime": time.perf_counter() - self.started}
+
+    async def handle(self, reader, writer):
+        # 最初の行 (WebSocket のハンドシェイクを含む) の読み込みから切断までを同じ try で扱い、最後に必ず閉じる
+        client = None
+        try:
+            first = await reader.readline()
+            if first.startswith(b"GET "):
+                conn = await accept_websocket(reader, writer)
+                if conn is None:
+                    return
+                line = None
+            else:
+                conn = LineConnection(reader, writer)
+                line = first
+            client = Client(conn)
+            self.clients += 1
+            while not conn.closed:
+                try:
+                    if line is not None:
+                        message = json.loads(line) if line.strip() else None
+                        line = None
+                    else:
+                        message = await conn.read()
+                    if message is None:
+                        break
+                    if not isinstance(message, dict):
+                        raise MessageError("メッセージは JSON のオブジェクトにしてください")
+                    self.dispatch(client, message)
+                except (MessageError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                    client.conn.send(encode({"op": "error", "message": str(e) if isinstance(e, MessageError) else "JSON として読めません"}))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if client is not None:
+                self.clients -= 1
+                client.gone = True
+                if client.pending is not None and not client.pending.done():
+                    client.pending.set_result(None)
+                if client.table is not None:
+                    client.table.changed.set()
+                client.conn.close()
+            else:
+                writer.close()
+
+    def dispatch(self, client, message):
+        op = message.get("op")
+        if op == "join":
+            self.join(client, message)
+        elif op == "act":
+            action = message.get("action")
+            if client.pending is None or client.pending.done():
+                client.conn.send(encode({"op": "error", "message": "あなたの手番ではありません"}))
+            elif action not in VALID_ACTIONS:
+                client.conn.send(encode({"op": "error", "message": f"不明なアクションです: {action!r}"}))
+            else:
+                client.pending.set_result((action, _field(message, "amount", int, 0)))
+        elif op == "leave":
+            client.gone = True
+            if client.pending is not None and not client.pending.done():
+                client.pending.set_result(None)
+            if client.table is not None:
+                client.table.changed.set()
+        elif op == "stats":
+            client.conn.send(encode(self.stats()))
+        else:
+            client.conn.send(encode({"op": "error", "message": f"不明な op です: {op!r}"}))
+
+    def join(self, client, message):
+        if client.table is not None:
+            client.conn.send(encode({"op": "error", "message": "既に着席しています"}))
+            return
+        name = _field(message, "name", str)
+        size = max(2, min(8, _field(message, "size", int, 6)))
+        table_id = _field(message, "table", str)
+        client.name = name or f"player{self.clients}"
+        if table_id is None:
+            table_id = next((t.id for t in self.tables.values() if None in t.seats), None)
+        if table_id is None:
+            self.next_table += 1
+            table_id = f"t{self.next_table}"
+        table = self.tables.get(table_id)
+        if table is None:
+            table = self.tables[table_id] = Table(table_id, size, self)
+            table.task = asyncio.get_running_loop().create_task(table.run())
+        if None not in table.seats:
+            client.conn.send(encode({"op": "error", "message": f"テーブル {table_id} は満席です"}))
+            return
+        seat = table.sit(client)
+        # 他の席には着席を差分で知らせ、新しいクライアントには同じ seq の全体を送る
+        table.broadcast_delta(exclude=client)
+        client.conn.send(encode({"op": "joined", "table": table_id, "seat": seat}))
+        client.conn.send(encode(table.full_state()))
+
+# --- 負荷試験 (台本どおりに打つクライアント) ---
+
+async def scripted_client(host, port, table, size, hands, seed, websocket, latencies):
+    # アクションは bench.py の scripted_policy と同じ配分。latencies にはアクションを送ってから
+    # それが反映された delta を受け取るまでの秒数を記録する
+    rng = random.Random(seed)
+    conn = await connect(host, port, websocket)
+    conn.send(encode({"op": "join", "table": table, "name": f"bot{seed}", "size": size}))
+    seat = None
+    sent = None
+    played = 0
+    try:
+        while True:
+            message = await conn.read()
+            if message is None:
+                return played
+            op = message["op"]
+            if op == "joined":
+                seat = message["seat"]
+            elif op == "turn":
+                legal = message["legal"]
+                roll = rng.random()
+                if 'raise' in legal and roll < 0.1:
+                    action, amount = 'raise', message["min_raise"]
+                elif roll < 0.25:
+                    action, amount = 'fold', 0
+                else:
+                    action, amount = ('check' if 'check' in legal else 'call'), 0
+                sent = time.perf_counter()
+                conn.send(encode({"op": "act", "action": action, "amount": amount}))
+            elif op == "delta" and sent is not None and message.get("act", [None])[0] == seat:
+                latencies.append(time.perf_counter() - sent)
+                sent = None
+            elif op == "result":
+                played += 1
+                if played >= hands:
+                    conn.send(encode({"op": "leave"}))
+                    return played
+            elif op == "busted":
+                return played
+    finally:
+        conn.close()
+
+async def query_stats(host, port):
+    conn = await connect(host, port)
+    conn.send(encode({"op": "stats"}))
+    stats = await conn.read()
+    conn.close()
+    return stats
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def run_load(args):
+    server = None
+    port = args.port
+    if port is None:
+        # サーバーは別プロセスで起動する (サーバー 1 コア分の性能を測るため)
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--port", str(port),
+                                   "--chips", str(10 ** 9), "--fill-wait", "0.5"])
+        for _ in range(100):
+            try:
+                await query_stats(args.host, port)
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+    try:
+        before = await query_stats(args.host, port)
+        latencies = []
+        start = time.perf_counter()
+        clients = [scripted_client(args.host, port, f"load{t}", args.players, args.hands, t * args.players + i,
+                                   args.websocket, latencies)
+                   for t in range(args.tables) for i in range(args.players)]
+        await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - start
+        after = await query_stats(args.host, port)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    hands = after["hands"] - before["hands"]
+    actions = after["actions"] - before["actions"]
+    cpu = after["cpu_seconds"] - before["cpu_seconds"]
+    latencies.sort()
+    return {
+        "tables": args.tables, "clients": args.tables * args.players, "transport": "websocket" if args.websocket else "tcp",
+        "seconds": elapsed, "hands": hands, "actions": actions, "timeouts": after["timeouts"] - before["timeouts"],
+        "hands_per_second": hands / elapsed, "actions_per_second": actions / elapsed,
+        "server_cpu": cpu / elapsed,
+        "latency_ms_p50": statistics.median(latencies) * 1000 if latencies else None,
+        "latency_ms_p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="複数テーブルのゲームサーバーと負荷試験")
+    parser.add_argument("command", choices=["serve", "load"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="serve の既定は 9100。load で省略するとサーバーを起動する")
+    parser.add_argument("--chips", type=int, default=STARTING_CHIPS, help="着席時のチップ (serve)")
+    parser.add_argument("--timeout", type=float, default=ACTION_TIMEOUT, help="1 手の制限秒数 (serve)")
+    parser.add_argument("--fill-wait", type=float, default=FILL_WAIT, help="満席を待つ秒数 (serve)")
+    parser.add_argument("--tables", type=int, default=100, help="テーブル数 (load)")
+    parser.add_argument("--players", type=int, default=6, help="1 テーブルの人数 (load)")
+    parser.add_argument("--hands", type=int, default=50, help="1 テーブルで打つハンド数 (load)")
+    parser.add_argument("--websocket", action="store_true", help="WebSocket で接続する (load)")
+    parser.add_argument("--json", help="負荷試験の結果を書き出す JSON ファイル")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        async def serve():
+            game_server = GameServer(args.chips, args.timeout, args.fill_wait)
+            server = await game_server.start(args.host, args.port or 9100)
+            print(f"{args.host}:{args.port or 9100} で待ち受けています", file=sys.stderr)
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    result = asyncio.run(run_load(args))
+    print(f"{result['tables']} テーブル / {result['clients']} クライアント ({result['transport']}): "
+          f"{result['hands']} ハンド, {result['actions']} アクション, {result['seconds']:.1f}s")
+    print(f"  {result['hands_per_second']:,.0f} ハンド/s  {result['actions_per_second']:,.0f} アクション/s  "
+          f"サーバー CPU {result['server_cpu']:.0%}  時間切れ {result['timeouts']}")
+    if result["server_cpu"]:
+        print(f"  サーバー 1 コアを使い切った場合の見込み: {result['actions_per_second'] / result['server_cpu']:,.0f} アクション/s")
+    if result["latency_ms_p50"] is not None:
+        print(f"  応答 (送信 → 反映): 中央値 {result['latency_ms_p50']:.2f}ms  99% {result['latency_ms_p99']:.2f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import evaluator
+
+# --- ショーダウンの精算（サイドポット対応） ---
+# 各プレイヤーのこのハンドでの拠出額 (Player.contributed) からポットを組み立て、
+# ポットごとに参加資格のあるプレイヤーの中で最強の役に配分する。
+
+def build_pots(players):
+    # 拠出額の昇順に走査し、フォールドしていないプレイヤーの拠出額ごとにポットを区切る。
+    # 戻り値: [{"amount": 額, "eligible": [プレイヤー]}, ...] (メインポットが先頭)
+    # 同じ拠出額ならフォールドしていないプレイヤーを先に置き、その額でポットを区切る
+    ordered = sorted(players, key=lambda p: (p.contributed, p.is_folded))
+    pots = []
+    previous = 0
+    carried = 0  # 区切りに達しないフォールド済みプレイヤーの拠出分
+    for i, player in enumerate(ordered):
+        level = player.contributed
+        if level > previous:
+            # この区切りまでの分は、まだ残っている全員 (ordered[i:]) が (level - previous) ずつ出している
+            amount = carried + (level - previous) * (len(ordered) - i)
+            carried = 0
+            if player.is_folded:
+                # フォールド済みの拠出額では区切らず、次のポットに繰り越す
+                carried = amount
+            else:
+                eligible = [p for p in ordered[i:] if not p.is_folded]
+                pots.append({"amount": amount, "eligible": eligible})
+            previous = level
+    if carried:
+        if pots:
+            pots[-1]["amount"] += carried
+        else:
+            pots.append({"amount": carried, "eligible": [p for p in players if not p.is_folded]})
+    return pots
+
+def resolve_showdown(players, community_cards, small_blind_index=0, pot=None, strengths=None):
+    # players: このハンドの全プレイヤー (席順)。チップの配分は行わず結果だけを返す。
+    # strengths (プレイヤー → 強さ) があれば、含まれているプレイヤーは評価し直さずにその値を使う。
+    # 端数のチップは、SB の席から時計回りに最初の勝者から 1 枚ずつ配る
+    seats = len(players)
+    seat_of = {id(p): i for i, p in enumerate(players)}
+    live = [p for p in players if not p.is_folded]
+
+    ranks = {}
+    if len(live) > 1:
+        key = evaluator.board_key([c.code for c in community_cards])
+        for p in live:
+            strength = strengths.get(p) if strengths else None
+            if strength is None:
+                strength = evaluator.evaluate_with_board([c.code for c in p.hand], key)
+            ranks[p] = (strength, strength >> evaluator.CATEGORY_SHIFT)
+
+    pots = build_pots(players) or [{"amount": 0, "eligible": live}]
+    total = sum(p.contributed for p in players)
+    if pot is not None and pot != total:
+        # 拠出額の記録がない分 (外部から直接ポットに入れたチップなど) はメインポットに加える
+        pots[0]["amount"] += pot - total
+
+    payouts = {}
+    for entry in pots:
+        eligible = entry["eligible"]
+        if len(eligible) == 1 or not ranks:
+            winners = eligible[:1]
+        else:
+            best = max(ranks[p][0] for p in eligible)
+            winners = [p for p in eligible if ranks[p][0] == best]
+        winners.sort(key=lambda p: (seat_of[id(p)] - small_blind_index) % seats)
+        share, odd = divmod(entry["amount"], len(winners))
+        entry["winners"] = winners
+        entry["shares"] = {}
+        for i, w in enumerate(winners):
+            won = share + (1 if i < odd else 0)
+            entry["shares"][w] = won
+            payouts[w] = payouts.get(w, 0) + won
+
+    winners = [p for p in players if payouts.get(p)]
+    return {"pot": pot if pot is not None else total, "pots": pots, "winners": winners, "payouts": payouts, "ranks": ranks}
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import bots
+from engine import PokerEngine, Player
+from hand_history import HandRecorder
+import numpy as np
+from search import search_action
+from cfr import cfr_action
+
+# --- 多数のゲームを並列に回すシミュレーション ---
+# 各ゲームは自分のシード (seed + ゲーム番号) を持つので、ワーカー数や完了順に関係なく結果が再現できる。
+# 使い方: python simulate.py --games 1000 --players 6 --seed 1
+
+def play_game(seed, players=6, chips=1000, max_hands=1000, cpu_samples=1000, history_dir=None, search_seats=(), search_nodes=500,
+              cfr_seats=(), seat_bots=None, bot_pool=None):
+    # seat_bots: 席 → ボット名 (bots.py)。その席の判断は bot_pool のワーカープロセスで行う
+    seat_bots = seat_bots or {}
+    engine = PokerEngine([Player(f"{seat_bots[i]} {i+1}" if i in seat_bots else f"CPU {i+1}", chips=chips, is_cpu=i not in seat_bots,
+                                 bot=seat_bots.get(i)) for i in range(players)], seed=seed)
+    engine.cpu_samples = cpu_samples
+    engine.cpu_time_budget = None  # 時間で打ち切ると結果が再現できなくなる
+    if history_dir:
+        engine.recorder = HandRecorder(os.path.join(history_dir, f"game_{seed}.jsonl"))
+    seats = list(engine.players)
+    # search_seats の席は先読みする CPU (再現性のため時間では打ち切らない)、
+    # cfr_seats の席はヘッズアップになったら CFR の戦略表を引く CPU にする
+    search_players = {seats[i] for i in search_seats}
+    cfr_players = {seats[i] for i in cfr_seats}
+
+    def decide(engine, player):
+        if player.bot:
+            return bot_pool.decide(player.bot, bots.observation(engine, player))
+        if player in search_players:
+            return search_action(engine, player, search_nodes, None, engine.rng)
+        if player in cfr_players:
+            decision = cfr_action(engine, player, np.random.default_rng(engine.rng.getrandbits(64)))
+            if decision is not None:
+                return decision
+        return engine.cpu_action(player)
+
+    hands = 0
+    while hands < max_hands and engine.play_hand(decide if search_players or cfr_players or seat_bots else None) is not None:
+        hands += 1
+    if engine.recorder is not None:
+        engine.recorder.close()
+    return {"seed": seed, "hands": hands, "chips": [p.chips for p in seats]}
+
+def _play_games(seeds, options, bot_options=None):
+    # ボットを使う場合はチャンクごとにワーカープロセスを用意し、判断時間の記録も返す
+    if not options.get("seat_bots"):
+        return [play_game(seed, **options) for seed in seeds], {}
+    pool = bots.BotPool(**(bot_options or {}))
+    try:
+        failed = pool.preload(options["seat_bots"].values())
+        if failed:
+            raise ValueError("; ".join(f"{name}: {error}" for name, error in failed.items()))
+        return [play_game(seed, bot_pool=pool, **options) for seed in seeds], pool.records()
+    finally:
+        pool.close()
+
+def simulate(games, seed=0, workers=None, chunk_size=None, progress=None, bot_options=None, **options):
+    # games 回のゲームを ProcessPoolExecutor で実行し、席ごとの結果を集計する。
+    # progress(完了数, 総数) を渡すと完了したチャンクごとに呼ばれる。bot_options は bots.BotPool の引数
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, min(50, games // (workers * 4)))
+    seeds = [seed + i for i in range(games)]
+    chunks = [seeds[i:i + chunk_size] for i in range(0, games, chunk_size)]
+
+    results = []
+    bot_records = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_play_games, chunk, options, bot_options) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk_results, records = future.result()
+            results.extend(chunk_results)
+            bots.merge_records(bot_records, records)
+            if progress:
+                progress(len(results), games)
+
+    results.sort(key=lambda r: r["seed"])
+    summary = summarize(results)
+    if bot_records:
+        summary["bots"] = bots.latency_summary(bot_records)
+    return summary
+
+def summarize(results):
+    seats = len(results[0]["chips"]) if results else 0
+    total_chips = [0] * seats
+    first_place = [0] * seats
+    busted = [0] * seats
+    for r in results:
+        leader = max(range(seats), key=lambda i: r["chips"][i])
+        first_place[leader] += 1
+        for i, chips in enumerate(r["chips"]):
+            total_chips[i] += chips
+            if chips == 0: busted[i] += 1
+    games = len(results)
+    return {
+        "games": games,
+        "hands": sum(r["hands"] for r in results),
+        "seats": [{"seat": i, "mean_chips": total_chips[i] / games if games else 0,
+                   "first_place": first_place[i], "busted": busted[i]} for i in range(seats)],
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 同士のゲームを並列にシミュレーションする")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--chips", type=int, default=1000)
+    parser.add_argument("--max-hands", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=1000, help="CPU が 1 回の判断で使う勝率計算のサンプル数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", help="集計結果を書き出す JSON ファイル")
+    parser.add_argument("--history-dir", help="ゲームごとのハンド履歴 (game_<seed>.jsonl) を書き出すディレクトリ")
+    parser.add_argument("--search-seats", type=int, nargs="*", default=[], help="先読みする CPU にする席 (例: --search-seats 0)")
+    parser.add_argument("--search-nodes", type=int, default=500, help="先読みする CPU の 1 手あたりのノード数")
+    parser.add_argument("--cfr-seats", type=int, nargs="*", default=[], help="ヘッズアップで CFR の戦略表を使う席")
+    parser.add_argument("--bots", nargs="*", default=[], metavar="席=名前",
+                        help="プラグインのボットにする席 (例: --bots 0=equity 1=mybot:decide)。時間切れがあると結果は再現できない")
+    parser.add_argument("--bot-workers", type=int, default=1, help="ゲームのプロセスごとのボット用ワーカープロセス数")
+    parser.add_argument("--bot-time-limit", type=float, default=bots.DEFAULT_TIME_LIMIT, help="ボットの 1 回の判断の制限時間 (秒)")
+    args = parser.parse_args()
+    try:
+        seat_bots = {int(seat): name for seat, _, name in (spec.partition("=") for spec in args.bots)}
+    except ValueError:
+        parser.error("--bots は 席=名前 の形で指定してください")
+
+    start = time.perf_counter()
+    def report(done, total):
+        print(f"\r{done}/{total} ゲーム完了 ({time.perf_counter() - start:.1f}s)", end="", file=sys.stderr, flush=True)
+
+    summary = simulate(args.games, seed=args.seed, workers=args.workers, progress=report,
+                       players=args.players, chips=args.chips, max_hands=args.max_hands, cpu_samples=args.samples,
+                       history_dir=args.history_dir, search_seats=args.search_seats, search_nodes=args.search_nodes,
+                       cfr_seats=args.cfr_seats, seat_bots=seat_bots,
+                       bot_options={"workers": args.bot_workers, "time_limit": args.bot_time_limit})
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    print(f"{summary['games']} ゲーム / {summary['hands']} ハンド ({elapsed:.1f}s, {summary['hands'] / elapsed:.0f} ハンド/秒)")
+    for seat in summary["seats"]:
+        print(f"  席 {seat['seat']}: 平均チップ {seat['mean_chips']:.1f}  1位 {seat['first_place']}  破産 {seat['busted']}")
+    for name, stats in summary.get("bots", {}).items():
+        print(f"  ボット {name}: {stats['decisions']} 回  平均 {stats['mean'] * 1000:.2f}ms  p50 {stats['p50'] * 1000:.2f}ms  "
+              f"p99 {stats['p99'] * 1000:.2f}ms  最大 {stats['max'] * 1000:.2f}ms  時間切れ {stats['timeouts']}  エラー {stats['errors']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from collections import namedtuple
+from cards import CARDS
+from engine import STAGES
+from showdown import resolve_showdown
+
+# --- 不変なゲーム状態のスナップショット ---
+# 探索する CPU のために、1 ハンドの状態を整数とタプルだけで表す。ハッシュ可能で、
+# apply() は元の状態を変えずに新しい状態を返す (複製の手間は席数に比例する分だけ)。
+# ルールは PokerEngine と同じ。行動不能な手番の読み飛ばしとストリートの進行は apply() の中で行う。
+
+PRE_FLOP, FLOP, TURN, RIVER, SHOWDOWN = range(len(STAGES))
+_STREET_CARDS = {FLOP: 3, TURN: 1, RIVER: 1}
+
+_Fields = namedtuple('GameState', ['stage', 'pot', 'current_bet', 'current', 'small_blind_index', 'big_blind_amount',
+                                   'chips', 'bets', 'contributed', 'acted', 'folded', 'all_in',
+                                   'holes', 'board', 'deck'])
+
+class _Seat:
+    # resolve_showdown に渡すための最小限のプレイヤー (辞書のキーにするのでハッシュ可能な普通のクラス)
+    __slots__ = ('contributed', 'is_folded', 'hand')
+
+    def __init__(self, contributed, is_folded, hand):
+        self.contributed = contributed
+        self.is_folded = is_folded
+        self.hand = hand
+
+class GameState(_Fields):
+    # stage: STAGES の添字, holes: 席ごとの (カード, カード), board: 公開済みのカード, deck: 未配布のカード (配る順の bytes)
+    __slots__ = ()
+
+    # --- 状態の問い合わせ ---
+
+    def live_seats(self):
+        return [i for i, folded in enumerate(self.folded) if not folded]
+
+    def is_terminal(self):
+        return self.stage == SHOWDOWN or len(self.live_seats()) <= 1
+
+    def to_call(self):
+        return self.current_bet - self.bets[self.current]
+
+    def pot_total(self):
+        return self.pot + sum(self.bets)
+
+    def min_raise(self):
+        return self.current_bet * 2 if self.current_bet > 0 else self.big_blind_amount
+
+    def legal_actions(self):
+        seat = self.current
+        actions = ['fold', 'check' if self.to_call() <= 0 else 'call']
+        if self.chips[seat] > self.to_call():
+            actions.append('raise')
+        return actions
+
+    # --- 状態遷移 ---
+
+    def apply(self, action, amount=0):
+        # 現在のプレイヤーのアクションを適用した新しい状態を返す (PokerEngine.apply_action と同じ読み替え)
+        seat = self.current
+        chips, bets, contributed = list(self.chips), list(self.bets), list(self.contributed)
+        acted, folded, all_in = list(self.acted), list(self.folded), list(self.all_in)
+        current_bet = self.current_bet
+        amount_to_call = current_bet - bets[seat]
+        if action == 'raise' and amount <= current_bet and amount < chips[seat] + bets[seat]: action = 'call'
+        if action == 'check' and amount_to_call > 0: action = 'call'
+        elif action == 'call' and amount_to_call <= 0: action = 'check'
+
+        if action == 'fold':
+            folded[seat] = True
+        elif action == 'call':
+            paid = min(amount_to_call, chips[seat])
+            chips[seat] -= paid
+            bets[seat] += paid
+            contributed[seat] += paid
+            if chips[seat] == 0: all_in[seat] = True
+        elif action == 'raise':
+            if amount >= chips[seat] + bets[seat]:
+                amount = chips[seat] + bets[seat]
+                all_in[seat] = True
+            chips[seat] -= amount - bets[seat]
+            contributed[seat] += amount - bets[seat]
+            bets[seat] = amount
+            if bets[seat] > current_bet:
+                current_bet = bets[seat]
+                for i in range(len(chips)):
+                    if i != seat and not folded[i] and not all_in[i]:
+                        acted[i] = False
+
+        acted[seat] = True
+        state = self._replace(current_bet=current_bet, current=(seat + 1) % len(chips),
+                              chips=tuple(chips), bets=tuple(bets), contributed=tuple(contributed),
+                              acted=tuple(acted), folded=tuple(folded), all_in=tuple(all_in))
+        return state.advance()
+
+    def advance(self):
+        # 次に行動するプレイヤーまで進める (ベッティングラウンドが終わっていれば次のストリートを配る)
+        state = self
+        while True:
+            live = state.live_seats()
+            if len(live) <= 1 or state.stage == SHOWDOWN:
+                return state
+            can_act = [i for i in live if not state.all_in[i]]
+            lone = len(can_act) == 1 and state.bets[can_act[0]] >= state.current_bet
+            if lone or all(state.acted[i] and state.bets[i] == state.current_bet for i in can_act):
+                state = state._next_street()
+                continue
+            current = state.current
+            while state.folded[current] or state.all_in[current]:
+                current = (current + 1) % len(state.chips)
+            return state._replace(current=current)
+
+    def _next_street(self):
+        stage = self.stage + 1
+        dealt = _STREET_CARDS.get(stage, 0)
+        seats = range(len(self.chips))
+        return self._replace(
+            stage=stage, pot=self.pot_total(), current_bet=0,
+            current=self.small_blind_index % len(self.chips),
+            bets=(0,) * len(self.chips),
+            acted=tuple(self.acted[i] and (self.folded[i] or self.all_in[i]) for i in seats),
+            board=self.board + tuple(self.deck[:dealt]), deck=self.deck[dealt:])
+
+    def determinize(self, seat, rng):
+        # seat から見えないカード (他の席の手札と未配布のカード) を配り直した状態を返す
+        hidden = [c for i, hole in enumerate(self.holes) if i != seat for c in hole] + list(self.deck)
+        rng.shuffle(hidden)
+        holes = []
+        position = 0
+        for i, hole in enumerate(self.holes):
+            if i == seat:
+                holes.append(hole)
+            else:
+                holes.append((hidden[position], hidden[position + 1]))
+                position += 2
+        return self._replace(holes=tuple(holes), deck=bytes(hidden[position:]))
+
+    def payoffs(self):
+        # 終局した状態の精算後のチップ (席ごと)。残りのボードは deck から配る
+        state = self
+        missing = 5 - len(state.board)
+        board = state.board + tuple(state.deck[:missing]) if len(state.live_seats()) > 1 else state.board
+        players = [_Seat(state.contributed[i], state.folded[i], [CARDS[c] for c in state.holes[i]])
+                   for i in range(len(state.chips))]
+        result = resolve_showdown(players, [CARDS[c] for c in board], state.small_blind_index, state.pot_total())
+        return tuple(state.chips[i] + result["payouts"].get(p, 0) for i, p in enumerate(players))
+
+def from_engine(engine):
+    # PokerEngine の現在の状態からスナップショットを作る
+    players = engine.players
+    return GameState(
+        stage=STAGES.index(engine.game_stage), pot=engine.pot, current_bet=engine.current_bet,
+        current=engine.current_player_index, small_blind_index=engine.small_blind_index,
+        big_blind_amount=engine.big_blind_amount,
+        chips=tuple(p.chips for p in players), bets=tuple(p.bet for p in players),
+        contributed=tuple(p.contributed for p in players), acted=tuple(p.has_acted for p in players),
+        folded=tuple(p.is_folded for p in players), all_in=tuple(p.is_all_in for p in players),
+        holes=tuple(tuple(c.code for c in p.hand) for p in players),
+        board=tuple(c.code for c in engine.community_cards),
+        deck=bytes(engine.deck.remaining_codes()))
@@ -0,0 +1,166 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+import evaluator
+
+# --- 役判定テーブルのディスクキャッシュ (プロセス間で共有) ---
+# evaluator.py のフラッシュ表と素数積表を固定レイアウトのバイナリファイルに保存し、各プロセスは読み取り専用の
+# mmap / np.memmap で開く。同じファイルのページは OS が共有するので、ワーカーが増えてもメモリと起動時間が増えない。
+# ファイルがない・版や評価の定数が違う・壊れている場合は作り直す (書き込めなければメモリ上で計算して使う)。
+# 定数が同じでも役の採点のしかたが変わっていれば使わないよう、PROBES の強さを evaluator.py で計算し直して照合する。
+# 作り方: python table_cache.py build / 確認: python table_cache.py check
+#
+# ファイル形式 (リトルエンディアン):
+#   ヘッダー (32 バイト): マジック b'PKEV', バージョン u16, 予約 u16, フラッシュ表の長さ u32, 素数積表の長さ u32,
+#                         評価の定数の指紋 u32 (CRC32), 本体の CRC32 u32, 予約 8 バイト
+#   フラッシュ表: i32[8192]          (13bit のランクマスク → 強さ、5 枚未満は 0)
+#   素数積:       i64[素数積表の長さ] (昇順)
+#   強さ:         i32[素数積表の長さ] (素数積と同じ並び)
+
+MAGIC = b'PKEV'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII8x')
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_tables.bin")
+
+# 照合に使うランク構成 (フラッシュなし、各カテゴリと 6〜7 枚の例) とフラッシュのランクマスク
+PROBES = ((12, 11, 10, 9, 7), (12, 12, 5, 3, 1), (12, 12, 5, 5, 1), (7, 7, 7, 2, 1), (8, 7, 6, 5, 4), (12, 3, 2, 1, 0),
+          (9, 9, 9, 4, 4), (6, 6, 6, 6, 12), (12, 12, 11, 11, 10, 10, 9), (5, 5, 5, 4, 4, 4, 0), (11, 9, 9, 7, 5, 3, 2))
+FLUSH_PROBES = (0b1111100000000, 0b1000000001111, 0b0111110000000, 0b1011010110000, 0b1011010110011)
+
+def fingerprint():
+    # 強さの表現が変わったら古いファイルを使わないよう、評価の定数から作る値
+    return zlib.crc32(repr((evaluator.CATEGORY_SHIFT, evaluator.PRIMES, evaluator.WHEEL_MASK)).encode())
+
+def layout(flush_len, rank_len):
+    # 各配列の先頭のオフセット (フラッシュ表, 素数積, 強さ) とファイルサイズ
+    flush = HEADER.size
+    keys = flush + 4 * flush_len
+    values = keys + 8 * rank_len
+    return flush, keys, values, values + 4 * rank_len
+
+def write(path=DEFAULT_PATH):
+    # 表を計算してファイルに保存する。同時に複数のプロセスが作っても壊れないよう、一時ファイルから置き換える
+    flush_table, rank_table = evaluator.compute_tables()
+    products = sorted(rank_table)
+    body = (struct.pack(f'<{len(flush_table)}i', *flush_table) + struct.pack(f'<{len(products)}q', *products) +
+            struct.pack(f'<{len(products)}i', *(rank_table[p] for p in products)))
+    header = HEADER.pack(MAGIC, VERSION, 0, len(flush_table), len(products), fingerprint(), zlib.crc32(body))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header + body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return flush_table, rank_table
+
+def verify(path=DEFAULT_PATH):
+    # ファイルを検査して (フラッシュ表の長さ, 素数積表の長さ) を返す。使えなければ ValueError
+    if not os.path.exists(path):
+        raise ValueError(f"{path}: ありません")
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path}: ヘッダーが壊れています")
+        magic, version, _, flush_len, rank_len, stamp, crc = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: 対応していない形式です (version {version})")
+        if stamp != fingerprint():
+            raise ValueError(f"{path}: 役判定の定数が変わっています")
+        if len(data) != layout(flush_len, rank_len)[3]:
+            raise ValueError(f"{path}: ファイルサイズが一致しません")
+        if zlib.crc32(data[HEADER.size:]) != crc:
+            raise ValueError(f"{path}: チェックサムが一致しません")
+        if not _probes_match(data, flush_len, rank_len):
+            raise ValueError(f"{path}: 役判定の結果が変わっています")
+    return flush_len, rank_len
+
+def _probes_match(data, flush_len, rank_len):
+    # PROBES の強さがファイルの表と evaluator.py の採点で一致するか
+    flush, keys, values, _ = layout(flush_len, rank_len)
+    at = lambda fmt, offset: struct.unpack_from(fmt, data, offset)[0]
+    for mask in FLUSH_PROBES:
+        if at('<i', flush + 4 * mask) != evaluator._score_flush(mask):
+            return False
+    for ranks in PROBES:
+        product = 1
+        for r in ranks:
+            product *= evaluator.PRIMES[r]
+        lo, hi = 0, rank_len  # 素数積は昇順なので二分探索
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if at('<q', keys + 8 * mid) < product:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == rank_len or at('<q', keys + 8 * lo) != product:
+            return False
+        if at('<i', values + 4 * lo) != evaluator._score_counts([ranks.count(r) for r in range(13)]):
+            return False
+    return True
+
+def ensure(path=DEFAULT_PATH):
+    # 使えるファイルを用意して (フラッシュ表の長さ, 素数積表の長さ) を返す。古い・壊れたファイルは作り直す
+    try:
+        return verify(path)
+    except ValueError:
+        write(path)
+        return verify(path)
+
+def load_tables(path=DEFAULT_PATH):
+    # evaluator.py 用: (フラッシュ表のリスト, 素数積 → 強さの辞書)。書き込めない場所ならメモリ上で計算した値を返す
+    if sys.byteorder != 'little':
+        return evaluator.compute_tables()
+    try:
+        flush_len, rank_len = verify(path)
+    except ValueError:
+        try:
+            return write(path)
+        except OSError:
+            return evaluator.compute_tables()
+    flush, keys, values, _ = layout(flush_len, rank_len)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        try:
+            flush_table = view[flush:keys].cast('i').tolist()
+            rank_table = dict(zip(view[keys:values].cast('q').tolist(), view[values:].cast('i').tolist()))
+        finally:
+            view.release()
+    return flush_table, rank_table
+
+def memmap_tables(path=DEFAULT_PATH):
+    # equity.py 用: (フラッシュ表, 素数積, 強さ) を読み取り専用の np.memmap で返す。書き込めなければ None
+    import numpy as np
+    try:
+        flush_len, rank_len = ensure(path)
+    except OSError:
+        return None
+    flush, keys, values, _ = layout(flush_len, rank_len)
+    return (np.memmap(path, dtype='<i4', mode='r', offset=flush, shape=(flush_len,)),
+            np.memmap(path, dtype='<i8', mode='r', offset=keys, shape=(rank_len,)),
+            np.memmap(path, dtype='<i4', mode='r', offset=values, shape=(rank_len,)))
+
+def main():
+    parser = argparse.ArgumentParser(description="役判定テーブルのディスクキャッシュを作る・検査する")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    args = parser.parse_args()
+    if args.command == "build":
+        start = time.perf_counter()
+        write(args.path)
+        print(f"{args.path} を作りました ({os.path.getsize(args.path):,} バイト, {time.perf_counter() - start:.2f}s)")
+        return
+    try:
+        flush_len, rank_len = verify(args.path)
+    except ValueError as e:
+        print(f"使えません: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.path}: OK (フラッシュ表 {flush_len}, 素数積表 {rank_len})")
+
+if __name__ == "__main__":
+    main()
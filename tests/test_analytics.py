@@ -0,0 +1,92 @@
+import random
+import analytics
+from engine import PokerEngine, Player
+from hand_history import HandRecorder, read_hands
+
+# --- 統計の集計: HandRecorder で書いた履歴を 1 ハンドずつ数えた値と比べる ---
+
+def _record(path, hands, seed):
+    rng = random.Random(seed)
+    engine = PokerEngine([Player(name, chips=100000) for name in ("alice", "bob", "carol", "dave")], seed=seed)
+    engine.recorder = HandRecorder(str(path))
+    def decide(engine, player):
+        roll = rng.random()
+        if roll < 0.25:
+            return 'fold', 0
+        if roll < 0.4:
+            return 'raise', engine.min_raise()
+        return 'call', 0
+    for _ in range(hands):
+        engine.play_hand(decide)
+    engine.recorder.close()
+
+def _expected(records):
+    stats = {}
+    for record in records:
+        players = record["players"]
+        folded = set()
+        vpip, pfr = set(), set()
+        preflop = True
+        for event in record["events"]:
+            if event[0] == "s":
+                preflop = False
+            elif event[0] == "a":
+                _, seat, action, _ = event
+                if action == "fold":
+                    folded.add(seat)
+                elif preflop and action in ("call", "raise"):
+                    vpip.add(seat)
+                    if action == "raise":
+                        pfr.add(seat)
+        showdown = len(players) - len(folded) > 1
+        for seat, (name, start) in enumerate(players):
+            s = stats.setdefault(name, {"hands": 0, "vpip": 0, "pfr": 0, "showdowns": 0, "wins": 0, "net": 0})
+            s["hands"] += 1
+            s["vpip"] += seat in vpip
+            s["pfr"] += seat in pfr
+            if showdown and seat not in folded:
+                s["showdowns"] += 1
+                s["wins"] += seat in record["winners"]
+            s["net"] += record["chips"][seat] - start
+    return stats
+
+def _check(stats, records):
+    result = stats.stats()
+    for name, s in _expected(records).items():
+        r = result[name]
+        assert r["hands"] == s["hands"]
+        assert r["vpip"] == s["vpip"] / s["hands"]
+        assert r["pfr"] == s["pfr"] / s["hands"]
+        assert r["wsd"] == (s["wins"] / s["showdowns"] if s["showdowns"] else 0.0)
+        assert r["net"] == s["net"]
+        assert sum(r["net_by_stage"].values()) == s["net"]
+
+def test_incremental_update_matches_per_hand_counts(tmp_path):
+    path = tmp_path / "hands.jsonl"
+    more = tmp_path / "more.jsonl"
+    _record(path, 40, seed=1)
+    _record(more, 25, seed=2)
+    first = list(read_hands(str(path)))
+    appended = more.read_bytes()
+
+    stats = analytics.HandStats()
+    assert stats.update(str(path), chunk_hands=7) == 40
+    _check(stats, first)
+    assert sum(s["net"] for s in stats.stats().values()) == 0
+
+    # 書き込み途中の行は読まず、次回に続きから読む
+    cut = appended.index(b"\n", len(appended) // 2) + 10
+    with open(path, "ab") as f:
+        f.write(appended[:cut])
+    partial = appended[:cut].count(b"\n")
+    assert stats.update(str(path)) == partial
+
+    # save / load を挟んでも、追記された分だけを読む
+    state = str(tmp_path / "stats.npz")
+    stats.save(state)
+    stats = analytics.HandStats.load(state)
+    with open(path, "ab") as f:
+        f.write(appended[cut:])
+    assert stats.update(str(path)) == 25 - partial
+    assert stats.update(str(path)) == 0
+    _check(stats, first + list(read_hands(str(more))))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import batch_engine
+from engine import PokerEngine, Player
+from hand_history import ReplayDeck
+
+# --- BatchEngine と PokerEngine の照合 ---
+# 固定シードで BatchEngine を回し、各テーブルのデッキとアクションを記録しておく。同じデッキ・同じアクションを
+# PokerEngine で 1 ハンドずつ再生し、最後のチップが一致することを確かめる。
+
+class RecordingEngine(batch_engine.BatchEngine):
+    __slots__ = ('log',)
+
+    def shuffle(self, mask):
+        super().shuffle(mask)
+        for t in np.flatnonzero(mask):
+            self.log[t].append({"deck": [int(c) for c in self.deck[t]], "actions": []})
+
+def _run_batch(tables, seats, chips, hands, seed):
+    engine = RecordingEngine(tables, seats, chips=chips, seed=seed)
+    engine.log = [[] for _ in range(tables)]
+    rng = np.random.default_rng(seed)
+    base = batch_engine.random_policy(rng, raise_rate=0.2, fold_rate=0.1)
+    def policy(engine, mask):
+        actions, amounts = base(engine, mask)
+        # ときどき半端な額でレイズさせて、オールイン・サイドポット・足りないレイズも起こす
+        amounts = np.where(rng.random(engine.tables) < 0.3, rng.integers(0, chips * 2, engine.tables), amounts)
+        for t in np.flatnonzero(mask):
+            engine.log[t][-1]["actions"].append((batch_engine.ACTION_NAMES[actions[t]], int(amounts[t])))
+        return actions, amounts
+    engine.run(policy, hands)
+    return engine
+
+@pytest.mark.parametrize("seats", [2, 3, 6])
+def test_batch_matches_scalar_engine(seats):
+    tables, chips, hands = 30, 300, 30
+    batch = _run_batch(tables, seats, chips, hands, seed=seats)
+    for t in range(tables):
+        scalar = PokerEngine([Player(f"P{i}", chips=chips) for i in range(seats)])
+        for hand in batch.log[t]:
+            scalar.deck = ReplayDeck(hand["deck"])
+            actions = iter(hand["actions"])
+            assert scalar.play_hand(lambda engine, player: next(actions)) is not None
+        expected = {p.name: p.chips for p in scalar.players if p.chips > 0}
+        got = {f"P{batch.seat_id[t, i]}": int(batch.chips[t, i]) for i in range(seats) if batch.chips[t, i] > 0}
+        assert got == expected, f"table {t}"
+        assert batch.chips[t].sum() == chips * seats
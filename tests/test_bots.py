@@ -0,0 +1,50 @@
+import time
+import bots
+
+# --- BotPool: 時間切れのワーカーを止めて作り直す ---
+
+SLOW_BOT = """
+import time
+
+def decide(observation):
+    if observation.get("slow"):
+        time.sleep(30)
+    return 'call', 0
+"""
+
+OBS = {"seat": 0, "to_call": 10, "legal": ["fold", "call", "raise"], "players": [["a", 100, 0, False, False]]}
+
+def _pool(tmp_path, **options):
+    path = tmp_path / "slowbot.py"
+    path.write_text(SLOW_BOT, encoding="utf-8")
+    pool = bots.BotPool(workers=1, time_limit=0.5, **options)
+    assert pool.preload([str(path)]) == {}
+    return pool, str(path)
+
+def test_timed_out_worker_is_replaced(tmp_path):
+    pool, name = _pool(tmp_path)
+    try:
+        start = time.perf_counter()
+        assert pool.decide(name, dict(OBS, slow=True)) == ('fold', 0)  # 時間切れは既定のアクション
+        assert time.perf_counter() - start < 5
+        # 作り直したワーカーでボットが読み込み済みになっていて、次の判断は普通に返る
+        assert pool.decide(name, OBS) == ('call', 0)
+        record = pool.records()[name]
+        assert (record["decisions"], record["timeouts"], record["errors"]) == (2, 1, 0)
+    finally:
+        pool.close()
+
+def test_failed_respawn_does_not_hang(tmp_path, monkeypatch):
+    pool, name = _pool(tmp_path)
+    try:
+        def broken(*args):
+            raise OSError("プロセスを起動できません")
+        monkeypatch.setattr(bots, "_Worker", broken)
+        monkeypatch.setattr(bots, "IDLE_TIMEOUT", 1.0)
+        assert pool.decide(name, dict(OBS, slow=True)) == ('fold', 0)
+        # ワーカーがなくなっても、待ち続けずにエラーとして既定のアクションが返る
+        assert pool.decide(name, OBS) == ('fold', 0)
+        assert pool.records()[name]["errors"] == 1
+        assert "作り直せません" in pool.last_error
+    finally:
+        pool.close()
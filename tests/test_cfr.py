@@ -0,0 +1,19 @@
+import cfr
+from engine import PokerEngine, Player, ACTION
+
+def test_broken_strategy_file_falls_back(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "cfr_strategy.bin"
+    path.write_bytes(b"\0\0")  # ヘッダーの途中で切れたファイル
+    monkeypatch.setattr(cfr, "DEFAULT_PATH", str(path))
+    monkeypatch.setattr(cfr, "_strategy", None)
+    monkeypatch.setattr(cfr, "_loaded", False)
+    engine = PokerEngine([Player("a"), Player("b")], seed=1)
+    engine.start_hand()
+    assert engine.step() == ACTION
+    player = engine.players[engine.current_player_index]
+    assert cfr.cfr_action(engine, player) is None
+    assert "警告" in capsys.readouterr().err
+    # 2 回目以降は読み直さず、警告も繰り返さない
+    path.unlink()
+    assert cfr.cfr_action(engine, player) is None
+    assert capsys.readouterr().err == ""
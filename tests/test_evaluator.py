@@ -0,0 +1,88 @@
+import itertools
+import random
+import evaluator
+from cards import CARDS
+
+# --- 役判定の照合: 置き換える前の get_hand_rank (main.py) との比較 ---
+# get_hand_rank は移行前のものをそのまま残してある。役カテゴリはこれと完全に一致すること。
+# 同じカテゴリ内の順位は、get_hand_rank が返すカード順ではなく reference_key で比べる
+# (旧コードはペア・スリーカードよりキッカーを先に比べ、フルハウス・ツーペアを単純なランク順で比べ、
+#  A-2-3-4-5 のストレートフラッシュを A ハイとして扱っていたため)。
+
+def get_hand_rank(hand):
+    hand = sorted(hand, key=lambda card: card.value, reverse=True)
+    values = [c.value for c in hand]; suits = [c.suit for c in hand]
+    is_flush = len(set(suits)) == 1
+    is_straight = (len(set(values)) == 5 and max(values) - min(values) == 4) or (values == [14, 5, 4, 3, 2])
+    if is_straight and is_flush: return (8, hand) if values != [14, 13, 12, 11, 10] else (9, hand)
+    counts = sorted({v: values.count(v) for v in set(values)}.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    if counts[0][1] == 4: return (7, sorted(hand, key=lambda c: (c.value != counts[0][0], c.value), reverse=True))
+    if counts[0][1] == 3 and counts[1][1] == 2: return (6, hand)
+    if is_flush: return (5, hand)
+    if is_straight: return (4, [c for c in hand if c.value != 14] + [c for c in hand if c.value == 14]) if values == [14, 5, 4, 3, 2] else (4, hand)
+    if counts[0][1] == 3: return (3, sorted(hand, key=lambda c: (c.value != counts[0][0], c.value), reverse=True))
+    if counts[0][1] == 2 and counts[1][1] == 2: return (2, sorted(hand, key=lambda c: (c.value != counts[0][0] and c.value != counts[1][0], c.value), reverse=True))
+    if counts[0][1] == 2: return (1, sorted(hand, key=lambda c: (c.value != counts[0][0], c.value), reverse=True))
+    return (0, hand)
+
+def reference_key(codes):
+    category, hand = get_hand_rank([CARDS[c] for c in codes])
+    values = sorted((c.value for c in hand), reverse=True)
+    if category in (evaluator.STRAIGHT, evaluator.STRAIGHT_FLUSH) and values == [14, 5, 4, 3, 2]:
+        values = [5, 4, 3, 2, 1]
+    # 枚数の多いランクから、同じ枚数なら高いランクから比べる
+    values = sorted(values, key=lambda v: (values.count(v), v), reverse=True)
+    return category, tuple(values)
+
+def class_hands():
+    # 強さはランクの組とフラッシュかどうかだけで決まるので、その全パターンを 1 ハンドずつ作る
+    hands = []
+    for ranks in itertools.combinations_with_replacement(range(13), 5):
+        if max(ranks.count(r) for r in ranks) > 4:
+            continue
+        used = {}
+        hand = []
+        for r in ranks:
+            suit = used.get(r, 0)
+            used[r] = suit + 1
+            hand.append(suit * 13 + r)
+        if len({c // 13 for c in hand}) == 1:  # 異なる 5 ランクが全部スート 0 になった場合はずらす
+            hand[-1] += 13
+        hands.append(tuple(hand))
+        if len(set(ranks)) == 5:
+            hands.append(ranks)  # 同じランクのフラッシュ (スート 0)
+    return hands
+
+def dense_ranks(keys):
+    order = sorted(set(keys))
+    index = {key: i for i, key in enumerate(order)}
+    return [index[key] for key in keys]
+
+def test_categories_and_ordering_match_reference():
+    hands = class_hands()
+    assert len(hands) == 7462
+    strengths = [evaluator.evaluate(hand) for hand in hands]
+    keys = [reference_key(hand) for hand in hands]
+    assert [s >> evaluator.CATEGORY_SHIFT for s in strengths] == [key[0] for key in keys]
+    assert len(set(strengths)) == 7462
+    assert dense_ranks(strengths) == dense_ranks(keys)
+
+def test_random_hands_match_reference():
+    rng = random.Random(1)
+    hands = [tuple(rng.sample(range(52), 5)) for _ in range(20000)]
+    by_key = {}
+    for hand in hands:
+        strength = evaluator.evaluate(hand)
+        key = reference_key(hand)
+        assert strength >> evaluator.CATEGORY_SHIFT == key[0]
+        assert by_key.setdefault(key, strength) == strength
+    keys = sorted(by_key)
+    assert [by_key[key] for key in keys] == sorted(by_key.values())
+
+def test_seven_cards_is_best_five():
+    rng = random.Random(2)
+    for _ in range(2000):
+        cards = rng.sample(range(52), 7)
+        best = max(reference_key(five) for five in itertools.combinations(cards, 5))
+        assert evaluator.evaluate(cards) == max(evaluator.evaluate(five) for five in itertools.combinations(cards, 5))
+        assert reference_key(evaluator.best_five(cards)) == best
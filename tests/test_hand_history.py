@@ -0,0 +1,23 @@
+import json
+import hand_history
+from simulate import play_game
+
+def _write(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+def test_replay_counts_broken_hands_as_mismatches(tmp_path):
+    play_game(1, max_hands=20, cpu_samples=50, history_dir=str(tmp_path))
+    path = tmp_path / "game_1.jsonl"
+    assert hand_history.replay(str(path)) == (20, 0)
+
+    records = list(hand_history.read_hands(str(path)))
+    records[0]["events"] = [e for e in records[0]["events"] if e[0] != "a"]  # アクションが足りない
+    for event in records[1]["events"]:
+        if event[0] == "a":  # 手番が違う
+            event[1] = (event[1] + 1) % len(records[1]["players"])
+            break
+    broken = tmp_path / "broken.jsonl"
+    _write(broken, records)
+    assert hand_history.replay(str(broken)) == (20, 2)
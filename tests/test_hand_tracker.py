@@ -0,0 +1,25 @@
+import hand_tracker
+from cards import SUITS, RANKS
+
+def cards(text):
+    # "♠A ♠K" → コードのリスト
+    return [SUITS.index(card[0]) * 13 + RANKS.index(card[1:]) for card in text.split()]
+
+def test_board_pairing_cards_are_not_outs():
+    summary = hand_tracker.hand_summary(cards("♠A ♠K"), cards("♦2 ♣7 ♥9"))
+    assert summary["hand_name"] == "ハイカード"
+    assert summary["outs"] == sorted(cards("♥A ♦A ♣A ♥K ♦K ♣K"))
+
+def test_outs_on_paired_board():
+    # ボードのペアに乗るだけのカードは数えず、手札と絡むカードだけ数える
+    summary = hand_tracker.hand_summary(cards("♠A ♠K"), cards("♦2 ♣2 ♥9 ♦5"))
+    assert summary["hand_name"] == "ワンペア"
+    assert summary["outs"] == sorted(cards("♥A ♦A ♣A ♥K ♦K ♣K"))
+
+def test_draws_count_as_outs():
+    summary = hand_tracker.hand_summary(cards("♠8 ♠7"), cards("♠6 ♠5 ♦K"))
+    outs = set(summary["outs"])
+    assert set(cards("♠2 ♠A ♠Q")) <= outs                      # フラッシュ
+    assert set(cards("♦9 ♥4")) <= outs                          # ストレート
+    assert set(cards("♦8 ♥7")) <= outs                          # 手札とのペア
+    assert not outs & set(cards("♥K ♣K"))                       # ボードにペアを作るだけ
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+# --- コアの import が軽いままかの確認 ---
+# コアのモジュール (ルール・役判定) だけを新しいインタープリタで import したときに、読み込まれてはいけないものと
+# 時間の上限 (秒)。時間は起動のぶれを避けるため REPEAT 回のうち最短で比べる
+
+CORE_MODULES = ("cards", "evaluator", "showdown", "engine", "snapshot")
+HEAVY_MODULES = ("tkinter", "google", "numpy", "http.server")
+IMPORT_BUDGET = 0.05
+REPEAT = 5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE = (f"import sys, time; start = time.perf_counter(); import {', '.join(CORE_MODULES)}; "
+        f"print(time.perf_counter() - start, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+
+def _import_core():
+    out = subprocess.run([sys.executable, "-c", CODE], cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+    return float(out[0]), out[1:]
+
+def test_core_import_skips_heavy_modules():
+    _, heavy = _import_core()
+    assert heavy == [], f"コアの import で {', '.join(heavy)} が読み込まれました"
+
+def test_core_import_within_budget():
+    elapsed = min(_import_core()[0] for _ in range(REPEAT))
+    assert elapsed <= IMPORT_BUDGET, f"コアの import に {elapsed * 1000:.1f}ms かかりました (上限 {IMPORT_BUDGET * 1000:.0f}ms)"
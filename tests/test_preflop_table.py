@@ -0,0 +1,27 @@
+import pytest
+import preflop_table
+from engine import PokerEngine, Player, ACTION
+
+def _use_table_file(monkeypatch, path):
+    monkeypatch.setattr(preflop_table, "DEFAULT_PATH", str(path))
+    monkeypatch.setattr(preflop_table, "_table", None)
+    monkeypatch.setattr(preflop_table, "_loaded", False)
+
+@pytest.mark.parametrize("content", [
+    b"PFEQ\x01",  # ヘッダーの途中で切れたファイル
+    preflop_table.HEADER.pack(preflop_table.MAGIC, preflop_table.VERSION + 1, len(preflop_table.CLASS_NAMES),
+                              preflop_table.MAX_OPPONENTS, 0, 0),  # 版が違う
+])
+def test_broken_table_still_yields_cpu_decision(tmp_path, monkeypatch, capsys, content):
+    path = tmp_path / "preflop_equity.bin"
+    path.write_bytes(content)
+    _use_table_file(monkeypatch, path)
+    engine = PokerEngine([Player("a"), Player("b"), Player("c")], seed=1)
+    engine.cpu_samples = 200
+    engine.start_hand()
+    assert engine.step() == ACTION
+    player = engine.players[engine.current_player_index]
+    action, _ = engine.cpu_action(player)
+    assert action in engine.legal_actions()
+    assert preflop_table.get_table() is None
+    assert "警告" in capsys.readouterr().err
@@ -0,0 +1,11 @@
+import pytest
+import ranges
+
+@pytest.mark.parametrize("board", [[0], [0, 14]])
+def test_partial_board_is_rejected(board):
+    with pytest.raises(ValueError):
+        ranges.range_equity(ranges.parse_range("AA"), ranges.parse_range("KK"), board, samples=1000)
+
+def test_flop_board_is_exact():
+    result = ranges.range_equity(ranges.parse_range("AA"), ranges.parse_range("KK"), [0, 14, 28])
+    assert result["exact"] and 0 < result["equity"] < 1
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import struct
+import server
+
+async def _with_server(check):
+    game_server = server.GameServer(fill_wait=0.1, seed=1)
+    tcp = await game_server.start(port=0)
+    port = tcp.sockets[0].getsockname()[1]
+    try:
+        await check(port)
+    finally:
+        tcp.close()
+        await tcp.wait_closed()
+
+def test_malformed_messages_get_errors():
+    async def check(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for line in (b"[]", b"1", b'"x"', b"{bad", b'{"op": "join", "size": [6]}', b'{"op": "join", "table": {}}',
+                     b'{"op": 5}'):
+            writer.write(line + b"\n")
+            reply = json.loads(await reader.readline())
+            assert reply["op"] == "error", line
+        # 接続は切れずに続けて使える
+        writer.write(b'{"op": "stats"}\n')
+        assert json.loads(await reader.readline())["op"] == "stats"
+        writer.close()
+    asyncio.run(_with_server(check))
+
+def test_websocket_oversized_frame_is_closed_with_1009():
+    async def check(port):
+        conn = await server.connect("127.0.0.1", port, websocket=True)
+        conn.send(server.encode({"op": "stats"}))
+        assert (await conn.read())["op"] == "stats"
+        # 長さだけ大きく申告したフレーム (本体は送らない)
+        conn.writer.write(struct.pack('>BBQ', 0x81, 0x80 | 127, server.MAX_FRAME + 1) + b"\0\0\0\0")
+        head = await conn.reader.readexactly(2)
+        assert head[0] & 0x0F == 0x8
+        assert struct.unpack('>H', await conn.reader.readexactly(head[1] & 0x7F))[0] == 1009
+        assert await conn.reader.read() == b""
+        conn.close()
+    asyncio.run(_with_server(check))
+
+def test_oversized_or_reset_first_line_closes_connection():
+    async def check(port):
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        # 64KiB を超える最初の行
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"x" * (1 << 17) + b"\n")
+        try:
+            assert await reader.read() == b""
+        except ConnectionResetError:
+            pass  # 読まれなかった送信分があるとサーバーの切断がリセットとして届く
+        writer.close()
+        # 最初の行を送る前に切断
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.transport.abort()
+        await asyncio.sleep(0.1)
+        assert errors == []
+    asyncio.run(_with_server(check))
@@ -0,0 +1,56 @@
+from cards import CARDS, SUITS, RANKS
+from engine import Player
+from showdown import build_pots, resolve_showdown
+
+# --- サイドポットの組み立てと配分 ---
+
+def cards(text):
+    return [CARDS[SUITS.index(card[0]) * 13 + RANKS.index(card[1:])] for card in text.split()]
+
+BOARD = cards("♦2 ♣7 ♥9 ♠J ♦Q")  # ストレートもフラッシュもできないボード
+
+def player(name, contributed, hand, folded=False):
+    p = Player(name, chips=0)
+    p.contributed = contributed
+    p.hand = cards(hand)
+    p.is_folded = folded
+    return p
+
+def test_two_all_ins_at_different_levels():
+    a = player("a", 100, "♠A ♥A")   # 最強、100 でオールイン
+    b = player("b", 300, "♠K ♥K")   # 2 番目、300 でオールイン
+    c = player("c", 300, "♠3 ♥4")
+    pots = build_pots([a, b, c])
+    assert [(pot["amount"], pot["eligible"]) for pot in pots] == [(300, [a, b, c]), (400, [b, c])]
+    result = resolve_showdown([a, b, c], BOARD)
+    assert result["payouts"] == {a: 300, b: 400}
+    assert result["pot"] == 700
+
+def test_folded_player_at_middle_level():
+    # 200 出してから降りたプレイヤーの分は、その上のポットに入るが、本人はどのポットにも参加しない
+    a = player("a", 100, "♠3 ♥4")
+    f = player("f", 200, "♠A ♥A", folded=True)
+    b = player("b", 400, "♠K ♥K")
+    c = player("c", 400, "♠5 ♥6")
+    pots = build_pots([a, f, b, c])
+    assert [(pot["amount"], pot["eligible"]) for pot in pots] == [(400, [a, b, c]), (700, [b, c])]
+    result = resolve_showdown([a, f, b, c], BOARD)
+    assert result["payouts"] == {b: 1100}
+    assert f not in result["ranks"]
+
+def test_uncalled_top_bet_returns_to_bettor():
+    a = player("a", 100, "♠A ♥A")
+    b = player("b", 500, "♠K ♥K")
+    pots = build_pots([a, b])
+    assert [(pot["amount"], pot["eligible"]) for pot in pots] == [(200, [a, b]), (400, [b])]
+    assert resolve_showdown([a, b], BOARD)["payouts"] == {a: 200, b: 400}
+
+def test_odd_chip_goes_to_first_winner_left_of_button():
+    board = cards("♠A ♠K ♠Q ♠J ♠10")  # 全員ロイヤルフラッシュで引き分け
+    p0 = player("p0", 10, "♥2 ♥3")
+    p1 = player("p1", 5, "♥4 ♥5", folded=True)
+    p2 = player("p2", 10, "♦2 ♦3")
+    # SB は席 1 なので、勝者のうち席 2 が先 (端数を受け取る)、席 0 が後
+    result = resolve_showdown([p0, p1, p2], board, small_blind_index=1)
+    assert result["pots"][0]["winners"] == [p2, p0]
+    assert result["payouts"] == {p2: 13, p0: 12}
@@ -0,0 +1,46 @@
+import random
+import snapshot
+from engine import PokerEngine, Player
+
+# --- GameState.apply と PokerEngine の照合 ---
+# 同じアクションを PokerEngine とスナップショットの両方に適用し、手番のたびにポット・ベット・ステージ・
+# 次の手番が一致すること、終局後の精算が一致することを確かめる (search.py と prefetch.py が前提にしている)。
+
+FIELDS = ('stage', 'pot', 'current_bet', 'current', 'chips', 'bets', 'contributed', 'folded', 'all_in', 'board')
+
+def _random_action(rng, engine, player):
+    roll = rng.random()
+    if roll < 0.1:
+        return 'fold', 0
+    if roll < 0.35:
+        # 半端な額 (最小額に足りないレイズ、オールインを超える額も含む)
+        return 'raise', rng.randint(0, player.chips + player.bet + 50)
+    if roll < 0.45:
+        return 'check', 0
+    return 'call', 0
+
+def test_apply_matches_engine():
+    rng = random.Random(7)
+    decisions = 0
+    for seats in (2, 3, 6):
+        engine = PokerEngine(seed=seats)
+        for _ in range(60):
+            # 毎ハンド、深さの違うスタックで座り直す (ショートスタックのオールインを起こす)
+            engine.players = [Player(f"P{i}", chips=rng.randint(15, 400)) for i in range(seats)]
+            state = None
+            def decide(engine, player):
+                nonlocal state, decisions
+                expected = snapshot.from_engine(engine)
+                if state is None:
+                    state = expected
+                for field in FIELDS:
+                    assert getattr(state, field) == getattr(expected, field), field
+                action, amount = _random_action(rng, engine, player)
+                state = state.apply(action, amount)
+                decisions += 1
+                return action, amount
+            engine.play_hand(decide)
+            if state is not None:
+                assert state.is_terminal()
+                assert list(state.payoffs()) == [p.chips for p in engine.players]
+    assert decisions > 500
@@ -0,0 +1,26 @@
+import os
+import pytest
+import evaluator
+import table_cache
+
+def test_stale_scoring_is_rebuilt(tmp_path, monkeypatch):
+    path = str(tmp_path / "eval_tables.bin")
+    table_cache.write(path)
+    assert table_cache.verify(path)
+    # 定数はそのままで採点だけ変わった場合 (キッカーを 1 つ減らした、など)
+    score_counts = evaluator._score_counts
+    monkeypatch.setattr(evaluator, "_score_counts", lambda counts: score_counts(counts) + 1)
+    with pytest.raises(ValueError):
+        table_cache.verify(path)
+    flush_table, rank_table = table_cache.load_tables(path)
+    assert rank_table == evaluator.compute_tables()[1]
+    assert table_cache.verify(path)
+
+def test_failed_write_removes_tmp_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "eval_tables.bin")
+    def fail(src, dst):
+        raise OSError("書き込めません")
+    monkeypatch.setattr(table_cache.os, "replace", fail)
+    with pytest.raises(OSError):
+        table_cache.write(path)
+    assert os.listdir(tmp_path) == []